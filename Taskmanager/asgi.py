@@ -3,6 +3,11 @@ ASGI config for Taskmanager project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Server-Sent Events endpoints (tasks/<pk>/events/, projects/<pk>/events/)
+hold a connection open per client and need an ASGI server, e.g.:
+
+    uvicorn Taskmanager.asgi:application
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
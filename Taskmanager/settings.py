@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -37,6 +40,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     'tasks',
     'rest_framework',
     'corsheaders',
@@ -47,7 +51,7 @@ MIDDLEWARE = [
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "tasks.auth.CachedAuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -78,6 +82,18 @@ WSGI_APPLICATION = "Taskmanager.wsgi.application"
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
 
+# Соединения берутся из пула процесса (psycopg_pool, tasks/dbpool.py), а не
+# открываются на каждый запрос. Всего соединений к серверу — до max_size на процесс
+# веб-сервера. Без PostgreSQL (тесты) — Taskmanager.settings_sqlite.
+DATABASE_POOL = {
+    'min_size': 2,          # держать открытыми
+    'max_size': 10,         # не больше на процесс
+    'timeout': 5,           # сколько ждать свободное соединение, с (потом PoolTimeout)
+    'max_waiting': 50,      # длиннее очередь — отказ сразу, без ожидания
+    'max_idle': 300,        # простаивающие сверх min_size закрываются, с
+    'max_lifetime': 1800,   # соединения старше пересоздаются, с
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -86,6 +102,8 @@ DATABASES = {
         'PASSWORD': 'Silver123', # Пароль, который вы задали при установке
         'HOST': 'localhost',      # Сервер (оставляем localhost)
         'PORT': '5432',           # Порт (по умолчанию 5432)
+        'CONN_HEALTH_CHECKS': True,   # пул проверяет соединение перед выдачей
+        'OPTIONS': {'pool': DATABASE_POOL},
     }
 }
 
@@ -138,3 +156,62 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 LOGIN_URL = '/accounts/login/'
 LOGOUT_REDIRECT_URL = '/'
+
+# Push-события чатов (SSE, tasks/realtime.py). Эндпоинты */events/ работают
+# только под ASGI-сервером (uvicorn Taskmanager.asgi:application).
+# Один процесс — InProcessBroker; несколько воркеров — RedisBroker:
+#   TASKS_REALTIME_BROKER = 'tasks.realtime.RedisBroker'
+#   TASKS_REALTIME_BROKER_OPTIONS = {'url': 'redis://localhost:6379/0'}
+TASKS_REALTIME_BROKER = 'tasks.realtime.InProcessBroker'
+TASKS_REALTIME_BROKER_OPTIONS = {}
+
+# Напоминания о сроках (manage.py run_deadline_scheduler)
+TASKS_SITE_URL = 'http://localhost:8000'
+DEFAULT_FROM_EMAIL = 'taskmanager@localhost'
+if DEBUG:
+    EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+# Вложения: SHA-256 считается во время загрузки (tasks/attachments.py),
+# одинаковые файлы хранятся в media/blobs/ один раз
+FILE_UPLOAD_HANDLERS = [
+    'tasks.attachments.HashingMemoryFileUploadHandler',
+    'tasks.attachments.HashingTemporaryFileUploadHandler',
+]
+
+# Фоновая обработка вложений — превью и извлечение текста (tasks/workers.py):
+# процессов в пуле на веб-процесс, 0 — только команды build_previews / extract_attachment_text
+TASKS_WORKER_PROCESSES = 2
+
+# Кэш фрагментов страниц задач (tasks/fragments.py). Ключи версионные, поэтому
+# и локальный LRU точен при нескольких процессах; общий кэш — больше попаданий:
+#   TASKS_FRAGMENT_CACHE = 'tasks.fragments.DjangoCacheBackend'
+#   TASKS_FRAGMENT_CACHE_OPTIONS = {'alias': 'default'}
+TASKS_FRAGMENT_CACHE = 'tasks.fragments.LocalLRUCache'
+TASKS_FRAGMENT_CACHE_OPTIONS = {'max_entries': 5000}
+
+# Постоянная стоимость запроса: сессия читается из кэша и не перезаписывается
+# без изменений (tasks/sessions.py), пользователь кэшируется на минуту (tasks/auth.py).
+# Кэш сессий, пользователя и дашборда включается только с общим для процессов кэшем —
+# с локальным (LocMem) выход и смена пароля не были бы видны другим процессам.
+# Общий кэш задаётся переменной окружения TASKS_CACHE_URL:
+#   TASKS_CACHE_URL=redis://localhost:6379/1        (pip install redis)
+#   TASKS_CACHE_URL=memcached://localhost:11211     (pip install pymemcache)
+# Без неё — LocMem: всё работает, но перечисленные кэши выключены.
+CACHE_BACKENDS = {
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'rediss': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+}
+TASKS_CACHE_URL = os.environ.get('TASKS_CACHE_URL', '')
+if TASKS_CACHE_URL:
+    _scheme, _, _address = TASKS_CACHE_URL.partition('://')
+    if _scheme not in CACHE_BACKENDS:
+        raise ImproperlyConfigured(f'TASKS_CACHE_URL: неизвестная схема {_scheme!r}')
+    CACHES = {'default': {
+        'BACKEND': CACHE_BACKENDS[_scheme],
+        # Memcached — адрес host:port, Redis — URL целиком
+        'LOCATION': _address if _scheme == 'memcached' else TASKS_CACHE_URL,
+    }}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+SESSION_ENGINE = 'tasks.sessions'
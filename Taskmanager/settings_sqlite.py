@@ -0,0 +1,15 @@
+"""
+Настройки без PostgreSQL: тесты и локальный запуск на SQLite.
+
+    python manage.py test tasks --settings Taskmanager.settings_sqlite
+
+Пула соединений нет (pool_stats() — pooled: False), поиск без tsvector (tasks/search.py).
+"""
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',  # noqa: F405
+    }
+}
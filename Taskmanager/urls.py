@@ -8,8 +8,8 @@ from rest_framework.routers import DefaultRouter
 from tasks.api import TaskViewSet, TaskMessageViewSet
 
 router = DefaultRouter()
-router.register(r'api/tasks', TaskViewSet)
-router.register(r'api/messages', TaskMessageViewSet)
+router.register(r'api/tasks', TaskViewSet, basename='task')
+router.register(r'api/messages', TaskMessageViewSet, basename='taskmessage')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -0,0 +1,156 @@
+"""
+Списки API: ModelSerializer против values() + orjson (tasks/serialization.py).
+Строки в секунду на сериализации и CPU на запрос страницы /api/tasks/ и /api/messages/.
+
+    python benchmarks/api_serialization.py
+    python benchmarks/api_serialization.py --settings Taskmanager.settings --rows 20000 --repeat 20
+    python benchmarks/api_serialization.py --json > bench_output.txt
+
+Данные создаются в тестовой БД (test_<NAME>) и удаляются после замера.
+Перед замером проверяется, что оба пути отдают одинаковые байты.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def timed(fn, repeat):
+    """
+    Медианы (wall ms, cpu ms) по repeat запускам и результат последнего.
+    """
+    wall, cpu = [], []
+    for _ in range(repeat):
+        w0, c0 = time.perf_counter(), time.process_time()
+        result = fn()
+        wall.append((time.perf_counter() - w0) * 1000)
+        cpu.append((time.process_time() - c0) * 1000)
+    return statistics.median(wall), statistics.median(cpu), result
+
+
+def seed(rows):
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+
+    from tasks.models import Task, TaskMessage
+    from tasks.visibility import rebuild_task_visibility
+
+    users = User.objects.bulk_create([User(username=f'bench{i}', first_name='Иван', last_name=f'Петров{i}')
+                                      for i in range(10)])
+    now = timezone.now()
+    tasks = Task.objects.bulk_create([
+        Task(title=f'Задача {i}', description='Описание задачи ' * 5, creator=users[0],
+             responsible=users[i % 10], deadline=now + timedelta(hours=i % 200 - 100), is_completed=i % 5 == 0)
+        for i in range(rows)
+    ], batch_size=2000)
+    TaskMessage.objects.bulk_create([
+        TaskMessage(task=tasks[i % len(tasks)], sender=users[i % 10], content=f'Сообщение {i}')
+        for i in range(rows)
+    ], batch_size=2000)
+    rebuild_task_visibility()
+    return users[0]
+
+
+def serializer_throughput(user, rows, repeat):
+    from rest_framework.renderers import JSONRenderer
+
+    from tasks.api import TaskSerializer
+    from tasks.models import Task
+    from tasks.serialization import build_rows, dumps, value_columns
+
+    qs = Task.objects.visible_to(user).order_by('-created_at', '-id')[:rows]
+    columns = value_columns(TaskSerializer())
+
+    def drf():
+        return JSONRenderer().render(TaskSerializer(list(qs), many=True).data)
+
+    def fast():
+        return dumps(build_rows(columns, qs.values(*[source for _, source, _ in columns])))
+
+    results = {}
+    for name, fn in (('serializer', drf), ('values+orjson', fast)):
+        wall, cpu, body = timed(fn, repeat)
+        results[name] = {'wall_ms': wall, 'cpu_ms': cpu, 'rows_per_sec': rows / wall * 1000, 'body': body}
+    assert results['serializer']['body'] == results['values+orjson']['body'], 'форматы различаются'
+    return results
+
+
+def request_cost(user, path, repeat):
+    from rest_framework.test import APIClient
+
+    from tasks.serialization import FastListMixin
+
+    client = APIClient()
+    client.force_authenticate(user)
+    results = {}
+    for name, fast in (('serializer', False), ('values+orjson', True)):
+        FastListMixin.fast_list = fast
+        try:
+            wall, cpu, response = timed(lambda: client.get(path), repeat)
+        finally:
+            FastListMixin.fast_list = True
+        assert response.status_code == 200, response.status_code
+        results[name] = {'wall_ms': wall, 'cpu_ms': cpu, 'body': response.content}
+    assert results['serializer']['body'] == results['values+orjson']['body'], f'{path}: ответы различаются'
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--settings', default=os.environ.get('DJANGO_SETTINGS_MODULE', 'Taskmanager.settings'))
+    parser.add_argument('--rows', type=int, default=10000, help='задач и сообщений в тестовой БД')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--json', action='store_true', help='машиночитаемый вывод')
+    args = parser.parse_args()
+
+    os.environ['DJANGO_SETTINGS_MODULE'] = args.settings
+    sys.path.insert(0, str(BASE_DIR))
+    import django
+    django.setup()
+    from django.test.utils import get_runner, setup_test_environment
+    from django.conf import settings
+
+    setup_test_environment()
+    runner = get_runner(settings)(verbosity=0)
+    old_config = runner.setup_databases()
+    try:
+        user = seed(args.rows)
+        report = {
+            'rows': args.rows,
+            'serialize_all_rows': serializer_throughput(user, args.rows, args.repeat),
+            'GET /api/tasks/?page_size=200': request_cost(user, '/api/tasks/?page_size=200', args.repeat * 5),
+            'GET /api/messages/?page_size=200': request_cost(user, '/api/messages/?page_size=200',
+                                                              args.repeat * 5),
+        }
+    finally:
+        runner.teardown_databases(old_config)
+
+    for section in report.values():
+        if isinstance(section, dict):
+            for result in section.values():
+                result.pop('body', None)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+
+    print(f"settings: {args.settings}, строк: {args.rows}, повторов: {args.repeat} (медианы)")
+    for title, section in report.items():
+        if not isinstance(section, dict):
+            continue
+        print(f"  {title}")
+        base = section['serializer']
+        for name, r in section.items():
+            rate = f"{r['rows_per_sec']:10.0f} строк/с" if 'rows_per_sec' in r else ''
+            print(f"    {name:14} wall {r['wall_ms']:8.1f} ms  cpu {r['cpu_ms']:8.1f} ms  "
+                  f"x{base['cpu_ms'] / r['cpu_ms']:4.1f}  {rate}")
+
+
+if __name__ == '__main__':
+    main()
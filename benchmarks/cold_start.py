@@ -0,0 +1,120 @@
+"""
+Холодный старт воркера: время импорта (python -X importtime),
+время до первого ответа и пиковый RSS.
+
+    python benchmarks/cold_start.py
+    python benchmarks/cold_start.py --settings Taskmanager.settings --path /accounts/login/ --top 15
+    python benchmarks/cold_start.py --json > bench_output.txt
+
+Каждый замер — отдельный чистый процесс, результат воспроизводим между запусками.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Тяжёлые зависимости, которые не должны грузиться при старте воркера
+HEAVY_MODULES = ('pandas', 'numpy', 'openpyxl')
+
+CHILD = r"""
+import json, resource, sys, time
+t0 = time.perf_counter()
+import django
+django.setup()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+import Taskmanager.urls  # noqa: F401  (views и всё, что они импортируют)
+t_boot = time.perf_counter()
+
+status = []
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': %(path)r, 'QUERY_STRING': '',
+    'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+    'wsgi.url_scheme': 'http', 'wsgi.input': sys.stdin.buffer, 'wsgi.errors': sys.stderr,
+}
+body = b''.join(application(environ, lambda s, h, *a: status.append(s)))
+t_first = time.perf_counter()
+
+print(json.dumps({
+    'boot_ms': (t_boot - t0) * 1000,
+    'first_request_ms': (t_first - t0) * 1000,
+    'status': status[0] if status else None,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'heavy_loaded': [m for m in %(heavy)r if m in sys.modules],
+}))
+"""
+
+IMPORTTIME_RE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+
+def run_once(settings, path):
+    pythonpath = os.pathsep.join(filter(None, [str(BASE_DIR), os.environ.get('PYTHONPATH')]))
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings, PYTHONPATH=pythonpath)
+    code = CHILD % {'path': path, 'heavy': HEAVY_MODULES}
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        sys.exit(proc.stderr[-4000:])
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result['process_wall_ms'] = wall_ms
+
+    imports = []
+    for line in proc.stderr.splitlines():
+        m = IMPORTTIME_RE.match(line)
+        if m:
+            self_us, cumulative_us, indent, name = m.groups()
+            # только пакеты верхнего уровня (без вложенных импортов)
+            if len(indent) <= 1:
+                imports.append((int(cumulative_us), name))
+    result['import_total_ms'] = sum(us for us, _ in imports) / 1000
+    result['top_imports'] = [(name, us / 1000) for us, name in sorted(imports, reverse=True)]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--settings', default=os.environ.get('DJANGO_SETTINGS_MODULE', 'Taskmanager.settings'))
+    parser.add_argument('--path', default='/accounts/login/', help='URL первого запроса')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--json', action='store_true', help='машиночитаемый вывод')
+    args = parser.parse_args()
+
+    runs = [run_once(args.settings, args.path) for _ in range(args.runs)]
+    summary = {
+        key: statistics.median(r[key] for r in runs)
+        for key in ('import_total_ms', 'boot_ms', 'first_request_ms', 'process_wall_ms', 'max_rss_kb')
+    }
+    summary['status'] = runs[-1]['status']
+    summary['heavy_loaded'] = runs[-1]['heavy_loaded']
+    summary['top_imports'] = runs[-1]['top_imports'][:args.top]
+
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return
+
+    print(f"settings: {args.settings}, runs: {args.runs} (медианы)")
+    print(f"  импорт (importtime, верхний уровень): {summary['import_total_ms']:8.1f} ms")
+    print(f"  django.setup + urls:                  {summary['boot_ms']:8.1f} ms")
+    print(f"  до первого ответа {args.path}: {summary['first_request_ms']:8.1f} ms ({summary['status']})")
+    print(f"  процесс целиком:                      {summary['process_wall_ms']:8.1f} ms")
+    print(f"  пиковый RSS:                          {summary['max_rss_kb'] / 1024:8.1f} MB")
+    print(f"  тяжёлые модули при старте: {', '.join(summary['heavy_loaded']) or 'нет'}")
+    print(f"  топ-{args.top} импортов (cumulative):")
+    for name, ms in summary['top_imports']:
+        print(f"    {ms:8.1f} ms  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Постоянная стоимость запроса авторизованного пользователя: запросы к БД на
+сессию (django_session) и пользователя (auth_user) до работы самого view.
+Сравниваются штатные db-сессии с AuthenticationMiddleware и
+tasks.sessions + tasks.auth.CachedAuthenticationMiddleware (с общим кэшем:
+если в настройках LocMem, замер идёт на файловом кэше).
+
+    python benchmarks/request_overhead.py
+    python benchmarks/request_overhead.py --settings Taskmanager.settings --repeat 50
+    python benchmarks/request_overhead.py --json > bench_output.txt
+
+Данные создаются в тестовой БД (test_<NAME>) и удаляются после замера.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+STOCK_SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+STOCK_AUTH_MIDDLEWARE = 'django.contrib.auth.middleware.AuthenticationMiddleware'
+SESSION_SQL = '"django_session"'
+USER_SQL = 'FROM "auth_user" WHERE "auth_user"."id" ='
+
+
+def seed():
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+
+    from tasks.models import Task
+
+    user = User.objects.create_user('bench', password='bench')
+    task = Task.objects.create(title='Задача', creator=user, responsible=user,
+                               deadline=timezone.now() + timedelta(days=1))
+    return user, task
+
+
+def configurations(cache_dir):
+    from django.conf import settings
+
+    from tasks.sessions import cache_is_shared
+
+    stock_middleware = [STOCK_AUTH_MIDDLEWARE if m == 'tasks.auth.CachedAuthenticationMiddleware' else m
+                        for m in settings.MIDDLEWARE]
+    cached = {'SESSION_ENGINE': settings.SESSION_ENGINE, 'MIDDLEWARE': settings.MIDDLEWARE}
+    if not cache_is_shared():
+        # кэш сессий и пользователя работает только с общим кэшем — файловый вместо LocMem
+        cached['CACHES'] = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                                        'LOCATION': cache_dir}}
+    return {
+        'stock': {'SESSION_ENGINE': STOCK_SESSION_ENGINE, 'MIDDLEWARE': stock_middleware},
+        'cached': cached,
+    }
+
+
+def fixed_queries(queries):
+    """
+    Любые запросы к сессии плюс загрузка пользователя middleware — она идёт
+    до первого запроса самого view (view тоже может читать auth_user по id).
+    """
+    fixed, in_middleware = 0, True
+    for q in queries:
+        if SESSION_SQL in q['sql']:
+            fixed += 1
+        elif in_middleware and USER_SQL in q['sql']:
+            fixed += 1
+        else:
+            in_middleware = False
+    return fixed
+
+
+def measure(user, path, overrides, repeat):
+    """
+    Медианы по repeat тёплым запросам: всего запросов, постоянных, wall ms.
+    """
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client, override_settings
+    from django.test.utils import CaptureQueriesContext
+
+    with override_settings(**overrides):
+        cache.clear()
+        client = Client()
+        client.force_login(user)
+        assert client.get(path).status_code == 200, path  # прогрев кэшей
+        total, fixed, wall = [], [], []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx:
+                w0 = time.perf_counter()
+                response = client.get(path)
+                wall.append((time.perf_counter() - w0) * 1000)
+            assert response.status_code == 200, response.status_code
+            total.append(len(ctx.captured_queries))
+            fixed.append(fixed_queries(ctx.captured_queries))
+    return {'queries': statistics.median(total), 'fixed_queries': statistics.median(fixed),
+            'wall_ms': statistics.median(wall)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--settings', default=os.environ.get('DJANGO_SETTINGS_MODULE', 'Taskmanager.settings'))
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', action='store_true', help='машиночитаемый вывод')
+    args = parser.parse_args()
+
+    os.environ['DJANGO_SETTINGS_MODULE'] = args.settings
+    sys.path.insert(0, str(BASE_DIR))
+    import django
+    django.setup()
+    from django.test.utils import get_runner, setup_test_environment
+    from django.conf import settings
+
+    setup_test_environment()
+    settings.DEBUG = True  # CaptureQueriesContext
+    runner = get_runner(settings)(verbosity=0)
+    old_config = runner.setup_databases()
+    try:
+        user, task = seed()
+        report = {}
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for path in ('/', f'/tasks/{task.pk}/', '/dashboard/'):
+                report[f'GET {path}'] = {name: measure(user, path, overrides, args.repeat)
+                                         for name, overrides in configurations(cache_dir).items()}
+    finally:
+        runner.teardown_databases(old_config)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+
+    print(f"settings: {args.settings}, повторов: {args.repeat} (медианы тёплых запросов)")
+    for title, section in report.items():
+        print(f"  {title}")
+        for name, r in section.items():
+            print(f"    {name:8} запросов {r['queries']:4.0f}  из них сессия/пользователь "
+                  f"{r['fixed_queries']:2.0f}  wall {r['wall_ms']:7.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
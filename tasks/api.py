@@ -1,20 +1,421 @@
-from rest_framework import serializers, viewsets
-from .models import Task, TaskMessage
+import hashlib
+from datetime import timedelta
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import permissions, serializers, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .bulk import (
+    BULK_MAX_ITEMS, BULK_UPDATE_FIELDS, bulk_complete_tasks, bulk_create_tasks, bulk_delegate_tasks, bulk_update_tasks,
+)
+from .filters import TASK_TABS, filter_tasks, tab_tasks
+from .models import Task, TaskMessage, TaskParticipant
+from .pagination import DEFAULT_KEYS, keyset_paginate
+from .permissions import TaskPermissions
+from .search import search_pagination_keys
+from .serialization import FastListMixin
+
+ROLES = ('creator', 'responsible', 'participant')
+BOOLEANS = {'true': True, '1': True, 'false': False, '0': False}
+
+
+# ===== Пагинация: те же курсоры, что и в списке задач =====
+class KeysetPagination(BasePagination):
+    """
+    ?after=<курсор> / ?before=<курсор>, ?page_size=N (до max_page_size).
+    Ключи сортировки берутся из view.pagination_keys.
+    """
+    page_size = 50
+    max_page_size = 200
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get('page_size', self.page_size))
+        except ValueError:
+            size = self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page = keyset_paginate(
+            queryset,
+            after=request.query_params.get('after'),
+            before=request.query_params.get('before'),
+            page_size=self.get_page_size(request),
+            keys=getattr(view, 'pagination_keys', DEFAULT_KEYS),
+        )
+        return self.page.object_list
+
+    def _link(self, param, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(remove_query_param(self.request.build_absolute_uri(), 'after'), 'before')
+        return replace_query_param(url, param, cursor)
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self._link('after', self.page.next_cursor),
+            'previous': self._link('before', self.page.prev_cursor),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+
+# ===== Сериализаторы =====
+class SparseFieldsMixin:
+    """
+    ?fields=id,title — в ответе только перечисленные поля.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        fields = request.query_params.get('fields') if request and request.method == 'GET' else None
+        if fields:
+            wanted = {f.strip() for f in fields.split(',')}
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+
+class TaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # аннотации Task.objects.visible_to; у только что сохранённой задачи их нет — поле опускается
+    my_role = serializers.CharField(read_only=True)
+    deadline_status = serializers.CharField(read_only=True)
+    files_count = serializers.IntegerField(read_only=True)
 
-class TaskSerializer(serializers.ModelSerializer):
     class Meta:
         model = Task
-        fields = '__all__'
+        fields = [
+            'id', 'title', 'description', 'deadline', 'created_at', 'updated_at',
+            'creator', 'responsible', 'is_delegated', 'is_completed', 'completed_at',
+            'delegated_from', 'delegated_at', 'my_role', 'deadline_status', 'files_count',
+        ]
+        read_only_fields = ['creator', 'completed_at']
+
 
-class TaskMessageSerializer(serializers.ModelSerializer):
+class TaskMessageSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = TaskMessage
-        fields = '__all__'
+        fields = ['id', 'task', 'sender', 'content', 'timestamp']
+        read_only_fields = ['sender']
+
+
+# ===== Массовые операции =====
+class BulkParticipantSerializer(serializers.Serializer):
+    user = serializers.IntegerField()
+    role = serializers.ChoiceField(choices=TaskParticipant.ROLE_CHOICES)
+
+
+class BulkTaskSerializer(serializers.Serializer):
+    """
+    Одна задача пачки. Пользователи — просто id: их существование проверяется
+    одним запросом на всю пачку, а не PrimaryKeyRelatedField на каждую строку.
+    """
+    title = serializers.CharField(max_length=255)
+    description = serializers.CharField()
+    deadline = serializers.DateTimeField()
+    responsible = serializers.IntegerField(required=False, allow_null=True)
+    participants = BulkParticipantSerializer(many=True, required=False)
+
+
+class BulkTaskUpdateSerializer(serializers.Serializer):
+    """
+    Изменение одной задачи пачки: id и хотя бы одно из полей.
+    """
+    id = serializers.IntegerField()
+    title = serializers.CharField(max_length=255, required=False)
+    description = serializers.CharField(required=False)
+    deadline = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if not set(attrs) & set(BULK_UPDATE_FIELDS):
+            raise ValidationError(f"Укажите хотя бы одно из полей: {', '.join(BULK_UPDATE_FIELDS)}")
+        return attrs
+
+
+class BulkIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=BULK_MAX_ITEMS)
+
+
+class BulkDelegateSerializer(BulkIdsSerializer):
+    responsible = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
+
+
+# ===== Условный GET =====
+def task_last_modified(task, now):
+    """
+    Момент последнего изменения ответа по задаче: updated_at (его сдвигают и
+    файлы, и участники) либо смена deadline_status со временем (soon, overdue).
+    """
+    moments = [task.updated_at]
+    if not task.is_completed:
+        moments += [m for m in (task.deadline - timedelta(days=1), task.deadline) if m <= now]
+    return max(moments)
+
+
+class ConditionalGetMixin:
+    """
+    ETag (и Last-Modified, где он надёжен) для list и retrieve. Валидатор
+    считается до выборки страницы и сериализации: list_state(queryset) — одна
+    агрегация по отфильтрованному списку, object_state(obj) — по уже
+    прочитанной строке. Совпал с If-None-Match — 304 без сериализации.
+    """
+    def object_last_modified(self, obj):
+        return None
+
+    def conditional_response(self, request, state, respond, last_modified=None):
+        # адрес (курсор, page_size, fields) и формат ответа — часть версии
+        raw = repr((request.get_full_path(), request.accepted_media_type, request.user.pk, state))
+        etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp) or respond()
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        # клиент может хранить ответ, но обязан перепроверять
+        response['Cache-Control'] = 'private, no-cache'
+        return response
 
-class TaskViewSet(viewsets.ModelViewSet):
-    queryset = Task.objects.all()
+    def list(self, request, *args, **kwargs):
+        state = self.list_state(self.filter_queryset(self.get_queryset()).order_by())
+        return self.conditional_response(request, state, partial(super().list, request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return self.conditional_response(
+            request, self.object_state(instance),
+            lambda: Response(self.get_serializer(instance).data),
+            self.object_last_modified(instance),
+        )
+
+
+# ===== ViewSets =====
+class TaskViewSet(ConditionalGetMixin, FastListMixin, viewsets.ModelViewSet):
+    """
+    Задачи, видимые текущему пользователю. Фильтры — как в списке задач:
+    ?tab=creator|responsible|participant|completed, ?role=..., ?q=, ?date_from=, ?date_to=,
+    ?is_completed=true|false; ?fields= — выборочные поля.
+    """
     serializer_class = TaskSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    @property
+    def pagination_keys(self):
+        return search_pagination_keys(self.request.query_params.get('q', '').strip())
+
+    def get_queryset(self):
+        qs = Task.objects.visible_to(self.request.user)
+        if self.action != 'list':
+            return qs
+        params = self.request.query_params
+
+        try:
+            qs = filter_tasks(qs, params.get('q', '').strip(), params.get('date_from'), params.get('date_to'))
+        except ValueError:
+            raise ValidationError({'date': 'Дата в формате ГГГГ-ММ-ДД'})
+
+        tab = params.get('tab')
+        if tab:
+            if tab not in TASK_TABS:
+                raise ValidationError({'tab': f"Допустимо: {', '.join(TASK_TABS)}"})
+            qs = tab_tasks(qs, tab)
+
+        role = params.get('role')
+        if role:
+            if role not in ROLES:
+                raise ValidationError({'role': f"Допустимо: {', '.join(ROLES)}"})
+            qs = qs.filter(visibility_role=role)
+
+        is_completed = params.get('is_completed')
+        if is_completed:
+            if is_completed.lower() not in BOOLEANS:
+                raise ValidationError({'is_completed': 'true или false'})
+            qs = qs.filter(is_completed=BOOLEANS[is_completed.lower()])
+        return qs
+
+    def list_state(self, queryset):
+        """
+        Состав (число и сумма id), версии задач (растут при любой записи, включая
+        участников и файлы) и число задач, чей deadline_status уже сменился со временем.
+        """
+        now = timezone.now()
+        open_tasks = Q(is_completed=False)
+        return tuple(queryset.aggregate(
+            count=Count('pk'), ids=Sum('pk'), versions=Sum('version'),
+            soon=Count('pk', filter=open_tasks & Q(deadline__lte=now + timedelta(days=1))),
+            overdue=Count('pk', filter=open_tasks & Q(deadline__lt=now)),
+        ).values())
+
+    def object_state(self, task):
+        return task.pk, task.version, task.my_role, task.files_count, task.deadline_status
+
+    def object_last_modified(self, task):
+        return task_last_modified(task, timezone.now())
+
+    def perform_create(self, serializer):
+        serializer.save(creator=self.request.user)
+
+    def perform_update(self, serializer):
+        perms = TaskPermissions.resolve(self.request.user, serializer.instance)
+        # только отметка о выполнении — хватает права завершать
+        if set(serializer.validated_data) <= {'is_completed'}:
+            allowed = perms.can_complete
+        else:
+            allowed = perms.can_edit
+        if not allowed:
+            raise PermissionDenied("У вас нет прав на изменение этой задачи")
+        serializer.save()
+
+    def perform_destroy(self, instance):
+        if instance.creator_id != self.request.user.id:
+            raise PermissionDenied("Удалить задачу может только автор")
+        instance.delete()
+
+    @action(detail=False, methods=['post'], url_path='bulk/create')
+    def bulk_create(self, request):
+        """
+        [{title, description, deadline, responsible, participants: [{user, role}]}, ...]
+        -> {"results": [{"index", "id", "status"} | {"index", "status": "error", "errors"}]}
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError("Ожидается непустой список задач")
+        if len(items) > BULK_MAX_ITEMS:
+            raise ValidationError(f"Не больше {BULK_MAX_ITEMS} задач за запрос")
+
+        checked = [BulkTaskSerializer(data=item) for item in items]
+        valid = [s.is_valid() for s in checked]
+        user_ids = set()
+        for s, ok in zip(checked, valid):
+            if ok:
+                user_ids.add(s.validated_data.get('responsible'))
+                user_ids.update(p['user'] for p in s.validated_data.get('participants', ()))
+        existing = set(User.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+
+        results, accepted = [], []
+        for index, (s, ok) in enumerate(zip(checked, valid)):
+            errors = s.errors if not ok else {}
+            if ok:
+                data = s.validated_data
+                if data.get('responsible') is not None and data['responsible'] not in existing:
+                    errors['responsible'] = ["Пользователь не найден"]
+                missing = [p['user'] for p in data.get('participants', ()) if p['user'] not in existing]
+                if missing:
+                    errors['participants'] = [f"Пользователи не найдены: {missing}"]
+            if errors:
+                results.append({'index': index, 'status': 'error', 'errors': errors})
+            else:
+                results.append({'index': index, 'status': 'created'})
+                accepted.append(index)
+
+        if accepted:
+            tasks = bulk_create_tasks(request.user, [checked[i].validated_data for i in accepted])
+            for index, task in zip(accepted, tasks):
+                results[index]['id'] = task.pk
+        return Response({'results': results})
+
+    @action(detail=False, methods=['post'], url_path='bulk/update')
+    def bulk_update(self, request):
+        """
+        [{id, title?, description?, deadline?}, ...]
+        -> {"results": [{"index", "id", "status": updated|unchanged|error, "error" | "errors"}]}
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError("Ожидается непустой список изменений")
+        if len(items) > BULK_MAX_ITEMS:
+            raise ValidationError(f"Не больше {BULK_MAX_ITEMS} задач за запрос")
+
+        checked = [BulkTaskUpdateSerializer(data=item) for item in items]
+        results, accepted = [], []
+        for index, s in enumerate(checked):
+            if s.is_valid():
+                results.append(None)
+                accepted.append(index)
+            else:
+                results.append({'index': index, 'status': 'error', 'errors': s.errors})
+
+        if accepted:
+            updated = bulk_update_tasks(request.user, [checked[i].validated_data for i in accepted])
+            for index, result in zip(accepted, updated):
+                results[index] = {'index': index, **result}
+        return Response({'results': results})
+
+    @action(detail=False, methods=['post'], url_path='bulk/complete')
+    def bulk_complete(self, request):
+        """
+        {"ids": [...]} -> {"results": [{"id", "status": completed|unchanged|error, "error"}]}
+        """
+        payload = BulkIdsSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        return Response({'results': bulk_complete_tasks(request.user, payload.validated_data['ids'])})
+
+    @action(detail=False, methods=['post'], url_path='bulk/delegate')
+    def bulk_delegate(self, request):
+        """
+        {"ids": [...], "responsible": user_id} -> {"results": [{"id", "status": delegated|unchanged|error}]}
+        """
+        payload = BulkDelegateSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        data = payload.validated_data
+        return Response({'results': bulk_delegate_tasks(request.user, data['ids'], data['responsible'])})
+
+
+class TaskMessageViewSet(ConditionalGetMixin, FastListMixin, viewsets.ModelViewSet):
+    """
+    Сообщения задач, доступных пользователю; ?task=<id> — одной задачи.
+    Last-Modified не отдаётся: правка сообщения не хранит время изменения.
+    """
+    serializer_class = TaskMessageSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    pagination_keys = ('timestamp', 'id')
+
+    def get_queryset(self):
+        qs = TaskMessage.objects.filter(task__visibility__user=self.request.user)
+        task = self.request.query_params.get('task')
+        if task:
+            if not task.isdigit():
+                raise ValidationError({'task': 'Ожидается id задачи'})
+            qs = qs.filter(task_id=task)
+        return qs
+
+    def list_state(self, queryset):
+        # правка и удаление сообщения поднимают версию его задачи (tasks.signals)
+        return tuple(queryset.aggregate(
+            count=Count('pk'), last=Max('pk'), versions=Sum('task__version'),
+        ).values())
+
+    def object_state(self, message):
+        return message.pk, message.task_id, message.sender_id, message.content, message.timestamp
+
+    def perform_create(self, serializer):
+        task = serializer.validated_data['task']
+        if not TaskPermissions.resolve(self.request.user, task).can_access:
+            raise PermissionDenied("У вас нет доступа к этой задаче")
+        serializer.save(sender=self.request.user)
+
+    def perform_update(self, serializer):
+        if serializer.instance.sender_id != self.request.user.id:
+            raise PermissionDenied("Изменить сообщение может только автор")
+        task = serializer.validated_data.get('task')
+        if task is not None and task.pk != serializer.instance.task_id:
+            raise ValidationError({'task': 'Сообщение нельзя перенести в другую задачу'})
+        serializer.save()
 
-class TaskMessageViewSet(viewsets.ModelViewSet):
-    queryset = TaskMessage.objects.all()
-    serializer_class = TaskMessageSerializer
\ No newline at end of file
+    def perform_destroy(self, instance):
+        if instance.sender_id != self.request.user.id:
+            raise PermissionDenied("Удалить сообщение может только автор")
+        instance.delete()
@@ -0,0 +1,165 @@
+"""
+Вложения задач и проектов в общем хранилище по содержимому.
+
+Файл с одинаковыми байтами хранится один раз: blobs/ab/cd/<sha256><расширение>.
+TaskFile / ProjectFile ссылаются на FileBlob (и его путь в своём поле file),
+исходное имя файла — в original_name. FileBlob.ref_count ведётся при создании
+и удалении вложений; файл удаляется из хранилища, когда ссылок не осталось.
+Строка FileBlob, её ref_count и строка вложения пишутся одной транзакцией
+(save_attachment): если вложение не сохранилось, ссылка откатывается вместе с ним.
+
+SHA-256 считается обработчиками загрузки (FILE_UPLOAD_HANDLERS) по мере
+получения чанков, поэтому повторная загрузка уже известного файла ничего
+не пишет на диск, кроме временного файла самой загрузки.
+"""
+import hashlib
+import mimetypes
+import os
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .extraction import enqueue_extraction
+from .models import FileBlob
+from .previews import enqueue_preview
+
+BLOB_DIR = 'blobs'
+HASH_CHUNK_SIZE = 1024 * 1024
+DEFAULT_CONTENT_TYPE = 'application/octet-stream'
+
+
+class HashingUploadMixin:
+    """
+    Считает SHA-256 файла по чанкам, которые этот обработчик принимает,
+    и кладёт его в uploaded_file.sha256.
+    """
+    def new_file(self, *args, **kwargs):
+        # до super(): MemoryFileUploadHandler прерывает цепочку исключением
+        self.sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        rest = super().receive_data_chunk(raw_data, start)
+        if rest is None:  # чанк принят этим обработчиком
+            self.sha256.update(raw_data)
+        return rest
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        if uploaded is not None:
+            uploaded.sha256 = self.sha256.hexdigest()
+        return uploaded
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    pass
+
+
+def file_sha256(f):
+    """
+    SHA-256 файла, если его не посчитал обработчик загрузки (файлы из кода, старые вложения).
+    """
+    digest = getattr(f, 'sha256', None)
+    if digest:
+        return digest
+    h = hashlib.sha256()
+    f.seek(0)
+    for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+        h.update(chunk)
+    f.seek(0)
+    return h.hexdigest()
+
+
+def guess_content_type(filename, declared=None):
+    """
+    MIME по расширению; заявленный браузером тип — только если расширение неизвестно.
+    """
+    return (mimetypes.guess_type(filename)[0] or declared or DEFAULT_CONTENT_TYPE)[:100]
+
+
+def blob_name(digest, filename):
+    ext = os.path.splitext(filename)[1].lower()[:16]
+    return f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+
+@transaction.atomic
+def store_blob(f, digest=None):
+    """
+    FileBlob для содержимого f (+1 ссылка). Файл пишется в хранилище,
+    только если такого содержимого там ещё нет. Ссылка держится, только
+    если строка вложения сохранена в той же транзакции — см. save_attachment.
+    """
+    digest = digest or file_sha256(f)
+    blob = FileBlob.objects.select_for_update().filter(sha256=digest).first()
+    if blob is None:
+        name = blob_name(digest, f.name)
+        try:
+            # строка занимает digest до записи файла: параллельная загрузка того же
+            # содержимого ждёт здесь коммита и получает IntegrityError, а не пишет копию
+            with transaction.atomic():
+                blob = FileBlob.objects.create(sha256=digest, file=name, size=f.size)
+        except IntegrityError:
+            blob = FileBlob.objects.select_for_update().get(sha256=digest)
+        else:
+            # файл мог остаться от отменённой транзакции — то же содержимое под тем же именем
+            if not default_storage.exists(name):
+                saved = default_storage.save(name, f)
+                if saved != name:
+                    FileBlob.objects.filter(pk=blob.pk).update(file=saved)
+                    blob.file.name = saved
+    FileBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+    return blob
+
+
+def attachment(model, f, **fields):
+    """
+    Несохранённый TaskFile / ProjectFile для загруженного файла f,
+    ссылающийся на общий FileBlob: attachment(TaskFile, f, task=task, uploaded_by=user).
+    Сохранять в той же транзакции (bulk_create внутри transaction.atomic),
+    иначе ссылка на FileBlob останется без строки; для одной строки — save_attachment.
+    """
+    blob = store_blob(f)
+    name = os.path.basename(f.name)
+    return model(file=blob.file.name, blob=blob, original_name=name, size=blob.size,
+                 content_type=guess_content_type(name, getattr(f, 'content_type', None)),
+                 checksum=blob.sha256, **fields)
+
+
+@transaction.atomic
+def save_attachment(model, f, **fields):
+    """
+    Ссылка на FileBlob и строка вложения — одной транзакцией.
+    """
+    obj = attachment(model, f, **fields)
+    obj.save()
+    return obj
+
+
+@transaction.atomic
+def release_blob(blob_id):
+    """
+    −1 ссылка; FileBlob без ссылок удаляется вместе с файлом (после коммита).
+    """
+    blob = FileBlob.objects.select_for_update().filter(pk=blob_id).first()
+    if blob is None:
+        return
+    if blob.ref_count > 1:
+        FileBlob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') - 1)
+    else:
+        name = blob.file.name
+        blob.delete()
+        transaction.on_commit(lambda: default_storage.delete(name))
+
+
+def enqueue_attachment_jobs(f):
+    """
+    Фоновая обработка нового вложения: превью и текст для поиска (после коммита).
+    """
+    enqueue_preview(f)
+    enqueue_extraction(f)
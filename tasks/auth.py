@@ -0,0 +1,72 @@
+"""
+Пользователь запроса без запроса к auth_user: объект User кэшируется
+на USER_CACHE_TIMEOUT секунд по id из сессии.
+
+Кэш сбрасывается сигналами при сохранении/удалении пользователя (tasks.signals).
+Группы и права в кэшированный объект не попадают — ModelBackend читает их
+в каждом запросе, поэтому их смена сброса не требует. Хэш пароля в сессии
+сверяется с кэшированным объектом, как в django.contrib.auth.get_user; при
+любом расхождении — штатный путь Django (он же разлогинивает сессию со старым хэшем).
+
+Как и сессии (tasks.sessions), работает только с общим кэшем: в кэше процесса
+сброс не виден остальным процессам сервера.
+"""
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+from .sessions import cache_is_shared
+
+USER_CACHE_KEY = 'auth-user:{}'
+USER_CACHE_TIMEOUT = 60
+
+
+def _load_user(request):
+    session = request.session
+    user_id = session.get(auth.SESSION_KEY)
+    if (user_id is None or not cache_is_shared()
+            or session.get(auth.BACKEND_SESSION_KEY) not in settings.AUTHENTICATION_BACKENDS):
+        return auth.get_user(request)
+
+    key = USER_CACHE_KEY.format(user_id)
+    user = cache.get(key)
+    session_hash = session.get(auth.HASH_SESSION_KEY)
+    if user is not None and session_hash and constant_time_compare(session_hash, user.get_session_auth_hash()):
+        return user
+
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        cache.set(key, user, USER_CACHE_TIMEOUT)
+    return user
+
+
+def get_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = _load_user(request)
+    return request._cached_user
+
+
+async def auser(request):
+    if not hasattr(request, '_acached_user'):
+        request._acached_user = await sync_to_async(get_user)(request)
+    return request._acached_user
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(USER_CACHE_KEY.format(user_id))
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    AuthenticationMiddleware с кэшем пользователя (request.user и request.auser()).
+    """
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
+        request.auser = partial(auser, request)
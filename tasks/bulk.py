@@ -0,0 +1,233 @@
+"""
+Массовые операции с задачами (API /api/tasks/bulk/... и отметки в списке задач).
+
+Каждая пачка — одна транзакция и фиксированное число запросов: bulk_create /
+UPDATE ... WHERE pk IN (...) вместо save() на каждую задачу. Сигналы post_save
+при этом не срабатывают, поэтому всё, что они делают для одной задачи
+(TaskVisibility, search_vector, суточные агрегаты, кэш дашбордов, push-события),
+здесь выполняется сразу для всей пачки.
+
+Права — те же, что у complete_task / delegate_task (TaskPermissions);
+ошибка одной задачи не отменяет остальные, а попадает в её строку результата.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .dashboard import invalidate_dashboards, tasks_audience
+from .models import Task, TaskMessage, TaskParticipant
+from .permissions import TaskPermissions
+from .realtime import message_event, publish, status_event, task_channel
+from .rollups import apply_rollup_deltas, task_rollup_values
+from .search import rebuild_task_search_vectors
+from .visibility import sync_tasks_visibility
+
+BULK_MAX_ITEMS = 500
+# что меняет bulk/update; ответственный и статус — через bulk/delegate и bulk/complete
+BULK_UPDATE_FIELDS = ('title', 'description', 'deadline')
+
+
+def _ok(pk, status):
+    return {'id': pk, 'status': status}
+
+
+def _error(pk, message):
+    return {'id': pk, 'status': 'error', 'error': message}
+
+
+def _refresh_search(tasks):
+    rebuild_task_search_vectors("WHERE t.id = ANY(%(ids)s)", {'ids': [t.pk for t in tasks]})
+
+
+def _locked_tasks(user, ids):
+    """
+    Задачи пачки (с блокировкой строк) и права пользователя на каждую.
+    """
+    tasks = {t.pk: t for t in Task.objects.filter(pk__in=ids).select_for_update()}
+    return tasks, TaskPermissions.resolve_many(user, list(tasks.values()))
+
+
+@transaction.atomic
+def bulk_create_tasks(user, items):
+    """
+    items — провалидированные dict: title, description, deadline, responsible (id или None),
+    participants [{user, role}]. Возвращает задачи в порядке items.
+    """
+    tasks = Task.objects.bulk_create([
+        Task(creator=user, title=item['title'], description=item['description'],
+             deadline=item['deadline'], responsible_id=item.get('responsible'))
+        for item in items
+    ])
+    TaskParticipant.objects.bulk_create([
+        TaskParticipant(task=task, user_id=p['user'], role=p['role'])
+        for task, item in zip(tasks, items) for p in item.get('participants', ())
+    ], ignore_conflicts=True)
+
+    # агрегаты — до видимости: вклад в агрегаты зрителей добавляет она (tasks.rollups)
+    apply_rollup_deltas([(None, task_rollup_values(t)) for t in tasks])
+    sync_tasks_visibility(tasks)
+    _refresh_search(tasks)
+    invalidate_dashboards(tasks_audience(tasks))
+    return tasks
+
+
+@transaction.atomic
+def bulk_update_tasks(user, items):
+    """
+    items — провалидированные dict: id и меняемые поля из BULK_UPDATE_FIELDS.
+    Право — редактирование, как у edit_task; все изменения — один UPDATE (CASE по pk).
+    Результаты — в порядке items.
+    """
+    tasks, perms = _locked_tasks(user, [item['id'] for item in items])
+    results, done, seen = [], [], set()
+    for item in items:
+        pk = item['id']
+        task = tasks.get(pk)
+        if task is None or not perms[pk].can_access:
+            results.append(_error(pk, "Задача не найдена"))
+        elif not perms[pk].can_edit:
+            results.append(_error(pk, "У вас нет прав для редактирования этой задачи"))
+        elif pk in seen:
+            results.append(_error(pk, "Задача уже есть в этой пачке"))
+        else:
+            seen.add(pk)
+            changes = {f: v for f, v in item.items() if f in BULK_UPDATE_FIELDS and getattr(task, f) != v}
+            if not changes:
+                results.append(_ok(pk, 'unchanged'))
+                continue
+            done.append((task, task_rollup_values(task)))
+            for field, value in changes.items():
+                setattr(task, field, value)
+            results.append(_ok(pk, 'updated'))
+    if not done:
+        return results
+
+    now = timezone.now()
+    changed = [task for task, _ in done]
+    for task in changed:
+        task.updated_at = now
+    Task.objects.bulk_update(changed, [*BULK_UPDATE_FIELDS, 'updated_at'])
+    Task.objects.filter(pk__in=[t.pk for t in changed]).update(version=F('version') + 1)
+
+    _refresh_search(changed)
+    apply_rollup_deltas([(old, task_rollup_values(task)) for task, old in done])
+    invalidate_dashboards(tasks_audience(changed))
+    return results
+
+
+@transaction.atomic
+def bulk_complete_tasks(user, ids):
+    tasks, perms = _locked_tasks(user, ids)
+    results, done = [], []
+    for pk in dict.fromkeys(ids):
+        task = tasks.get(pk)
+        if task is None or not perms[pk].can_access:
+            results.append(_error(pk, "Задача не найдена"))
+        elif not perms[pk].can_complete:
+            results.append(_error(pk, "У вас нет прав для завершения этой задачи"))
+        elif task.is_completed:
+            results.append(_ok(pk, 'unchanged'))
+        else:
+            done.append(task)
+            results.append(_ok(pk, 'completed'))
+    if not done:
+        return results
+
+    now = timezone.now()
+    old = [task_rollup_values(t) for t in done]
+    Task.objects.filter(pk__in=[t.pk for t in done]).update(
+        is_completed=True, completed_at=now, updated_at=now, version=F('version') + 1,
+    )
+    for task in done:
+        task.is_completed, task.completed_at, task.updated_at = True, now, now
+        publish(task_channel(task.pk), status_event(task))
+
+    apply_rollup_deltas(zip(old, map(task_rollup_values, done)))
+    invalidate_dashboards(tasks_audience(done))
+    return results
+
+
+@transaction.atomic
+def bulk_delegate_tasks(user, ids, new_responsible):
+    tasks, perms = _locked_tasks(user, ids)
+    results, done = [], []
+    for pk in dict.fromkeys(ids):
+        task = tasks.get(pk)
+        if task is None or not perms[pk].can_access:
+            results.append(_error(pk, "Задача не найдена"))
+        elif not perms[pk].can_delegate:
+            results.append(_error(pk, "У вас нет прав для делегирования этой задачи"))
+        elif task.responsible_id == new_responsible.pk:
+            results.append(_ok(pk, 'unchanged'))
+        else:
+            done.append(task)
+            results.append(_ok(pk, 'delegated'))
+    if not done:
+        return results
+
+    now = timezone.now()
+    old = [task_rollup_values(t) for t in done]
+    previous = {t.pk: t.responsible_id for t in done}
+    Task.objects.filter(pk__in=previous).update(
+        responsible=new_responsible, is_delegated=True, delegated_from=user, delegated_at=now, updated_at=now,
+        version=F('version') + 1,
+    )
+    for task in done:
+        task.responsible = new_responsible
+        task.is_delegated, task.delegated_from, task.delegated_at, task.updated_at = True, user, now, now
+
+    # как в delegate_task: прежний ответственный остаётся наблюдателем
+    TaskParticipant.objects.bulk_create([
+        TaskParticipant(task_id=pk, user_id=old_id, role='observer')
+        for pk, old_id in previous.items() if old_id
+    ] + [
+        TaskParticipant(task=task, user=new_responsible, role='responsible') for task in done
+    ], ignore_conflicts=True)
+    apply_rollup_deltas(zip(old, map(task_rollup_values, done)))
+    sync_tasks_visibility(done)
+    _refresh_search(done)
+
+    text = (f"Задача делегирована от {user.get_full_name() or user.username} "
+            f"к {new_responsible.get_full_name() or new_responsible.username}")
+    notes = TaskMessage.objects.bulk_create([TaskMessage(task=task, sender=user, content=text) for task in done])
+    for task, note in zip(done, notes):
+        publish(task_channel(task.pk), status_event(task))
+        publish(task_channel(task.pk), message_event(note))
+
+    invalidate_dashboards(tasks_audience(done) | set(filter(None, previous.values())))
+    return results
+
+
+@transaction.atomic
+def bulk_shift_deadlines(user, ids, delta):
+    """
+    Сдвигает сроки на delta (timedelta) — право редактирования, как у edit_task.
+    """
+    tasks, perms = _locked_tasks(user, ids)
+    results, done = [], []
+    for pk in dict.fromkeys(ids):
+        task = tasks.get(pk)
+        if task is None or not perms[pk].can_access:
+            results.append(_error(pk, "Задача не найдена"))
+        elif not perms[pk].can_edit:
+            results.append(_error(pk, "У вас нет прав для редактирования этой задачи"))
+        elif not delta:
+            results.append(_ok(pk, 'unchanged'))
+        else:
+            done.append(task)
+            results.append(_ok(pk, 'shifted'))
+    if not done:
+        return results
+
+    now = timezone.now()
+    old = [task_rollup_values(t) for t in done]
+    Task.objects.filter(pk__in=[t.pk for t in done]).update(
+        deadline=F('deadline') + delta, updated_at=now, version=F('version') + 1,
+    )
+    for task in done:
+        task.deadline += delta
+        task.updated_at = now
+
+    apply_rollup_deltas(zip(old, map(task_rollup_values, done)))
+    invalidate_dashboards(tasks_audience(done))
+    return results
@@ -0,0 +1,85 @@
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Task, TaskVisibility
+from .sessions import cache_is_shared
+
+DASHBOARD_CACHE_KEY = 'dashboard:{}'
+DASHBOARD_CHARTS_CACHE_KEY = 'dashboard-charts:{}'  # tasks.rollups.chart_data
+# Страховка для метрик, зависящих от текущего времени (просрочка, ближайшие сроки);
+# изменения задач сбрасывают кэш сразу, см. invalidate_dashboards
+DASHBOARD_CACHE_TIMEOUT = 300
+DASHBOARD_LIST_SIZE = 5
+
+
+def cached_for_dashboard(key, compute):
+    """
+    Кэш дашборда — только в общем кэше (как сессии, tasks.sessions): сброс из
+    invalidate_dashboards должен дойти до всех процессов сервера. В кэше процесса
+    (LocMem) остальные процессы отдавали бы старые цифры, поэтому там — без кэша.
+    """
+    if not cache_is_shared():
+        return compute()
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, DASHBOARD_CACHE_TIMEOUT)
+    return value
+
+
+def dashboard_metrics(user):
+    return cached_for_dashboard(DASHBOARD_CACHE_KEY.format(user.pk), lambda: _compute(user))
+
+
+def _compute(user):
+    now = timezone.now()
+    tasks = Task.objects.for_user(user)
+
+    # один проход: условная агрегация вместо трёх COUNT
+    counts = tasks.aggregate(
+        total=Count('pk'),
+        completed=Count('pk', filter=Q(is_completed=True)),
+        overdue=Count('pk', filter=Q(is_completed=False, deadline__lt=now)),
+    )
+    total, completed = counts['total'], counts['completed']
+
+    recently_completed = list(
+        tasks.filter(is_completed=True).select_related('responsible')
+        .order_by(F('completed_at').desc(nulls_last=True), '-created_at')[:DASHBOARD_LIST_SIZE]
+    )
+    upcoming_tasks = list(
+        tasks.filter(is_completed=False, deadline__gte=now).select_related('responsible')
+        .order_by('deadline')[:DASHBOARD_LIST_SIZE]
+    )
+
+    return {
+        'total_tasks': total,
+        'completed_tasks': completed,
+        'overdue_tasks': counts['overdue'],
+        'in_progress_tasks': total - completed,
+        'completion_rate': round(completed * 100 / total) if total else 0,
+        'recently_completed': recently_completed,
+        'upcoming_tasks': upcoming_tasks,
+    }
+
+
+def task_audience(task):
+    """
+    Все, у кого задача видна на дашборде.
+    """
+    return tasks_audience([task])
+
+
+def tasks_audience(tasks):
+    user_ids = set(TaskVisibility.objects.filter(task_id__in=[t.pk for t in tasks])
+                   .values_list('user_id', flat=True))
+    for task in tasks:
+        user_ids.update(uid for uid in (task.creator_id, task.responsible_id) if uid)
+    return user_ids
+
+
+def invalidate_dashboards(user_ids):
+    if user_ids and cache_is_shared():
+        cache.delete_many([key.format(uid) for uid in user_ids
+                           for key in (DASHBOARD_CACHE_KEY, DASHBOARD_CHARTS_CACHE_KEY)])
@@ -0,0 +1,46 @@
+"""
+Пул соединений PostgreSQL: DATABASES[...]['OPTIONS']['pool'] (Django ≥ 5.1, psycopg[pool]).
+
+Запрос берёт соединение из пула процесса и возвращает его при закрытии
+(конец запроса, close_old_connections) — без TCP/TLS и аутентификации на
+каждый запрос. Пул свой в каждом процессе сервера: max_size × число
+процессов должно укладываться в max_connections PostgreSQL.
+
+Размеры, ожидание и вытеснение простаивающих — settings.DATABASE_POOL;
+проверка соединения при выдаче — CONN_HEALTH_CHECKS. Счётчики — pool_stats()
+и /system/db-pool/ (для процесса, обслужившего запрос).
+"""
+import os
+
+from django.db import connections
+
+# ключи ConnectionPool.get_stats() → наши; счётчики с нулём psycopg_pool не возвращает
+STATS_KEYS = {
+    'min_size': 'pool_min',
+    'max_size': 'pool_max',
+    'size': 'pool_size',              # открыто соединений
+    'available': 'pool_available',    # свободно в пуле
+    'waiting': 'requests_waiting',    # ждут соединения сейчас
+    'checkouts': 'requests_num',      # выдано соединений
+    'waits': 'requests_queued',       # из них пришлось ждать
+    'wait_ms': 'requests_wait_ms',
+    'timeouts': 'requests_errors',    # не дождались (PoolTimeout / очередь переполнена)
+    'usage_ms': 'usage_ms',
+    'connections_opened': 'connections_num',
+    'connections_failed': 'connections_errors',
+    'connections_lost': 'connections_lost',   # не прошли проверку при выдаче
+    'returned_bad': 'returns_bad',
+}
+
+
+def pool_stats(alias='default'):
+    """
+    Состояние и счётчики пула alias в текущем процессе (с момента создания пула).
+    """
+    connection = connections[alias]
+    pool = getattr(connection, 'pool', None)  # есть только у postgresql-бэкенда
+    stats = {'alias': alias, 'vendor': connection.vendor, 'pid': os.getpid(), 'pooled': pool is not None}
+    if pool is not None:
+        raw = pool.get_stats()
+        stats.update({name: raw.get(key, 0) for name, key in STATS_KEYS.items()})
+    return stats
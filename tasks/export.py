@@ -0,0 +1,152 @@
+import csv
+import re
+import string
+import zipfile
+from itertools import chain
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+
+EXPORT_COLUMNS = ['Тема', 'Описание', 'Срок', 'Ответственный', 'Роль', 'Статус']
+EXPORT_CHUNK_SIZE = 2000
+
+
+def export_rows(qs):
+    """
+    Строки выгрузки из аннотированного queryset (Task.objects.visible_to):
+    values() + iterator() — память не зависит от числа задач.
+    """
+    rows = qs.order_by('-created_at', '-id').values_list(
+        'title', 'description', 'deadline',
+        'responsible__first_name', 'responsible__last_name',
+        'my_role', 'is_completed',
+    )
+    for title, description, deadline, first_name, last_name, role, is_completed in rows.iterator(
+            chunk_size=EXPORT_CHUNK_SIZE):
+        yield (
+            title,
+            description,
+            deadline.strftime('%Y-%m-%d %H:%M') if deadline else '',
+            f"{first_name or ''} {last_name or ''}".strip(),
+            role,
+            'Завершена' if is_completed else 'В работе',
+        )
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_response(qs, filename="tasks.csv"):
+    writer = csv.writer(_Echo())
+
+    def stream():
+        # BOM, чтобы Excel открыл UTF-8 с кириллицей
+        yield '\ufeff' + writer.writerow(EXPORT_COLUMNS)
+        for row in export_rows(qs):
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(stream(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+# ===== XLSX потоком =====
+# Книга из одного листа с inline-строками (все значения выгрузки — строки):
+# части пакета пишутся в zip по мере получения строк из БД, ответ уходит
+# кусками, пока выгрузка ещё идёт. openpyxl так не умеет: write-only книга
+# собирает лист во временном файле и упаковывает его только в save().
+XLSX_CHUNK_SIZE = 64 * 1024
+XLSX_SHEET = 'xl/worksheets/sheet1.xml'
+SPREADSHEET_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        f'<workbook xmlns="{SPREADSHEET_NS}" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Задачи" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+# символы, недопустимые в XML 1.0
+ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class _Pipe:
+    """
+    Файл без seek для zipfile: накапливает записанное до drain().
+    """
+    def __init__(self):
+        self.chunks, self.size = [], 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks, self.size = [], 0
+        return data
+
+
+def _xlsx_row(number, values):
+    cells = ''.join(
+        f'<c r="{string.ascii_uppercase[i]}{number}" t="inlineStr"><is><t xml:space="preserve">'
+        f'{escape(ILLEGAL_XML_CHARS.sub("", str(value)))}</t></is></c>'
+        for i, value in enumerate(values) if value not in (None, '')  # пустые ячейки не пишем
+    )
+    return f'<row r="{number}">{cells}</row>'.encode()
+
+
+def xlsx_stream(rows):
+    pipe = _Pipe()
+    with zipfile.ZipFile(pipe, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, xml in XLSX_PARTS.items():
+            archive.writestr(name, XML_DECLARATION + xml)
+        # размер листа заранее неизвестен — zip64 и дескриптор данных после него
+        with archive.open(XLSX_SHEET, 'w', force_zip64=True) as sheet:
+            sheet.write(f'{XML_DECLARATION}<worksheet xmlns="{SPREADSHEET_NS}"><sheetData>'.encode())
+            for number, values in enumerate(rows, 1):
+                sheet.write(_xlsx_row(number, values))
+                if pipe.size >= XLSX_CHUNK_SIZE:
+                    yield pipe.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield pipe.drain()
+
+
+def xlsx_response(qs, filename="tasks.xlsx"):
+    """
+    Как csv_response: строки читаются из БД пачками и сразу уходят клиенту.
+    """
+    response = StreamingHttpResponse(
+        xlsx_stream(chain([EXPORT_COLUMNS], export_rows(qs))),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
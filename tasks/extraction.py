@@ -0,0 +1,152 @@
+"""
+Извлечение текста из вложений (xlsx, docx, csv, txt) для поиска по задачам.
+
+Текст извлекается в общем пуле процессов (tasks/workers.py) после коммита
+загрузки и хранится в AttachmentText под контрольной суммой содержимого:
+одинаковые файлы извлекаются один раз, изменённый файл — это новое
+содержимое и новая строка. Все форматы читаются потоком, а текст
+обрезается на MAX_TEXT_CHARS, поэтому память рабочего процесса ограничена
+независимо от размера файла.
+
+Для старых вложений и после смены EXTRACTOR_VERSION — manage.py extract_attachment_text.
+"""
+import zipfile
+from xml.etree import ElementTree
+
+from django.core.files.storage import default_storage
+
+from .workers import submit
+
+# увеличить при изменении извлечения — команда извлечёт тексты заново
+EXTRACTOR_VERSION = 1
+MAX_TEXT_CHARS = 200_000
+READ_CHUNK_CHARS = 64 * 1024
+
+TEXT_TYPES = {
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': 'xlsx',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'docx',
+    'text/csv': 'text',
+    'text/plain': 'text',
+}
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+class _Collector:
+    """
+    Буфер текста с лимитом: add() возвращает False, когда лимит исчерпан.
+    """
+    def __init__(self, limit):
+        self.parts, self.size, self.limit, self.truncated = [], 0, limit, False
+
+    def add(self, text):
+        if not text:
+            return True
+        text = text.replace('\x00', '')  # PostgreSQL не хранит NUL в text
+        room = self.limit - self.size
+        if len(text) > room:
+            self.parts.append(text[:room])
+            self.size, self.truncated = self.limit, True
+            return False
+        self.parts.append(text)
+        self.size += len(text)
+        return True
+
+
+def _xlsx(src, out):
+    from openpyxl import load_workbook
+
+    book = load_workbook(src, read_only=True, data_only=True)
+    try:
+        for sheet in book.worksheets:
+            for row in sheet.iter_rows(values_only=True):
+                if not out.add(' '.join(str(v) for v in row if v is not None) + '\n'):
+                    return
+    finally:
+        book.close()
+
+
+def _docx(src, out):
+    with zipfile.ZipFile(src) as archive, archive.open('word/document.xml') as xml:
+        for _, elem in ElementTree.iterparse(xml):
+            if elem.tag == W_NS + 't':
+                if not out.add(elem.text):
+                    return
+            elif elem.tag == W_NS + 'p':
+                out.add('\n')
+                elem.clear()  # разобранные абзацы не копятся в памяти
+
+
+def _text_encoding(src):
+    with open(src, 'rb') as f:
+        sample = f.read(READ_CHUNK_CHARS)
+    try:
+        sample.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # обрезанный на границе чанка символ — не повод считать файл не UTF-8
+        if e.start < len(sample) - 3:
+            return 'cp1251'
+    return 'utf-8-sig'
+
+
+def _text(src, out):
+    with open(src, encoding=_text_encoding(src), errors='replace') as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK_CHARS), ''):
+            if not out.add(chunk):
+                return
+
+
+EXTRACTORS = {'xlsx': _xlsx, 'docx': _docx, 'text': _text}
+
+
+def extract_text(checksum, src, fmt):
+    """
+    Точка входа рабочего процесса: (checksum, текст, обрезан ли).
+    """
+    out = _Collector(MAX_TEXT_CHARS)
+    EXTRACTORS[fmt](src, out)
+    return checksum, ''.join(out.parts), out.truncated
+
+
+# ===== Веб-процесс =====
+# ORM импортируется внутри функций: рабочие процессы импортируют этот модуль
+# без настроенного Django (ради extract_text)
+def text_job(f):
+    """
+    Аргументы extract_text для вложения или None, если текст из него не извлекается.
+    """
+    fmt = TEXT_TYPES.get(f.content_type)
+    if fmt is None or not f.checksum:
+        return None
+    try:
+        return f.checksum, default_storage.path(f.file.name), fmt
+    except NotImplementedError:  # не файловое хранилище
+        return None
+
+
+def save_text(result):
+    from django.contrib.postgres.search import SearchVector
+
+    from .models import AttachmentText
+    from .search import SEARCH_CONFIG, search_is_indexed
+
+    checksum, content, truncated = result
+    AttachmentText.objects.update_or_create(checksum=checksum, defaults={
+        'content': content, 'truncated': truncated, 'version': EXTRACTOR_VERSION,
+    })
+    if search_is_indexed():
+        AttachmentText.objects.filter(checksum=checksum).update(
+            search_vector=SearchVector('content', config=SEARCH_CONFIG),
+        )
+
+
+def enqueue_extraction(f):
+    """
+    Поставить извлечение текста в пул, если для этого содержимого его ещё нет.
+    """
+    from .models import AttachmentText
+
+    job = text_job(f)
+    if job is None or AttachmentText.objects.filter(checksum=f.checksum, version=EXTRACTOR_VERSION).exists():
+        return
+    submit(('text', f.checksum), extract_text, *job, on_done=save_text)
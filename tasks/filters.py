@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from django.utils.timezone import make_aware
+
+from .search import search_tasks
+
+TASK_TABS = ('creator', 'responsible', 'participant', 'completed')
+DEFAULT_TAB = 'creator'
+
+
+def parse_date(value):
+    """
+    'YYYY-MM-DD' -> aware datetime (полночь). Пустое значение -> None, мусор -> ValueError.
+    """
+    if not value:
+        return None
+    return make_aware(datetime.strptime(value, "%Y-%m-%d"))
+
+
+def filter_tasks(qs, query='', date_from=None, date_to=None):
+    """
+    Поиск и диапазон сроков — общие для списка задач, выгрузки и API.
+    qs — Task.objects.visible_to(user).
+    """
+    if query:
+        qs = search_tasks(qs, query)
+    if date_from:
+        qs = qs.filter(deadline__gte=parse_date(date_from))
+    if date_to:
+        qs = qs.filter(deadline__lte=parse_date(date_to))
+    return qs
+
+
+def tab_tasks(qs, tab):
+    """
+    Вкладки списка: незавершённые по роли пользователя либо завершённые.
+    """
+    if tab == 'completed':
+        return qs.filter(is_completed=True)
+    if tab not in TASK_TABS:
+        tab = DEFAULT_TAB
+    return qs.filter(visibility_role=tab, is_completed=False)
@@ -0,0 +1,129 @@
+"""
+Кэш отрисованных фрагментов страниц задач: строки списка, панель участников,
+список файлов ({% fragment %} в custom_tags).
+
+Ключ фрагмента содержит Task.version — счётчик, который увеличивается при
+записи в Task, TaskParticipant, TaskMessage и TaskFile, а также при смене
+имени ответственного или участника (tasks.signals, bump_task_versions,
+массовые операции tasks.bulk); save() устаревшего экземпляра её не откатывает. Изменённая задача просто
+получает новые ключи, а старые записи вытесняются LRU — инвалидация точная
+и без TTL. Версия хранится в БД и приходит вместе со строкой задачи, поэтому
+даже локальный кэш каждого процесса не отдаёт устаревших фрагментов.
+
+Бэкенд задаётся в настройках:
+    TASKS_FRAGMENT_CACHE = 'tasks.fragments.LocalLRUCache'       # в памяти процесса
+    TASKS_FRAGMENT_CACHE = 'tasks.fragments.DjangoCacheBackend'  # общий кэш Django (Redis, memcached)
+    TASKS_FRAGMENT_CACHE_OPTIONS = {...}
+"""
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+
+class FragmentCache(ABC):
+    """
+    Интерфейс бэкенда: бэкенд без какого-либо метода не создаётся (TypeError при запуске).
+    """
+    @abstractmethod
+    def get(self, key):
+        """
+        Отрисованный фрагмент или None.
+        """
+
+    @abstractmethod
+    def set(self, key, value):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+
+class LocalLRUCache(FragmentCache):
+    """
+    В памяти процесса, не больше max_entries фрагментов; вытесняются давно не читанные.
+    """
+    def __init__(self, max_entries=5000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DjangoCacheBackend(FragmentCache):
+    """
+    Общий кэш из CACHES (alias) — для нескольких процессов; вытеснение — политикой самого кэша.
+    """
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, None)  # без срока: устаревший ключ больше не запрашивается
+
+    def clear(self):
+        self.cache.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_fragment_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                cls = import_string(getattr(settings, 'TASKS_FRAGMENT_CACHE', 'tasks.fragments.LocalLRUCache'))
+                _cache = cls(**getattr(settings, 'TASKS_FRAGMENT_CACHE_OPTIONS', {}))
+    return _cache
+
+
+def fragment_key(name, parts):
+    digest = hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+    return f'fragment:{name}:{digest}'
+
+
+def cached_fragment(name, parts, render):
+    cache = get_fragment_cache()
+    key = fragment_key(name, parts)
+    html = cache.get(key)
+    if html is None:
+        html = render()
+        cache.set(key, html)
+    return html
+
+
+def bump_task_versions(task_ids, **fields):
+    """
+    Новая версия задач (и заодно fields — например, updated_at) одним UPDATE.
+    """
+    if task_ids:
+        Task.objects.filter(pk__in=task_ids).update(version=F('version') + 1, **fields)
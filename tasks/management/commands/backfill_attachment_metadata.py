@@ -0,0 +1,47 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from tasks.attachments import file_sha256, guess_content_type
+from tasks.models import ProjectFile, TaskFile
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = ("Заполнить размер, MIME-тип, контрольную сумму и исходное имя у вложений, "
+            "загруженных до появления этих полей")
+
+    def handle(self, *args, **options):
+        filled = missing = 0
+        for model in (TaskFile, ProjectFile):
+            batch = []
+            for row in model.objects.filter(size__isnull=True).select_related('blob').iterator():
+                if not self.fill(row):
+                    missing += 1
+                    continue
+                batch.append(row)
+                if len(batch) >= BATCH_SIZE:
+                    filled += self.save(model, batch)
+            filled += self.save(model, batch)
+        self.stdout.write(self.style.SUCCESS(f"Заполнено вложений: {filled}, нет файла: {missing}"))
+
+    def fill(self, row):
+        row.original_name = row.original_name or os.path.basename(row.file.name)
+        row.content_type = row.content_type or guess_content_type(row.original_name)
+        if row.blob is not None:
+            # у файлов из общего хранилища всё уже есть в FileBlob
+            row.size, row.checksum = row.blob.size, row.blob.sha256
+            return True
+        if not row.file.name or not default_storage.exists(row.file.name):
+            return False
+        with default_storage.open(row.file.name, 'rb') as f:
+            row.size, row.checksum = f.size, file_sha256(f)
+        return True
+
+    def save(self, model, batch):
+        model.objects.bulk_update(batch, ['original_name', 'content_type', 'size', 'checksum'])
+        count = len(batch)
+        batch.clear()
+        return count
@@ -0,0 +1,32 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.models import ProjectFile, TaskFile
+from tasks.previews import preview_job, render_preview
+
+
+class Command(BaseCommand):
+    help = "Построить превью для вложений, у которых их ещё нет (картинки и таблицы)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.TASKS_WORKER_PROCESSES or 1,
+                            help='процессов в пуле')
+
+    def handle(self, *args, **options):
+        jobs = {}
+        for model in (TaskFile, ProjectFile):
+            for f in model.objects.exclude(checksum='').only('file', 'content_type', 'checksum').iterator():
+                job = preview_job(f)
+                if job is not None:
+                    jobs.setdefault(f.checksum, job)
+
+        failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {pool.submit(render_preview, *job): checksum for checksum, job in jobs.items()}
+            for future in as_completed(futures):
+                if future.exception() is not None:
+                    failed += 1
+                    self.stderr.write(f"{futures[future]}: {future.exception()!r}")
+        self.stdout.write(self.style.SUCCESS(f"Превью: {len(jobs) - failed}, ошибок: {failed}"))
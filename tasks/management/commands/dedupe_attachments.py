@@ -0,0 +1,52 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from tasks.attachments import file_sha256, guess_content_type, store_blob
+from tasks.models import ProjectFile, TaskFile
+
+
+class Command(BaseCommand):
+    help = ("Перенести старые вложения (task_files/, project_files/) в общее хранилище blobs/: "
+            "одинаковые файлы остаются в одном экземпляре")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='только посчитать, ничего не менять')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        moved = missing = freed = 0
+        seen = set()
+        for model in (TaskFile, ProjectFile):
+            for row in model.objects.filter(blob__isnull=True).iterator():
+                name = row.file.name
+                if not name or not default_storage.exists(name):
+                    missing += 1
+                    continue
+                with default_storage.open(name, 'rb') as f:
+                    digest = file_sha256(f)
+                    if digest in seen:
+                        freed += f.size
+                    seen.add(digest)
+                    if not dry_run:
+                        self.move(row, f, digest)
+                moved += 1
+
+        verb = "Будет перенесено" if dry_run else "Перенесено"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} вложений: {moved}, уникальных: {len(seen)}, "
+            f"освобождается: {freed / 1024 / 1024:.1f} МБ, нет файла: {missing}"
+        ))
+
+    @transaction.atomic
+    def move(self, row, f, digest):
+        old_name = row.file.name
+        original_name = row.original_name or os.path.basename(old_name)
+        blob = store_blob(f, digest)
+        type(row).objects.filter(pk=row.pk).update(
+            file=blob.file.name, blob=blob, original_name=original_name, size=blob.size, checksum=digest,
+            content_type=row.content_type or guess_content_type(original_name),
+        )
+        transaction.on_commit(lambda: default_storage.delete(old_name))
@@ -0,0 +1,41 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.extraction import EXTRACTOR_VERSION, TEXT_TYPES, extract_text, save_text, text_job
+from tasks.models import AttachmentText, ProjectFile, TaskFile
+
+
+class Command(BaseCommand):
+    help = ("Извлечь текст вложений для поиска: только содержимое, для которого его ещё нет "
+            "или оно извлечено прошлой версией извлекателя")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.TASKS_WORKER_PROCESSES or 1,
+                            help='процессов в пуле')
+        parser.add_argument('--force', action='store_true', help='извлечь заново всё')
+
+    def handle(self, *args, **options):
+        done = set()
+        if not options['force']:
+            done = set(AttachmentText.objects.filter(version=EXTRACTOR_VERSION).values_list('checksum', flat=True))
+
+        jobs = {}
+        for model in (TaskFile, ProjectFile):
+            files = model.objects.filter(content_type__in=TEXT_TYPES).exclude(checksum='')
+            for f in files.only('file', 'content_type', 'checksum').iterator():
+                job = text_job(f)
+                if job is not None and f.checksum not in done:
+                    jobs.setdefault(f.checksum, job)
+
+        failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {pool.submit(extract_text, *job): checksum for checksum, job in jobs.items()}
+            for future in as_completed(futures):
+                if future.exception() is not None:
+                    failed += 1
+                    self.stderr.write(f"{futures[future]}: {future.exception()!r}")
+                else:
+                    save_text(future.result())
+        self.stdout.write(self.style.SUCCESS(f"Извлечено текстов: {len(jobs) - failed}, ошибок: {failed}"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tasks.search import rebuild_task_search_vectors, search_is_indexed
+
+
+class Command(BaseCommand):
+    help = "Пересчитать search_vector всех задач (только PostgreSQL)"
+
+    def handle(self, *args, **options):
+        if not search_is_indexed():
+            self.stdout.write("База не PostgreSQL — поиск работает через icontains, пересчёт не нужен")
+            return
+        count = rebuild_task_search_vectors()
+        self.stdout.write(self.style.SUCCESS(f"Обновлено задач: {count}"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from tasks.rollups import rebuild_task_rollups
+
+
+class Command(BaseCommand):
+    help = "Пересчитать суточные агрегаты задач (TaskDailyStats, UserTaskDailyStats) для графиков дашборда"
+
+    def handle(self, *args, **options):
+        count = rebuild_task_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Строк агрегатов: {count}"))
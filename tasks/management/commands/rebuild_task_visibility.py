@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from tasks.rollups import rebuild_task_rollups
+from tasks.visibility import rebuild_task_visibility
+
+
+class Command(BaseCommand):
+    help = "Пересобрать таблицу TaskVisibility по авторам, ответственным и участникам задач"
+
+    def handle(self, *args, **options):
+        count = rebuild_task_visibility()
+        self.stdout.write(self.style.SUCCESS(f"Строк видимости: {count}"))
+        # агрегаты пользователей считаются по видимости
+        count = rebuild_task_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Строк агрегатов: {count}"))
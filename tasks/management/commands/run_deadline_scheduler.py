@@ -0,0 +1,30 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from tasks.reminders import REFRESH_SECONDS, DeadlineScheduler
+
+
+class Command(BaseCommand):
+    help = "Планировщик напоминаний о сроках задач и пунктов проектов (работает постоянно)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true",
+                            help="Один проход: загрузить сроки, разослать сработавшие и выйти (для cron)")
+        parser.add_argument("--refresh", type=int, default=REFRESH_SECONDS,
+                            help="Как часто подхватывать изменённые задачи, секунд")
+
+    def handle(self, *args, **options):
+        scheduler = DeadlineScheduler(refresh_seconds=options["refresh"])
+        if options["once"]:
+            sent = scheduler.run_once()
+            self.stdout.write(self.style.SUCCESS(f"Отправлено писем: {sent}"))
+            return
+
+        if options["verbosity"] > 0:
+            logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+        self.stdout.write(f"Планировщик запущен, обновление раз в {options['refresh']} с")
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:54
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# GIN-индексы и начальное заполнение нужны только на PostgreSQL;
+# на SQLite (dev) поиск работает через icontains.
+SEARCH_SQL = [
+    "CREATE INDEX IF NOT EXISTS tasks_task_search_vector_gin"
+    " ON tasks_task USING GIN (search_vector)",
+    "CREATE INDEX IF NOT EXISTS tasks_task_title_trgm"
+    " ON tasks_task USING GIN (title gin_trgm_ops)",
+    """
+    UPDATE tasks_task t SET search_vector =
+        setweight(to_tsvector('russian', coalesce(t.title, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(
+            (SELECT u.first_name || ' ' || u.last_name FROM auth_user u WHERE u.id = t.responsible_id), ''
+        )), 'A') ||
+        setweight(to_tsvector('russian', coalesce(t.description, '')), 'B')
+    """,
+]
+DROP_SQL = [
+    "DROP INDEX IF EXISTS tasks_task_search_vector_gin",
+    "DROP INDEX IF EXISTS tasks_task_title_trgm",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0007_projectfile"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        TrigramExtension(),
+        migrations.RunPython(_run(SEARCH_SQL), _run(DROP_SQL)),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_visibility(apps, schema_editor):
+    Task = apps.get_model("tasks", "Task")
+    TaskParticipant = apps.get_model("tasks", "TaskParticipant")
+    TaskVisibility = apps.get_model("tasks", "TaskVisibility")
+
+    rows = {}
+    for task_id, user_id in TaskParticipant.objects.values_list("task_id", "user_id"):
+        rows[(user_id, task_id)] = "participant"
+    for task_id, responsible_id in Task.objects.filter(
+        responsible__isnull=False
+    ).values_list("pk", "responsible_id"):
+        rows[(responsible_id, task_id)] = "responsible"
+    for task_id, creator_id in Task.objects.values_list("pk", "creator_id"):
+        rows[(creator_id, task_id)] = "creator"
+
+    TaskVisibility.objects.bulk_create(
+        [
+            TaskVisibility(user_id=user_id, task_id=task_id, role=role)
+            for (user_id, task_id), role in rows.items()
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0008_task_search_vector"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskVisibility",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "role",
+                    models.CharField(
+                        choices=[
+                            ("creator", "Создатель"),
+                            ("responsible", "Ответственный"),
+                            ("participant", "Участник"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "task",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="visibility",
+                        to="tasks.task",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="task_visibility",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["user", "role", "task"],
+                        name="tasks_visib_user_role_idx",
+                    )
+                ],
+                "unique_together": {("user", "task")},
+            },
+        ),
+        migrations.RunPython(fill_visibility, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0009_taskvisibility"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="projectmessage",
+            index=models.Index(
+                fields=["project", "timestamp"], name="tasks_projmsg_proj_ts_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["creator", "is_completed", "created_at"],
+                name="tasks_task_creator_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["responsible", "is_completed"],
+                name="tasks_task_responsible_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(fields=["deadline"], name="tasks_task_deadline_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="taskmessage",
+            index=models.Index(
+                fields=["task", "timestamp"], name="tasks_taskmsg_task_ts_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="taskparticipant",
+            index=models.Index(
+                fields=["user", "task", "role"], name="tasks_partic_user_task_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0011_task_completed_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskDailyStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(verbose_name="День")),
+                ("created", models.IntegerField(default=0)),
+                ("completed", models.IntegerField(default=0)),
+                ("due", models.IntegerField(default=0)),
+                ("overdue", models.IntegerField(default=0)),
+                (
+                    "responsible",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="task_daily_stats",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Ответственный",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["responsible", "day"], name="tasks_stats_resp_day_idx"
+                    )
+                ],
+                "unique_together": {("day", "responsible")},
+            },
+        ),
+    ]
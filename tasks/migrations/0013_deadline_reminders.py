@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0012_taskdailystats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="projectitem",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, verbose_name="Изменено"
+            ),
+        ),
+        migrations.AddField(
+            model_name="task",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, verbose_name="Изменено"
+            ),
+        ),
+        migrations.CreateModel(
+            name="DeadlineNotice",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("soon", "Срок через 24 часа"),
+                            ("overdue", "Срок истёк"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("deadline", models.DateTimeField()),
+                ("sent_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "item",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="deadline_notices",
+                        to="tasks.projectitem",
+                    ),
+                ),
+                (
+                    "task",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="deadline_notices",
+                        to="tasks.task",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {
+                    ("item", "kind", "deadline"),
+                    ("task", "kind", "deadline"),
+                },
+            },
+        ),
+    ]
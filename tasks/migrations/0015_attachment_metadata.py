@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0014_attachment_blobs"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="projectfile",
+            name="checksum",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="projectfile",
+            name="content_type",
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name="projectfile",
+            name="size",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="taskfile",
+            name="checksum",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="taskfile",
+            name="content_type",
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name="taskfile",
+            name="size",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="projectfile",
+            index=models.Index(
+                fields=["project", "-uploaded_at", "-id"],
+                name="tasks_projfile_proj_up_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="taskfile",
+            index=models.Index(
+                fields=["task", "-uploaded_at", "-id"],
+                name="tasks_taskfile_task_up_idx",
+            ),
+        ),
+    ]
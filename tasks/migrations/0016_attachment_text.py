@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:22
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+# GIN-индекс по тексту вложений — только на PostgreSQL (на SQLite поиск через icontains)
+INDEX_SQL = ("CREATE INDEX IF NOT EXISTS tasks_attachmenttext_search_vector_gin"
+             " ON tasks_attachmenttext USING GIN (search_vector)")
+DROP_SQL = "DROP INDEX IF EXISTS tasks_attachmenttext_search_vector_gin"
+
+
+def _run(sql):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == "postgresql":
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0015_attachment_metadata"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AttachmentText",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("checksum", models.CharField(max_length=64, unique=True)),
+                ("content", models.TextField(blank=True)),
+                ("truncated", models.BooleanField(default=False)),
+                ("version", models.PositiveSmallIntegerField(default=0)),
+                (
+                    "search_vector",
+                    django.contrib.postgres.search.SearchVectorField(
+                        editable=False, null=True
+                    ),
+                ),
+                ("extracted_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(_run(INDEX_SQL), _run(DROP_SQL)),
+    ]
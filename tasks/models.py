@@ -1,22 +1,134 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVectorField
 from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Case, CharField, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 import os
+from datetime import timedelta
 
+from .previews import preview_kind, preview_name
 
-class TaskFile(models.Model):
+
+class FileBlob(models.Model):
+    """
+    Содержимое вложения, общее для всех одинаковых файлов (tasks/attachments.py):
+    один файл в хранилище на SHA-256, ref_count — число TaskFile/ProjectFile, которые на него ссылаются.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(max_length=255)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256
+
+
+class AttachmentText(models.Model):
+    """
+    Текст вложения для поиска (tasks/extraction.py) — один на содержимое:
+    TaskFile / ProjectFile связаны с ним по checksum. Извлекается заново только
+    для нового содержимого или после смены EXTRACTOR_VERSION.
+    """
+    checksum = models.CharField(max_length=64, unique=True)
+    content = models.TextField(blank=True)
+    truncated = models.BooleanField(default=False)
+    version = models.PositiveSmallIntegerField(default=0)
+    search_vector = SearchVectorField(null=True, editable=False)
+    extracted_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.checksum
+
+
+class AttachmentMixin:
+    """
+    Общее для TaskFile и ProjectFile: исходное имя и превью (tasks/previews.py).
+    """
+    @property
+    def filename(self):
+        # у файлов из общего хранилища имя в file — хэш, исходное хранится отдельно
+        return self.original_name or os.path.basename(self.file.name)
+
+    @property
+    def preview(self):
+        return preview_kind(self.content_type) if self.checksum else None
+
+    @property
+    def thumbnail_url(self):
+        return default_storage.url(preview_name(self.checksum, 'image'))
+
+
+class TaskFile(AttachmentMixin, models.Model):
     task = models.ForeignKey("Task", on_delete=models.CASCADE, related_name="files")
-    file = models.FileField(upload_to="task_files/%Y/%m/%d/")
+    file = models.FileField(upload_to="task_files/%Y/%m/%d/", max_length=255)
+    blob = models.ForeignKey(FileBlob, on_delete=models.PROTECT, null=True, blank=True, related_name="+")
+    original_name = models.CharField(max_length=255, blank=True)
+    # метаданные пишутся при загрузке (tasks/attachments.py), у старых строк —
+    # manage.py backfill_attachment_metadata; шаблонам не нужен доступ к файлу
+    size = models.BigIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    checksum = models.CharField(max_length=64, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['task', '-uploaded_at', '-id'], name='tasks_taskfile_task_up_idx')]
+
     def __str__(self):
         return f"{self.file.name}"
 
-    @property
-    def filename(self):
-        return os.path.basename(self.file.name)
+
+class TaskQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """
+        Задачи, где user — автор, ответственный или участник, с аннотациями.
+        Один индексный JOIN с TaskVisibility (строка на пару user/task) — без DISTINCT.
+        visibility_role: creator / responsible / participant (для вкладок).
+        """
+        return self.for_user(user).annotate(
+            visibility_role=F('visibility__role'),
+        ).with_user_annotations(user)
+
+    def for_user(self, user):
+        """
+        То же множество задач без аннотаций (для агрегатов и коротких списков).
+        """
+        return self.filter(visibility__user=user)
+
+    def with_user_annotations(self, user):
+        """
+        my_role, files_count и deadline_status в том же SQL-запросе
+        (раньше — get_user_role, files.count() и calc_deadline_status на каждую строку).
+        """
+        now = timezone.now()
+        participant_role = TaskParticipant.objects.filter(task=OuterRef('pk'), user=user).annotate(
+            label=Case(*[When(role=code, then=Value(label)) for code, label in TaskParticipant.ROLE_CHOICES],
+                       output_field=CharField()),
+        ).values('label')[:1]
+        files_count = (TaskFile.objects.filter(task=OuterRef('pk')).order_by()
+                       .values('task').annotate(c=Count('pk')).values('c'))
+        return self.annotate(
+            my_role=Case(
+                When(creator=user, then=Value('Создатель')),
+                When(responsible=user, then=Value('Ответственный')),
+                default=Coalesce(Subquery(participant_role), Value('-')),
+                output_field=CharField(),
+            ),
+            files_count=Coalesce(Subquery(files_count, output_field=IntegerField()), 0),
+            deadline_status=Case(
+                When(deadline__isnull=True, then=Value('no_deadline')),
+                When(is_completed=True, then=Value('done')),
+                When(deadline__lt=now, then=Value('overdue')),
+                When(deadline__lte=now + timedelta(days=1), then=Value('soon')),
+                default=Value('ok'),
+                output_field=CharField(),
+            ),
+        )
 
 
 class Task(models.Model):
@@ -24,6 +136,11 @@ class Task(models.Model):
     description = models.TextField("Описание задачи")
     deadline = models.DateTimeField("Срок выполнения")
     created_at = models.DateTimeField("Создано", auto_now_add=True)
+    # по нему планировщик напоминаний (tasks.reminders) забирает изменённые строки
+    updated_at = models.DateTimeField("Изменено", auto_now=True, db_index=True)
+    # ключ кэша фрагментов (tasks.fragments): растёт при записи в задачу, участников, чат и файлы.
+    # Меняется только через F('version') + 1: save() существующей задачи пишет version = version (tasks.signals)
+    version = models.PositiveIntegerField(default=0, editable=False)
 
     creator = models.ForeignKey(
         User, related_name='created_tasks',
@@ -36,6 +153,7 @@ class Task(models.Model):
     )
     is_delegated = models.BooleanField("Делегировано", default=False)
     is_completed = models.BooleanField(default=False)
+    completed_at = models.DateTimeField("Дата завершения", null=True, blank=True)
     delegated_from = models.ForeignKey(
         User, related_name='delegated_tasks',
         on_delete=models.SET_NULL, null=True, blank=True,
@@ -43,9 +161,33 @@ class Task(models.Model):
     )
     delegated_at = models.DateTimeField("Дата делегирования", null=True, blank=True)
 
+    # тема + описание + ФИО ответственного, обновляется в tasks.signals
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['creator', 'is_completed', 'created_at'], name='tasks_task_creator_idx'),
+            models.Index(fields=['responsible', 'is_completed'], name='tasks_task_responsible_idx'),
+            models.Index(fields=['deadline'], name='tasks_task_deadline_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} (до {self.deadline.strftime('%d.%m.%Y')})"
 
+    def save(self, *args, **kwargs):
+        # completed_at ставится при любом пути завершения (view, API, админка)
+        if self.is_completed and not self.completed_at:
+            self.completed_at = timezone.now()
+        elif not self.is_completed:
+            self.completed_at = None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            extra = {'updated_at', 'completed_at'} if 'is_completed' in update_fields else {'updated_at'}
+            kwargs['update_fields'] = {*update_fields, *extra}
+        super().save(*args, **kwargs)
+
 
 class TaskParticipant(models.Model):
     ROLE_CHOICES = [
@@ -69,6 +211,7 @@ class TaskParticipant(models.Model):
 
     class Meta:
         unique_together = ('task', 'user')
+        indexes = [models.Index(fields=['user', 'task', 'role'], name='tasks_partic_user_task_idx')]
         verbose_name = "Участник задачи"
         verbose_name_plural = "Участники задачи"
 
@@ -76,12 +219,88 @@ class TaskParticipant(models.Model):
         return f"{self.user.get_full_name() or self.user.username} — {self.get_role_display()}"
 
 
+class TaskVisibility(models.Model):
+    """
+    Денормализованная видимость: одна строка на (пользователь, задача)
+    со старшей ролью (автор > ответственный > участник).
+    Поддерживается сигналами Task/TaskParticipant (tasks.visibility), чинится командой rebuild_task_visibility.
+    """
+    ROLE_CHOICES = [
+        ('creator', 'Создатель'),
+        ('responsible', 'Ответственный'),
+        ('participant', 'Участник'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='task_visibility')
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='visibility')
+    role = models.CharField(max_length=20, choices=ROLE_CHOICES)
+
+    class Meta:
+        unique_together = ('user', 'task')
+        indexes = [models.Index(fields=['user', 'role', 'task'], name='tasks_visib_user_role_idx')]
+
+    def __str__(self):
+        return f"{self.user_id} / {self.task_id} — {self.get_role_display()}"
+
+
+class TaskDailyStats(models.Model):
+    """
+    Суточные агрегаты для графиков дашборда: по дню и ответственному.
+    created/completed — по дате создания/завершения, due/overdue — по дню срока
+    (overdue: не завершена или завершена позже срока; для прошедших дней — просрочка).
+    Задачи без ответственного не учитываются; агрегаты — по всей организации
+    (график по ответственным для персонала), графики пользователя — из UserTaskDailyStats.
+    Обновляется инкрементально в tasks.rollups, пересобирается командой rebuild_task_rollups.
+    """
+    day = models.DateField("День")
+    responsible = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True,
+                                    related_name='task_daily_stats', verbose_name="Ответственный")
+    created = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    due = models.IntegerField(default=0)
+    overdue = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('day', 'responsible')
+        indexes = [models.Index(fields=['responsible', 'day'], name='tasks_stats_resp_day_idx')]
+
+    def __str__(self):
+        return f"{self.day} / {self.responsible_id}"
+
+
+class UserTaskDailyStats(models.Model):
+    """
+    Те же суточные агрегаты, но по задачам, видимым пользователю (TaskVisibility):
+    строка на (пользователь, день, ответственный). Из них строятся графики дашборда —
+    несколько сотен строк вместо группировки по задачам.
+    Вклад задачи меняется при её записи и при смене видимости (tasks.rollups, tasks.visibility).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='visible_task_daily_stats')
+    day = models.DateField("День")
+    responsible = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+',
+                                    verbose_name="Ответственный")
+    created = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    due = models.IntegerField(default=0)
+    overdue = models.IntegerField(default=0)
+
+    class Meta:
+        # индекс ограничения (user, day, …) — он же для выборки графиков
+        unique_together = ('user', 'day', 'responsible')
+
+    def __str__(self):
+        return f"{self.user_id} / {self.day} / {self.responsible_id}"
+
+
 class TaskMessage(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='messages', verbose_name="Задача")
     sender = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Отправитель")
     content = models.TextField("Сообщение")
     timestamp = models.DateTimeField("Дата и время", auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['task', 'timestamp'], name='tasks_taskmsg_task_ts_idx')]
+
     def __str__(self):
         return f"Сообщение от {self.sender.get_full_name() or self.sender.username} — {self.timestamp.strftime('%d.%m.%Y %H:%M')}"
 
@@ -127,6 +346,7 @@ class ProjectItem(models.Model):
     deadline = models.DateTimeField("Срок", null=True, blank=True)
     is_completed = models.BooleanField(default=False)
     order = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField("Изменено", auto_now=True, db_index=True)
 
     assignees = models.ManyToManyField(User, through="ProjectItemAssignee", related_name="project_items",
                                        verbose_name="Исполнители")
@@ -145,6 +365,27 @@ class ProjectItemAssignee(models.Model):
     class Meta:
         unique_together = ("item", "user")
 
+class DeadlineNotice(models.Model):
+    """Отправленное напоминание о сроке: не даёт планировщику слать его повторно"""
+    KIND_CHOICES = [
+        ('soon', 'Срок через 24 часа'),
+        ('overdue', 'Срок истёк'),
+    ]
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, null=True, blank=True, related_name="deadline_notices")
+    item = models.ForeignKey(ProjectItem, on_delete=models.CASCADE, null=True, blank=True,
+                             related_name="deadline_notices")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # срок, о котором напомнили: после переноса срока напоминание уйдёт снова
+    deadline = models.DateTimeField()
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = [("task", "kind", "deadline"), ("item", "kind", "deadline")]
+
+    def __str__(self):
+        return f"{self.task_id or self.item_id} / {self.kind} / {self.deadline:%Y-%m-%d %H:%M}"
+
+
 class ProjectMessage(models.Model):
     project = models.ForeignKey('Project', on_delete=models.CASCADE, related_name='messages', verbose_name="Проект")
     sender  = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Отправитель")
@@ -153,19 +394,24 @@ class ProjectMessage(models.Model):
 
     class Meta:
         ordering = ("timestamp",)
+        indexes = [models.Index(fields=["project", "timestamp"], name="tasks_projmsg_proj_ts_idx")]
 
     def __str__(self):
         return f"{self.project_id} / {self.sender} / {self.timestamp:%Y-%m-%d %H:%M}"
 
-class ProjectFile(models.Model):
+class ProjectFile(AttachmentMixin, models.Model):
     project = models.ForeignKey("Project", on_delete=models.CASCADE, related_name="files")
-    file     = models.FileField(upload_to="project_files/%Y/%m/%d/")
+    file     = models.FileField(upload_to="project_files/%Y/%m/%d/", max_length=255)
+    blob = models.ForeignKey(FileBlob, on_delete=models.PROTECT, null=True, blank=True, related_name="+")
+    original_name = models.CharField(max_length=255, blank=True)
+    size = models.BigIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    checksum = models.CharField(max_length=64, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['project', '-uploaded_at', '-id'], name='tasks_projfile_proj_up_idx')]
+
     def __str__(self):
         return self.file.name
-
-    @property
-    def filename(self):
-        return os.path.basename(self.file.name)
\ No newline at end of file
@@ -0,0 +1,116 @@
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+DEFAULT_KEYS = ('created_at', 'id')
+
+
+# ===== Курсорная (keyset) пагинация, по умолчанию по (created_at, id) =====
+def encode_cursor(obj, keys=DEFAULT_KEYS):
+    # obj — модель или dict из values(); isoformat сохраняет микросекунды
+    # (DjangoJSONEncoder их обрезает)
+    values = [obj[k] if isinstance(obj, dict) else getattr(obj, k) for k in keys]
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return urlsafe_base64_encode(raw.encode())
+
+
+def decode_cursor(cursor, keys=DEFAULT_KEYS):
+    """
+    Возвращает кортеж значений ключа или None, если курсор битый.
+    """
+    if not cursor:
+        return None
+    try:
+        values = json.loads(force_str(urlsafe_base64_decode(cursor)))
+        if not isinstance(values, list) or len(values) != len(keys):
+            return None
+        return tuple(datetime.fromisoformat(v) if isinstance(v, str) else v for v in values)
+    except (ValueError, TypeError):
+        return None
+
+
+def _keyset_filter(keys, values, op):
+    """
+    (k1 op v1) OR (k1 = v1 AND k2 op v2) OR ...
+    """
+    parts = []
+    for i, key in enumerate(keys):
+        eq = {k: v for k, v in zip(keys[:i], values[:i])}
+        parts.append(Q(**eq, **{f"{key}__{op}": values[i]}))
+    return reduce(or_, parts)
+
+
+def _typed(model, keys, values):
+    """
+    Значения курсора, приведённые к типам полей модели (аннотации — числа);
+    None, если курсор подделан: ['x', 1] вместо (created_at, id) — та же первая страница.
+    """
+    if values is None:
+        return None
+    typed = []
+    try:
+        for key, value in zip(keys, values):
+            try:
+                typed.append(model._meta.get_field(key).to_python(value))
+            except FieldDoesNotExist:
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    return None
+                typed.append(value)
+    except (ValidationError, TypeError, ValueError):
+        return None
+    return None if None in typed else tuple(typed)
+
+
+@dataclass
+class KeysetPage:
+    object_list: list = field(default_factory=list)
+    next_cursor: str = None
+    prev_cursor: str = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+
+def keyset_paginate(qs, after=None, before=None, page_size=50, keys=DEFAULT_KEYS):
+    """
+    Страница qs в порядке убывания keys (последний ключ должен быть уникальным).
+    after  — курсор последней строки предыдущей страницы (вперёд),
+    before — курсор первой строки следующей страницы (назад).
+    Стоимость запроса не зависит от номера страницы: WHERE по ключу + LIMIT.
+    """
+    after_key = _typed(qs.model, keys, decode_cursor(after, keys))
+    before_key = _typed(qs.model, keys, decode_cursor(before, keys))
+
+    if before_key:
+        qs = qs.filter(_keyset_filter(keys, before_key, 'gt'))
+        rows = list(qs.order_by(*keys)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        return KeysetPage(
+            object_list=rows,
+            next_cursor=encode_cursor(rows[-1], keys) if rows else None,
+            prev_cursor=encode_cursor(rows[0], keys) if rows and has_more else None,
+        )
+
+    if after_key:
+        qs = qs.filter(_keyset_filter(keys, after_key, 'lt'))
+    rows = list(qs.order_by(*[f"-{k}" for k in keys])[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    return KeysetPage(
+        object_list=rows,
+        next_cursor=encode_cursor(rows[-1], keys) if rows and has_more else None,
+        prev_cursor=encode_cursor(rows[0], keys) if rows and after_key else None,
+    )
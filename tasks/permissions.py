@@ -0,0 +1,83 @@
+from dataclasses import dataclass
+
+from .models import ProjectMember, TaskParticipant
+
+
+# ===== Права на задачу =====
+@dataclass(frozen=True)
+class TaskPermissions:
+    can_access: bool = False
+    can_complete: bool = False
+    can_upload_files: bool = False
+    can_edit: bool = False
+    can_delegate: bool = False
+
+    @classmethod
+    def _for(cls, user, task, role):
+        if task.creator_id == user.id:
+            return cls(True, True, True, True, True)
+        is_responsible = task.responsible_id == user.id
+        can_access = is_responsible or role is not None
+        return cls(
+            can_access=can_access,
+            can_complete=is_responsible or role in ('executor', 'responsible'),
+            can_upload_files=can_access,
+            # (1) Редактировать: Создатель или Наблюдатель
+            can_edit=role == 'observer',
+            # (2) Делегировать: Создатель, Ответственный, Исполнитель, Наблюдатель
+            can_delegate=is_responsible or role in ('executor', 'observer'),
+        )
+
+    @classmethod
+    def resolve(cls, user, task):
+        """
+        Все флаги из одной строки TaskParticipant (автору запрос не нужен).
+        """
+        role = None
+        if task.creator_id != user.id:
+            role = (TaskParticipant.objects.filter(task=task, user=user)
+                    .values_list('role', flat=True).first())
+        return cls._for(user, task, role)
+
+    @classmethod
+    def resolve_many(cls, user, tasks):
+        """
+        {task.pk: права} для пачки задач одним запросом к участникам.
+        """
+        ids = [t.pk for t in tasks if t.creator_id != user.id]
+        roles = dict(TaskParticipant.objects.filter(user=user, task_id__in=ids)
+                     .values_list('task_id', 'role')) if ids else {}
+        return {t.pk: cls._for(user, t, roles.get(t.pk)) for t in tasks}
+
+
+# ===== Права на проект =====
+@dataclass(frozen=True)
+class ProjectPermissions:
+    can_access: bool = False
+    can_edit: bool = False
+    can_upload_files: bool = False
+
+    @classmethod
+    def resolve(cls, user, project):
+        can_edit = project.creator_id == user.id or project.manager_id == user.id
+        can_access = can_edit or ProjectMember.objects.filter(project=project, user=user).exists()
+        # ровно как в задачах: любой имеющий доступ — может загружать
+        return cls(can_access=can_access, can_edit=can_edit, can_upload_files=can_access)
+
+
+def _memoized(request, attr, resolver, obj):
+    cache = request.__dict__.setdefault(attr, {})
+    if obj.pk not in cache:
+        cache[obj.pk] = resolver(request.user, obj)
+    return cache[obj.pk]
+
+
+def task_permissions(request, task):
+    """
+    Права текущего пользователя на задачу, один раз за запрос.
+    """
+    return _memoized(request, '_task_permissions', TaskPermissions.resolve, task)
+
+
+def project_permissions(request, project):
+    return _memoized(request, '_project_permissions', ProjectPermissions.resolve, project)
@@ -0,0 +1,164 @@
+"""
+Превью вложений: миниатюры картинок и первые строки таблиц (xlsx/csv).
+
+Строятся в общем пуле процессов (tasks/workers.py) после коммита загрузки —
+запрос загрузки только ставит задачу в очередь. Результат лежит на диске
+в media/previews/ под контрольной суммой содержимого, поэтому одинаковые
+файлы делят одно превью, а страница задачи строит URL без обращения к диску.
+
+Функции render_* выполняются в рабочих процессах: только stdlib, Pillow
+и openpyxl, без ORM и настроек Django.
+
+Для старых вложений и деплоя без пула — manage.py build_previews.
+"""
+import csv
+import json
+import os
+
+from django.core.files.storage import default_storage
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover
+    Image = None
+
+from .workers import submit
+
+PREVIEW_DIR = 'previews'
+THUMBNAIL_SIZE = (320, 320)
+PREVIEW_ROWS = 20
+PREVIEW_COLUMNS = 12
+PREVIEW_CELL_LENGTH = 80
+
+IMAGE_TYPES = {'image/png', 'image/jpeg', 'image/gif', 'image/webp', 'image/bmp'}
+TABLE_TYPES = {
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': 'xlsx',
+    'text/csv': 'csv',
+}
+
+
+def preview_kind(content_type):
+    """
+    'image' / 'table' или None, если превью для такого типа не строится.
+    """
+    if content_type in IMAGE_TYPES:
+        return 'image' if Image is not None else None
+    if content_type in TABLE_TYPES:
+        return 'table'
+    return None
+
+
+def preview_name(checksum, kind):
+    ext = 'jpg' if kind == 'image' else 'json'
+    return f'{PREVIEW_DIR}/{checksum[:2]}/{checksum}.{ext}'
+
+
+# ===== Рабочие процессы =====
+def _write_atomic(dest, write):
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = f'{dest}.{os.getpid()}.tmp'
+    try:
+        write(tmp)
+        os.replace(tmp, dest)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def render_thumbnail(src, dest):
+    with Image.open(src) as image:
+        image.draft('RGB', THUMBNAIL_SIZE)  # JPEG декодируется сразу в уменьшенном размере
+        image.thumbnail(THUMBNAIL_SIZE)
+        image = image.convert('RGB')
+        _write_atomic(dest, lambda path: image.save(path, 'JPEG', quality=80))
+
+
+def _clip(row):
+    return ['' if v is None else str(v)[:PREVIEW_CELL_LENGTH] for v in row[:PREVIEW_COLUMNS]]
+
+
+def _xlsx_rows(src):
+    from openpyxl import load_workbook
+
+    # read_only: листы читаются потоком, без загрузки всей книги в память
+    book = load_workbook(src, read_only=True, data_only=True)
+    try:
+        sheet = book.worksheets[0]
+        rows = [_clip(row) for _, row in zip(range(PREVIEW_ROWS), sheet.iter_rows(values_only=True))]
+        return sheet.title, rows
+    finally:
+        book.close()
+
+
+def _csv_rows(src):
+    for encoding in ('utf-8-sig', 'cp1251'):
+        try:
+            with open(src, newline='', encoding=encoding) as f:
+                sample = f.read(64 * 1024)
+                f.seek(0)
+                try:
+                    dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+                except csv.Error:
+                    dialect = csv.excel
+                rows = [_clip(row) for _, row in zip(range(PREVIEW_ROWS), csv.reader(f, dialect))]
+                return '', rows
+        except UnicodeDecodeError:
+            continue
+    return '', []
+
+
+def render_table(src, dest, fmt):
+    sheet, rows = _xlsx_rows(src) if fmt == 'xlsx' else _csv_rows(src)
+
+    def write(path):
+        with open(path, 'w', encoding='utf-8') as out:
+            json.dump({'sheet': sheet, 'rows': rows}, out, ensure_ascii=False)
+    _write_atomic(dest, write)
+
+
+def render_preview(src, dest, kind, fmt=None):
+    """
+    Точка входа рабочего процесса. Превью уже есть — ничего не делает.
+    """
+    if os.path.exists(dest):
+        return dest
+    if kind == 'image':
+        render_thumbnail(src, dest)
+    else:
+        render_table(src, dest, fmt)
+    return dest
+
+
+# ===== Очередь в веб-процессе =====
+def preview_job(f):
+    """
+    Аргументы render_preview для вложения или None, если превью не нужно / не построить.
+    """
+    kind = preview_kind(f.content_type)
+    if kind is None or not f.checksum:
+        return None
+    try:
+        src = default_storage.path(f.file.name)
+    except NotImplementedError:  # не файловое хранилище
+        return None
+    return src, default_storage.path(preview_name(f.checksum, kind)), kind, TABLE_TYPES.get(f.content_type)
+
+
+def enqueue_preview(f):
+    """
+    Поставить построение превью в пул (tasks/workers.py); не блокирует и не ждёт результата.
+    """
+    job = preview_job(f)
+    if job is not None:
+        submit(('preview', f.checksum), render_preview, *job)
+
+
+def read_table_preview(checksum):
+    """
+    {'sheet', 'rows'} из готового превью таблицы или None, если оно ещё не построено.
+    """
+    try:
+        with default_storage.open(preview_name(checksum, 'table'), 'rb') as f:
+            return json.loads(f.read())
+    except FileNotFoundError:
+        return None
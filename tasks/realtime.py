@@ -0,0 +1,215 @@
+"""
+Push-события для задач и проектов (Server-Sent Events поверх ASGI).
+
+Издатели (сигналы в tasks.signals) вызывают publish() из любого потока,
+подписчики — async-views task_events/project_events, по одному asyncio.Queue
+на соединение, поэтому тысячи простаивающих клиентов держит один event loop.
+
+Брокер выбирается настройкой TASKS_REALTIME_BROKER:
+  tasks.realtime.InProcessBroker — один процесс (uvicorn с одним воркером),
+  tasks.realtime.RedisBroker     — несколько воркеров/узлов (нужен пакет redis).
+"""
+import asyncio
+import json
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+HEARTBEAT_SECONDS = 15
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def task_channel(task_id):
+    return f"task:{task_id}"
+
+
+def project_channel(project_id):
+    return f"project:{project_id}"
+
+
+def message_event(message):
+    return {
+        'type': 'message',
+        'id': message.pk,
+        'sender': message.sender.get_full_name() or message.sender.username,
+        'content': message.content,
+        'timestamp': message.timestamp.isoformat(),
+    }
+
+
+def file_event(f):
+    return {'type': 'file', 'id': f.pk, 'name': f.filename, 'url': f.file.url}
+
+
+def status_event(task):
+    return {'type': 'status', 'is_completed': task.is_completed, 'responsible_id': task.responsible_id}
+
+
+# ===== Интерфейс брокера =====
+class Broker(ABC):
+    @abstractmethod
+    def publish(self, channel, event):
+        """
+        Отправить событие (dict, сериализуемый в JSON). Потокобезопасно, не блокирует.
+        """
+
+    @abstractmethod
+    def subscribe(self, channel):
+        """
+        Вернуть подписку: async context manager с корутиной get().
+        """
+
+
+# ===== Один процесс =====
+class _QueueSubscription:
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = None
+        self.queue = None
+
+    async def __aenter__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.broker._add(self.channel, self)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.broker._remove(self.channel, self)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def _deliver(self, event):
+        # медленный клиент не тормозит остальных: вытесняем самое старое событие
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+
+class InProcessBroker(Broker):
+    def __init__(self, **options):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def _add(self, channel, sub):
+        with self._lock:
+            self._subscribers[channel].add(sub)
+
+    def _remove(self, channel, sub):
+        with self._lock:
+            subs = self._subscribers.get(channel)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[channel]
+
+    def subscribe(self, channel):
+        return _QueueSubscription(self, channel)
+
+    def publish(self, channel, event):
+        with self._lock:
+            subs = list(self._subscribers.get(channel, ()))
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub._deliver, event)
+            except RuntimeError:
+                # event loop уже закрыт — соединение умерло
+                self._remove(channel, sub)
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._subscribers.get(channel, ()))
+            return sum(len(s) for s in self._subscribers.values())
+
+
+# ===== Несколько воркеров: Redis pub/sub =====
+class _RedisSubscription:
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.pubsub = None
+
+    async def __aenter__(self):
+        self.pubsub = self.broker.async_client().pubsub(ignore_subscribe_messages=True)
+        await self.pubsub.subscribe(self.broker.prefix + self.channel)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.pubsub.unsubscribe()
+        await self.pubsub.aclose()
+
+    async def get(self):
+        while True:
+            message = await self.pubsub.get_message(timeout=None)
+            if message and message['type'] == 'message':
+                return json.loads(message['data'])
+
+
+class RedisBroker(Broker):
+    def __init__(self, url='redis://localhost:6379/0', prefix='taskmanager:'):
+        self.url = url
+        self.prefix = prefix
+        self._sync = None
+        self._async = {}
+
+    def sync_client(self):
+        if self._sync is None:
+            import redis
+            self._sync = redis.Redis.from_url(self.url)
+        return self._sync
+
+    def async_client(self):
+        # клиент привязан к event loop, в котором создан
+        loop = asyncio.get_running_loop()
+        if loop not in self._async:
+            import redis.asyncio
+            self._async[loop] = redis.asyncio.Redis.from_url(self.url)
+        return self._async[loop]
+
+    def publish(self, channel, event):
+        self.sync_client().publish(self.prefix + channel, json.dumps(event, ensure_ascii=False))
+
+    def subscribe(self, channel):
+        return _RedisSubscription(self, channel)
+
+
+# ===== Брокер по настройкам =====
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                cls = import_string(getattr(settings, 'TASKS_REALTIME_BROKER', 'tasks.realtime.InProcessBroker'))
+                _broker = cls(**getattr(settings, 'TASKS_REALTIME_BROKER_OPTIONS', {}))
+    return _broker
+
+
+def publish(channel, event):
+    """
+    Публикация после коммита транзакции: подписчик не увидит незаписанных данных.
+    """
+    transaction.on_commit(lambda: get_broker().publish(channel, event))
+
+
+# ===== SSE-поток =====
+async def event_stream(channel, heartbeat=HEARTBEAT_SECONDS):
+    async with get_broker().subscribe(channel) as sub:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(sub.get(), heartbeat)
+            except asyncio.TimeoutError:
+                # комментарий держит соединение живым через прокси
+                yield ": ping\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
@@ -0,0 +1,240 @@
+"""
+Планировщик напоминаний о сроках задач и пунктов проектов.
+
+Долгоживущий процесс (manage.py run_deadline_scheduler) держит ближайшие сроки
+в куче, упорядоченной по времени срабатывания, и спит до ближайшего события:
+  soon    — за REMIND_BEFORE до срока, ответственному / исполнителям пункта;
+  overdue — в момент срока, им же плюс автору задачи / руководителю проекта.
+
+Таблица не пересканируется: при старте грузится окно сроков [сейчас − GRACE,
+сейчас + LOOKAHEAD), затем окно сдвигается вперёд, а правки подхватываются
+по индексу updated_at. Устаревшие записи кучи не удаляются, а отбрасываются
+при извлечении (срок в записи не совпадает с текущим). Отправленные
+напоминания пишутся в DeadlineNotice, поэтому рестарт не даёт дублей.
+"""
+import heapq
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import DeadlineNotice, ProjectItem, Task
+
+logger = logging.getLogger(__name__)
+
+REMIND_BEFORE = timedelta(hours=24)
+# окно заранее загруженных сроков
+LOOKAHEAD = timedelta(days=2)
+# просрочки старше этого при старте не рассылаются
+OVERDUE_GRACE = timedelta(days=1)
+# запас на транзакции, закоммиченные позже своего updated_at
+CHANGE_OVERLAP = timedelta(seconds=30)
+REFRESH_SECONDS = 60
+# повтор рассылки после ошибки почты/БД
+RETRY_DELAY = timedelta(minutes=5)
+
+TASK, ITEM = 'task', 'item'
+MODELS = {TASK: Task, ITEM: ProjectItem}
+
+
+class DeadlineScheduler:
+    def __init__(self, lookahead=LOOKAHEAD, refresh_seconds=REFRESH_SECONDS):
+        self.lookahead = lookahead
+        self.refresh_interval = timedelta(seconds=refresh_seconds)
+        # (fire_at, kind, target, pk, deadline)
+        self.heap = []
+        # (target, pk) -> актуальный срок незавершённой строки в окне
+        self.deadlines = {}
+        self.horizon = None
+        self.changed_since = None
+        self.next_refresh = None
+
+    # ===== Очередь =====
+    def _track(self, target, pk, deadline, is_completed, now):
+        key = (target, pk)
+        if (is_completed or deadline is None or deadline >= self.horizon
+                or deadline < now - OVERDUE_GRACE):
+            self.deadlines.pop(key, None)
+            return
+        if self.deadlines.get(key) == deadline:
+            return
+        self.deadlines[key] = deadline
+        if deadline > now:
+            heapq.heappush(self.heap, (max(deadline - REMIND_BEFORE, now), 'soon', target, pk, deadline))
+        heapq.heappush(self.heap, (deadline, 'overdue', target, pk, deadline))
+
+    def _load(self, qs, now):
+        for target, model in MODELS.items():
+            for pk, deadline, is_completed in (
+                    qs(model).values_list('pk', 'deadline', 'is_completed').iterator()):
+                self._track(target, pk, deadline, is_completed, now)
+
+    def start(self, now=None):
+        now = now or timezone.now()
+        self.horizon = now + self.lookahead
+        self.changed_since = now
+        self.next_refresh = now + self.refresh_interval
+        self._load(lambda m: m.objects.filter(
+            deadline__gte=now - OVERDUE_GRACE, deadline__lt=self.horizon, is_completed=False), now)
+
+    def refresh(self, now=None):
+        """
+        Сдвигает окно сроков вперёд и применяет изменённые с прошлого раза строки.
+        """
+        now = now or timezone.now()
+        new_horizon = now + self.lookahead
+        old_horizon, self.horizon = self.horizon, new_horizon
+        self._load(lambda m: m.objects.filter(
+            deadline__gte=old_horizon, deadline__lt=new_horizon, is_completed=False), now)
+
+        since, self.changed_since = self.changed_since - CHANGE_OVERLAP, now
+        self._load(lambda m: m.objects.filter(updated_at__gte=since), now)
+        self.next_refresh = now + self.refresh_interval
+
+    def pop_due(self, now=None):
+        """
+        Извлекает сработавшие записи, отбрасывая устаревшие.
+        """
+        now = now or timezone.now()
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            fire_at, kind, target, pk, deadline = heapq.heappop(self.heap)
+            if self.deadlines.get((target, pk)) != deadline:
+                continue
+            if kind == 'overdue':
+                self.deadlines.pop((target, pk), None)
+            due.append((kind, target, pk, deadline))
+        return due
+
+    def requeue(self, due, at):
+        for kind, target, pk, deadline in due:
+            self.deadlines[(target, pk)] = deadline
+            heapq.heappush(self.heap, (at, kind, target, pk, deadline))
+
+    def seconds_until_next(self, now=None):
+        now = now or timezone.now()
+        wake = self.next_refresh
+        if self.heap:
+            wake = min(wake, self.heap[0][0])
+        return max((wake - now).total_seconds(), 0)
+
+    # ===== Цикл =====
+    def run_once(self, now=None):
+        now = now or timezone.now()
+        if self.horizon is None:
+            self.start(now)
+        elif now >= self.next_refresh:
+            self.refresh(now)
+        due = self.pop_due(now)
+        try:
+            return send_reminders(due)
+        except Exception:
+            # письма не ушли, DeadlineNotice откатились — повторим позже
+            self.requeue(due, now + RETRY_DELAY)
+            raise
+
+    def run_forever(self, max_sleep=REFRESH_SECONDS):
+        while True:
+            try:
+                sent = self.run_once()
+                if sent:
+                    logger.info("Отправлено напоминаний о сроках: %s", sent)
+            except Exception:
+                # сбой БД или почты не должен останавливать планировщик
+                logger.exception("Ошибка планировщика напоминаний")
+            time.sleep(min(self.seconds_until_next(), max_sleep))
+
+
+# ===== Рассылка =====
+def _full_name(user):
+    return user.get_full_name() or user.username
+
+
+def _fetch(due):
+    """
+    Актуальные строки для сработавших записей: по одному запросу на модель.
+    Завершённые, удалённые и перенесённые с тех пор строки отсеиваются.
+    """
+    pks = defaultdict(set)
+    for kind, target, pk, deadline in due:
+        pks[target].add(pk)
+    tasks = Task.objects.filter(pk__in=pks[TASK], is_completed=False).select_related('creator', 'responsible')
+    items = (ProjectItem.objects.filter(pk__in=pks[ITEM], is_completed=False)
+             .select_related('project__manager', 'project__creator').prefetch_related('assignees'))
+    return {TASK: {t.pk: t for t in tasks}, ITEM: {i.pk: i for i in items}}
+
+
+def _recipients(kind, target, obj):
+    if target == TASK:
+        users = [obj.responsible or obj.creator]
+        if kind == 'overdue':
+            users.append(obj.creator)
+    else:
+        users = list(obj.assignees.all())
+        if kind == 'overdue' or not users:
+            users.append(obj.project.manager or obj.project.creator)
+    return {u for u in users if u is not None}
+
+
+def _line(kind, target, obj):
+    site = getattr(settings, 'TASKS_SITE_URL', '')
+    deadline = timezone.localtime(obj.deadline).strftime('%d.%m.%Y %H:%M')
+    status = 'срок истёк' if kind == 'overdue' else 'срок менее чем через 24 часа'
+    if target == TASK:
+        return f"Задача «{obj.title}» — {status} ({deadline}): {site}{reverse('task_detail', args=[obj.pk])}"
+    return (f"Пункт «{obj.title}» проекта «{obj.project.title}» — {status} ({deadline}): "
+            f"{site}{reverse('project_detail', args=[obj.project_id])}")
+
+
+def _already_sent(objects):
+    notices = DeadlineNotice.objects.filter(
+        Q(task_id__in=list(objects[TASK])) | Q(item_id__in=list(objects[ITEM]))
+    ).values_list('kind', 'task_id', 'item_id', 'deadline')
+    return {
+        (kind, TASK, task_id, deadline) if task_id else (kind, ITEM, item_id, deadline)
+        for kind, task_id, item_id, deadline in notices
+    }
+
+
+@transaction.atomic
+def send_reminders(due):
+    """
+    Одно письмо на получателя со всеми его сработавшими сроками,
+    все письма — через одно соединение почтового бэкенда. Возвращает число писем.
+    """
+    if not due:
+        return 0
+    objects = _fetch(due)
+    fields = {TASK: 'task_id', ITEM: 'item_id'}
+    sent = _already_sent(objects)
+
+    notices = []
+    lines = defaultdict(list)
+    for kind, target, pk, deadline in dict.fromkeys(due):
+        obj = objects[target].get(pk)
+        if obj is None or obj.deadline != deadline or (kind, target, pk, deadline) in sent:
+            continue
+        notices.append(DeadlineNotice(kind=kind, deadline=deadline, **{fields[target]: pk}))
+        for user in _recipients(kind, target, obj):
+            lines[user].append(_line(kind, target, obj))
+
+    DeadlineNotice.objects.bulk_create(notices, ignore_conflicts=True)
+
+    messages = [
+        EmailMessage(
+            subject=f"Сроки задач: {len(user_lines)}",
+            body=f"{_full_name(user)}, напоминание о сроках:\n\n" + "\n".join(user_lines),
+            to=[user.email],
+        )
+        for user, user_lines in lines.items() if user.email
+    ]
+    if messages:
+        get_connection().send_messages(messages)
+    return len(messages)
@@ -0,0 +1,280 @@
+import json
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.html import escapejs
+
+from .dashboard import DASHBOARD_CHARTS_CACHE_KEY, cached_for_dashboard
+from .models import Task, TaskDailyStats, TaskVisibility, UserTaskDailyStats
+
+# Поля задачи, от которых зависят агрегаты
+ROLLUP_FIELDS = ('created_at', 'completed_at', 'is_completed', 'deadline', 'responsible_id')
+STAT_FIELDS = ('created', 'completed', 'due', 'overdue')
+
+CHART_DAYS = 30
+CHART_AHEAD_DAYS = 14
+RESPONSIBLE_CHART_LIMIT = 10
+
+
+# ===== Инкрементальное обновление =====
+def _day(dt):
+    return timezone.localtime(dt).date() if timezone.is_aware(dt) else dt.date()
+
+
+def _is_late(values):
+    if not values['is_completed']:
+        return True
+    completed_at = values['completed_at']
+    return bool(completed_at and completed_at > values['deadline'])
+
+
+def task_contribution(values):
+    """
+    Вклад одной задачи в агрегаты: Counter{(day, responsible_id, поле): n}.
+    values — dict с полями ROLLUP_FIELDS (None — задачи нет).
+    """
+    c = Counter()
+    # агрегаты — по ответственным; задачи без ответственного в них не входят
+    if not values or values['responsible_id'] is None:
+        return c
+    resp = values['responsible_id']
+    if values['created_at']:
+        c[(_day(values['created_at']), resp, 'created')] += 1
+    if values['is_completed'] and values['completed_at']:
+        c[(_day(values['completed_at']), resp, 'completed')] += 1
+    if values['deadline']:
+        due_day = _day(values['deadline'])
+        c[(due_day, resp, 'due')] += 1
+        if _is_late(values):
+            c[(due_day, resp, 'overdue')] += 1
+    return c
+
+
+def task_rollup_values(task):
+    return {'id': task.pk, **{f: getattr(task, f) for f in ROLLUP_FIELDS}}
+
+
+def apply_rollup_delta(old_values, new_values):
+    """
+    Применяет разницу вкладов «до» и «после» сохранения задачи:
+    обычно это 0–3 UPDATE по уже существующим строкам.
+    """
+    apply_rollup_deltas([(old_values, new_values)])
+
+
+def _upsert(model, delta, key_fields):
+    """
+    delta — Counter{(*ключ, поле): n}; каждая строка model обновляется одним UPDATE.
+    """
+    rows = defaultdict(dict)
+    for (*key, field), n in delta.items():
+        if n:
+            rows[tuple(key)][field] = n
+
+    for key, fields in rows.items():
+        lookup = dict(zip(key_fields, key))
+        row = model.objects.filter(**lookup)
+        increments = {f: F(f) + n for f, n in fields.items()}
+        if row.update(**increments):
+            continue
+        try:
+            with transaction.atomic():
+                model.objects.create(**lookup, **fields)
+        except IntegrityError:
+            # строку успел создать параллельный запрос
+            row.update(**increments)
+
+
+def _for_user(user_id, contribution, sign=1):
+    return Counter({(user_id, *key): sign * n for key, n in contribution.items()})
+
+
+@transaction.atomic
+def apply_rollup_deltas(changes):
+    """
+    То же для пачки задач (массовые операции API): changes — [(old, new)],
+    вклады суммируются, и каждая строка агрегатов обновляется один раз.
+
+    Агрегаты пользователей меняются у тех, кому задача видна сейчас, поэтому
+    вызывать до синхронизации TaskVisibility: новых зрителей она добавит
+    сама, уже с новым вкладом (apply_visibility_deltas).
+    """
+    org, diffs = Counter(), {}
+    for old_values, new_values in changes:
+        diff = task_contribution(new_values)
+        diff.subtract(task_contribution(old_values))
+        org.update(diff)
+        # у новой задачи зрителей ещё нет
+        if old_values and any(diff.values()):
+            diffs[old_values['id']] = diff
+    _upsert(TaskDailyStats, org, ('day', 'responsible_id'))
+
+    if diffs:
+        per_user = Counter()
+        for task_id, user_id in TaskVisibility.objects.filter(task_id__in=diffs).values_list('task_id', 'user_id'):
+            per_user.update(_for_user(user_id, diffs[task_id]))
+        _upsert(UserTaskDailyStats, per_user, ('user_id', 'day', 'responsible_id'))
+
+
+@transaction.atomic
+def apply_visibility_deltas(added, removed, values):
+    """
+    Задача стала видна / перестала быть видна пользователю:
+    added / removed — [(task_id, user_id)], values — {task_id: task_rollup_values}.
+    """
+    per_user = Counter()
+    for pairs, sign in ((added, 1), (removed, -1)):
+        for task_id, user_id in pairs:
+            per_user.update(_for_user(user_id, task_contribution(values.get(task_id)), sign))
+    _upsert(UserTaskDailyStats, per_user, ('user_id', 'day', 'responsible_id'))
+
+
+# ===== Полная пересборка =====
+OVERDUE = Q(is_completed=False) | Q(completed_at__gt=F('deadline'))
+
+
+def _collect(rows, date_field, qs, keys, **aggregates):
+    """
+    GROUP BY (день date_field, *keys) с суммированием aggregates в rows[(day, *keys)].
+    """
+    grouped = (qs.annotate(day=TruncDate(date_field)).values('day', *keys)
+               .annotate(**aggregates).order_by())
+    for r in grouped:
+        for name in aggregates:
+            rows[(r['day'], *(r[k] for k in keys))][name] += r[name]
+
+
+@transaction.atomic
+def rebuild_task_rollups():
+    """
+    Пересчитывает TaskDailyStats и UserTaskDailyStats группировками по задачам
+    (для пользователей — через TaskVisibility). Возвращает число строк.
+    """
+    tasks = Task.objects.filter(responsible__isnull=False)
+    total = 0
+    # (модель, ключи группировки, поля модели для них)
+    for model, keys, fields in ((TaskDailyStats, ('responsible_id',), ('responsible_id',)),
+                                (UserTaskDailyStats, ('visibility__user', 'responsible_id'),
+                                 ('user_id', 'responsible_id'))):
+        rows = defaultdict(Counter)
+        _collect(rows, 'created_at', tasks, keys, created=Count('pk'))
+        _collect(rows, 'completed_at', tasks.filter(is_completed=True, completed_at__isnull=False),
+                 keys, completed=Count('pk'))
+        _collect(rows, 'deadline', tasks.filter(deadline__isnull=False), keys,
+                 due=Count('pk'), overdue=Count('pk', filter=OVERDUE))
+
+        model.objects.all().delete()
+        model.objects.bulk_create([model(day=day, **dict(zip(fields, key)), **counts)
+                                   for (day, *key), counts in rows.items()], batch_size=2000)
+        total += len(rows)
+    return total
+
+
+# ===== Данные графиков =====
+# Графики пользователя — по видимым ему задачам (как метрики дашборда), из
+# UserTaskDailyStats: окно CHART_DAYS + CHART_AHEAD_DAYS дней — несколько сотен строк.
+# TaskDailyStats — по всей организации, поэтому только для персонала.
+def _org_by_responsible(start, end):
+    return list(
+        TaskDailyStats.objects.filter(day__gte=start, day__lte=end, responsible__isnull=False)
+        .values('responsible_id').annotate(created=Sum('created'), completed=Sum('completed')).order_by()
+    )
+
+
+def _chart_series(user):
+    today = timezone.localdate()
+    start = today - timedelta(days=CHART_DAYS - 1)
+    days = [start + timedelta(days=i) for i in range(CHART_DAYS + CHART_AHEAD_DAYS)]
+
+    per_day, per_responsible = defaultdict(Counter), defaultdict(Counter)
+    for r in UserTaskDailyStats.objects.filter(user=user, day__gte=days[0], day__lte=days[-1]).values(
+            'day', 'responsible_id', *STAT_FIELDS):
+        per_day[r['day']].update({f: r[f] for f in STAT_FIELDS})
+        if r['day'] <= today:
+            per_responsible[r['responsible_id']].update({'created': r['created'], 'completed': r['completed']})
+    series = {f: [per_day[d][f] for d in days] for f in STAT_FIELDS}
+    past = CHART_DAYS
+    labels = [d.isoformat() for d in days]
+
+    if user.is_staff:
+        rows = _org_by_responsible(start, today)
+    else:
+        rows = [{'responsible_id': resp, 'created': c['created'], 'completed': c['completed']}
+                for resp, c in per_responsible.items() if c['created'] or c['completed']]
+    rows = sorted(rows, key=lambda r: (-r['completed'], -r['created']))[:RESPONSIBLE_CHART_LIMIT]
+    users = User.objects.in_bulk([r['responsible_id'] for r in rows])
+    names = [users[r['responsible_id']].get_full_name() or users[r['responsible_id']].username for r in rows]
+
+    return {
+        'timeline': {
+            'labels': labels[:past],
+            'created': series['created'][:past],
+            'completed': series['completed'][:past],
+        },
+        'responsible': {
+            'labels': names,
+            'created': [r['created'] for r in rows],
+            'completed': [r['completed'] for r in rows],
+        },
+        'deadline': {
+            'labels': labels,
+            'due': series['due'],
+            # просрочка имеет смысл только для прошедших дней
+            'overdue': series['overdue'][:past] + [0] * (len(days) - past),
+        },
+    }
+
+
+def chart_data(user, metrics):
+    series = cached_for_dashboard(DASHBOARD_CHARTS_CACHE_KEY.format(user.pk), lambda: _chart_series(user))
+    return {
+        'completion': {
+            'labels': ['Выполнено', 'В работе', 'Просрочено'],
+            'values': [metrics['completed_tasks'],
+                       metrics['in_progress_tasks'] - metrics['overdue_tasks'],
+                       metrics['overdue_tasks']],
+        },
+        **series,
+    }
+
+
+def _plotly(chart_id, traces, layout=None):
+    spec = json.dumps({
+        'data': traces,
+        'layout': {'margin': {'t': 10, 'b': 40, 'l': 40, 'r': 10}, 'height': 280, **(layout or {})},
+    }, ensure_ascii=False)
+    return (
+        f'<div id="{chart_id}"></div>'
+        f'<script>document.addEventListener("DOMContentLoaded",function(){{'
+        f'var s=JSON.parse("{escapejs(spec)}");'
+        f'Plotly.newPlot("{chart_id}",s.data,s.layout,{{displayModeBar:false,responsive:true}});}});</script>'
+    )
+
+
+def chart_html(data):
+    """
+    HTML для слотов *_chart в dashboard.html (plotly.js подключён в base.html).
+    """
+    c, t, r, d = data['completion'], data['timeline'], data['responsible'], data['deadline']
+    return {
+        'completion_chart': _plotly('completion-chart', [
+            {'type': 'pie', 'labels': c['labels'], 'values': c['values'], 'hole': 0.5},
+        ]),
+        'timeline_chart': _plotly('timeline-chart', [
+            {'type': 'scatter', 'name': 'Создано', 'x': t['labels'], 'y': t['created']},
+            {'type': 'scatter', 'name': 'Выполнено', 'x': t['labels'], 'y': t['completed']},
+        ]),
+        'responsible_chart': _plotly('responsible-chart', [
+            {'type': 'bar', 'name': 'Создано', 'x': r['labels'], 'y': r['created']},
+            {'type': 'bar', 'name': 'Выполнено', 'x': r['labels'], 'y': r['completed']},
+        ], {'barmode': 'group'}),
+        'deadline_chart': _plotly('deadline-chart', [
+            {'type': 'bar', 'name': 'Срок', 'x': d['labels'], 'y': d['due']},
+            {'type': 'bar', 'name': 'Просрочено', 'x': d['labels'], 'y': d['overdue']},
+        ], {'barmode': 'overlay'}),
+    }
@@ -0,0 +1,103 @@
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity,
+)
+from django.db import connection
+from django.db.models import Exists, F, FloatField, OuterRef, Q, Value
+from django.db.models.functions import Cast, Greatest
+
+from .models import AttachmentText, TaskFile
+
+# Конфигурация словаря PostgreSQL для полнотекстового поиска
+SEARCH_CONFIG = 'russian'
+
+
+def search_is_indexed():
+    """
+    Полнотекстовый поиск доступен только на PostgreSQL, на SQLite — icontains.
+    """
+    return connection.vendor == 'postgresql'
+
+
+def task_search_vector(responsible_name=''):
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(Value(responsible_name), weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def update_task_search_vector(task):
+    """
+    Пересчитывает search_vector одной задачи (вызывается из сигнала post_save).
+    """
+    if not search_is_indexed():
+        return
+    name = task.responsible.get_full_name() if task.responsible_id else ''
+    type(task).objects.filter(pk=task.pk).update(search_vector=task_search_vector(name))
+
+
+REBUILD_SQL = """
+    UPDATE tasks_task t SET search_vector =
+        setweight(to_tsvector(%(cfg)s, coalesce(t.title, '')), 'A') ||
+        setweight(to_tsvector(%(cfg)s, coalesce(
+            (SELECT u.first_name || ' ' || u.last_name FROM auth_user u WHERE u.id = t.responsible_id), ''
+        )), 'A') ||
+        setweight(to_tsvector(%(cfg)s, coalesce(t.description, '')), 'B')
+"""
+
+
+def rebuild_task_search_vectors(where='', params=None):
+    """
+    Массовый пересчёт одним UPDATE (команда rebuild_search_index, смена ФИО).
+    """
+    if not search_is_indexed():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(REBUILD_SQL + where, {'cfg': SEARCH_CONFIG, **(params or {})})
+        return cursor.rowcount
+
+
+def attachments_match(**lookup):
+    """
+    Есть вложение задачи, текст которого (AttachmentText, tasks/extraction.py) подходит под lookup.
+    """
+    texts = AttachmentText.objects.filter(**lookup).values('checksum')
+    return Exists(TaskFile.objects.filter(task=OuterRef('pk'), checksum__in=texts))
+
+
+def search_tasks(qs, query):
+    """
+    Фильтрует qs по строке поиска.
+    PostgreSQL: tsvector (GIN) + триграммы по теме (GIN gin_trgm_ops),
+    результат аннотирован search_rank. SQLite: icontains как раньше.
+    В обоих случаях ищется и по тексту вложений.
+    """
+    if not query:
+        return qs
+    if not search_is_indexed():
+        return qs.filter(
+            Q(title__icontains=query) |
+            Q(description__icontains=query) |
+            Q(responsible__first_name__icontains=query) |
+            Q(responsible__last_name__icontains=query) |
+            attachments_match(content__icontains=query)
+        )
+
+    sq = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    return qs.filter(
+        Q(search_vector=sq) | Q(title__trigram_word_similar=query) | attachments_match(search_vector=sq)
+    ).annotate(
+        search_rank=Cast(Greatest(
+            SearchRank(F('search_vector'), sq),
+            TrigramWordSimilarity(query, 'title'),
+        ), FloatField()),
+    )
+
+
+def search_pagination_keys(query):
+    """
+    Ключи keyset-пагинации: при ранжированном поиске сначала по релевантности.
+    """
+    if query and search_is_indexed():
+        return ('search_rank', 'created_at', 'id')
+    return ('created_at', 'id')
@@ -0,0 +1,114 @@
+"""
+Быстрое чтение списков API: строки из values() вместо модели + ModelSerializer
+на каждую строку, JSON — orjson (если установлен, иначе стандартный json).
+Формат ответа байт в байт совпадает с сериализатором и JSONRenderer DRF
+(benchmarks/api_serialization.py это проверяет).
+"""
+import json
+from datetime import timezone as dt_timezone
+
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import serializers
+
+from .pagination import DEFAULT_KEYS
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def dumps(data):
+    if orjson is not None:
+        content = orjson.dumps(data)
+    else:
+        content = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+    # как JSONRenderer: U+2028/U+2029 экранируются, чтобы ответ был валидным JS
+    return content.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+def _datetime_converter():
+    """
+    DateTimeField.to_representation: текущая зона, ISO 8601, UTC как 'Z'.
+    Зона берётся один раз на ответ; значения из БД уже в UTC не пересчитываются.
+    """
+    tz = timezone.get_current_timezone()
+    utc = getattr(tz, 'key', None) in ('UTC', 'Etc/UTC') or tz is dt_timezone.utc
+
+    def convert(value):
+        if value is None:
+            return None
+        if value.tzinfo is not None and not (utc and value.tzinfo is dt_timezone.utc):
+            value = value.astimezone(tz)
+        value = value.isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+# Поля, значение которых из values() уже готово к выдаче (None) или требует преобразования
+CONVERTERS = {
+    serializers.DateTimeField: _datetime_converter,
+    serializers.PrimaryKeyRelatedField: None,
+    serializers.IntegerField: None,
+    serializers.BooleanField: None,
+    serializers.CharField: None,
+}
+
+
+def value_columns(serializer):
+    """
+    [(ключ в ответе, поле для values(), конвертер или None)] в порядке полей
+    сериализатора или None, если есть поле, которое так не построить
+    (вложенное, метод, выбор из choices и т.п.).
+    """
+    columns = []
+    converters = {}
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        # подклассы (BigIntegerField, EmailField...) сериализуются как базовый тип,
+        # кроме чисел, которые DRF отдаёт строкой (COERCE_BIG_INT_TO_STRING)
+        base = next((cls for cls in type(field).__mro__ if cls in CONVERTERS), None)
+        if (base is None or getattr(field, 'coerce_to_string', False)
+                or '.' in field.source or field.source == '*'):
+            return None
+        factory = CONVERTERS[base]
+        if factory is not None and factory not in converters:
+            converters[factory] = factory()
+        columns.append((name, field.source, converters.get(factory)))
+    return columns
+
+
+def build_rows(columns, rows):
+    plain = [(name, source) for name, source, _ in columns]
+    converted = [(name, convert) for name, _, convert in columns if convert is not None]
+    result = []
+    for row in rows:
+        item = {name: row[source] for name, source in plain}
+        for name, convert in converted:
+            item[name] = convert(item[name])
+        result.append(item)
+    return result
+
+
+class FastListMixin:
+    """
+    list() через values(): применяется к JSON-ответам, когда все поля
+    сериализатора простые; иначе — обычный путь DRF.
+    """
+    fast_list = True
+
+    def list(self, request, *args, **kwargs):
+        columns = value_columns(self.get_serializer()) if self.fast_list else None
+        if columns is None or getattr(request.accepted_renderer, 'format', None) != 'json':
+            return super().list(request, *args, **kwargs)
+
+        keys = getattr(self, 'pagination_keys', DEFAULT_KEYS)
+        names = list(dict.fromkeys([source for _, source, _ in columns] + list(keys)))
+        queryset = self.filter_queryset(self.get_queryset()).values(*names)
+
+        page = self.paginate_queryset(queryset)
+        results = build_rows(columns, queryset if page is None else page)
+        data = results if page is None else self.paginator.get_paginated_data(results)
+        return HttpResponse(dumps(data), content_type='application/json')
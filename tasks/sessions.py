@@ -0,0 +1,61 @@
+"""
+Сессии: cached_db (чтение из кэша, БД — источник истины) без пустых записей.
+
+Кэш используется, только если CACHES['default'] общий для процессов
+(Redis, memcached, БД, файлы): в локальном кэше процесса выход или смена
+пароля в одном процессе не видны другим. Иначе — обычные db-сессии.
+Общий кэш в развёртывании — переменная TASKS_CACHE_URL (Taskmanager/settings.py).
+
+SessionMiddleware сохраняет сессию, если её пометили изменённой, даже когда
+данные те же (повторное присваивание того же значения, set_expiry с тем же
+сроком). Здесь такие сохранения схлопываются: запись в кэш и БД идёт только
+при реальном изменении данных по сравнению с загруженными.
+
+Флеш-сообщения сессию не пишут: MESSAGE_STORAGE по умолчанию хранит их в cookie.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+
+# кэши, которые живут в памяти одного процесса
+LOCAL_CACHE_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def cache_is_shared():
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+class SessionStore(CachedDBStore):
+    _loaded_digest = None
+
+    def _digest(self, data):
+        return hashlib.md5(self.serializer().dumps(data)).hexdigest()
+
+    def load(self):
+        data = super().load() if cache_is_shared() else DBStore.load(self)
+        self._loaded_digest = self._digest(data)
+        return data
+
+    def exists(self, session_key):
+        return super().exists(session_key) if cache_is_shared() else DBStore.exists(self, session_key)
+
+    def save(self, must_create=False):
+        if (not must_create and self.session_key and self._loaded_digest is not None
+                and self._digest(self._get_session(no_load=True)) == self._loaded_digest):
+            return
+        if cache_is_shared():
+            super().save(must_create=must_create)
+        else:
+            DBStore.save(self, must_create=must_create)
+        self._loaded_digest = self._digest(self._get_session(no_load=True))
+
+    def delete(self, session_key=None):
+        if cache_is_shared():
+            super().delete(session_key)
+        else:
+            DBStore.delete(self, session_key)
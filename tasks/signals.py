@@ -0,0 +1,144 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .attachments import enqueue_attachment_jobs, release_blob
+from .auth import invalidate_cached_user
+from .dashboard import invalidate_dashboards, task_audience
+from .fragments import bump_task_versions
+from .models import ProjectFile, ProjectMessage, Task, TaskFile, TaskMessage, TaskParticipant
+from .realtime import file_event, message_event, project_channel, publish, status_event, task_channel
+from .rollups import ROLLUP_FIELDS, apply_rollup_delta, task_rollup_values
+from .search import rebuild_task_search_vectors, update_task_search_vector
+from .visibility import add_participant_visibility, remove_participant_visibility, sync_task_visibility
+
+
+@receiver(pre_save, sender=Task)
+def task_before_save(sender, instance, raw=False, **kwargs):
+    # состояние до сохранения — для дельты суточных агрегатов
+    # и автор — для видимости
+    instance._rollup_old = (
+        Task.objects.filter(pk=instance.pk).values('id', *ROLLUP_FIELDS, 'creator_id').first() if instance.pk else None
+    )
+    if instance._rollup_old is not None and not raw:
+        # устаревший экземпляр не откатывает версию, поднятую сообщением или файлом:
+        # UPDATE пишет version = version, значение вернёт refresh в task_saved
+        instance.version = F('version')
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, **kwargs):
+    bump_task_versions([instance.pk])
+    instance.refresh_from_db(fields=['version'])
+    old = getattr(instance, '_rollup_old', None)
+    # агрегаты — у прежних зрителей; новым вклад добавит синхронизация видимости
+    apply_rollup_delta(old, task_rollup_values(instance))
+    # любой путь записи (views, API, админка, ORM) — видимость до сброса дашбордов
+    if old is None or (old['creator_id'], old['responsible_id']) != (instance.creator_id, instance.responsible_id):
+        sync_task_visibility(instance)
+    update_task_search_vector(instance)
+    invalidate_dashboards(task_audience(instance))
+    if old and (old['is_completed'] != instance.is_completed or old['responsible_id'] != instance.responsible_id):
+        publish(task_channel(instance.pk), status_event(instance))
+
+
+@receiver(pre_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    invalidate_dashboards(task_audience(instance))
+    # вклад — по строке в БД: экземпляр мог устареть (массовые операции пишут мимо него)
+    apply_rollup_delta(Task.objects.filter(pk=instance.pk).values('id', *ROLLUP_FIELDS).first(), None)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    invalidate_cached_user(instance.pk)
+    if created or (update_fields and not {'first_name', 'last_name', 'username'} & set(update_fields)):
+        return
+    # ФИО ответственного входит в search_vector его задач
+    rebuild_task_search_vectors("WHERE t.responsible_id = %(user_id)s", {'user_id': instance.pk})
+    # имя показывается в кэшированных строках списка и панели участников
+    bump_task_versions(list(
+        Task.objects.filter(Q(responsible=instance) | Q(participants__user=instance))
+        .values_list('pk', flat=True).distinct()
+    ))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+# ===== Push-события (tasks.realtime) =====
+@receiver(post_save, sender=TaskMessage)
+def task_message_created(sender, instance, created, **kwargs):
+    bump_task_versions([instance.task_id])
+    if created:
+        publish(task_channel(instance.task_id), message_event(instance))
+
+
+@receiver(post_save, sender=ProjectMessage)
+def project_message_created(sender, instance, created, **kwargs):
+    if created:
+        publish(project_channel(instance.project_id), message_event(instance))
+
+
+@receiver(post_save, sender=TaskFile)
+def task_file_created(sender, instance, created, **kwargs):
+    if created:
+        publish(task_channel(instance.task_id), file_event(instance))
+        transaction.on_commit(lambda: enqueue_attachment_jobs(instance))
+        # число файлов — часть ответа API: сдвигаем updated_at, чтобы сменился ETag
+        bump_task_versions([instance.task_id], updated_at=timezone.now())
+
+
+@receiver(post_save, sender=ProjectFile)
+def project_file_created(sender, instance, created, **kwargs):
+    if created:
+        publish(project_channel(instance.project_id), file_event(instance))
+        transaction.on_commit(lambda: enqueue_attachment_jobs(instance))
+
+
+@receiver(post_delete, sender=TaskFile)
+@receiver(post_delete, sender=ProjectFile)
+def attachment_deleted(sender, instance, **kwargs):
+    # общий файл удаляется вместе с последним вложением, которое на него ссылается
+    if instance.blob_id:
+        release_blob(instance.blob_id)
+
+
+# ===== Видимость (tasks.visibility) =====
+@receiver(post_save, sender=TaskParticipant)
+def participant_saved(sender, instance, created, **kwargs):
+    if created:
+        add_participant_visibility(instance.task_id, instance.user_id)
+    else:
+        sync_task_visibility(instance.task)  # мог смениться пользователь
+
+
+@receiver(post_delete, sender=TaskParticipant)
+def participant_deleted(sender, instance, origin=None, **kwargs):
+    # при удалении задачи (task.delete() или queryset.delete()) видимость и агрегаты сняты в task_deleted
+    if isinstance(origin, Task) or getattr(origin, 'model', None) is Task:
+        return
+    remove_participant_visibility(instance.task_id, instance.user_id)
+
+
+# ===== Версии фрагментов (tasks.fragments) =====
+@receiver(post_delete, sender=TaskMessage)
+def task_related_changed(sender, instance, **kwargs):
+    bump_task_versions([instance.task_id])
+
+
+@receiver(post_save, sender=TaskParticipant)
+@receiver(post_delete, sender=TaskParticipant)
+def task_participants_changed(sender, instance, **kwargs):
+    # my_role в ответе API: сдвигаем и updated_at (Last-Modified задачи)
+    bump_task_versions([instance.task_id], updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=TaskFile)
+def task_file_deleted(sender, instance, **kwargs):
+    bump_task_versions([instance.task_id], updated_at=timezone.now())
@@ -0,0 +1,62 @@
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+SYNC_BATCH_SIZE = 2000
+
+
+@dataclass
+class SyncResult:
+    added: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    changed: list = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+
+@transaction.atomic
+def sync_rows(queryset, want, key_fields, value_field=None):
+    """
+    Приводит строки queryset к want по разнице с текущими строками
+    (участники задачи, исполнители пунктов проекта, TaskVisibility).
+
+    want       — {ключ: значение}; ключ — кортеж значений key_fields
+                 (например ('task_id', 'user_id')), значение — value_field или None.
+    Не больше трёх запросов на запись: DELETE лишних, INSERT новых,
+    bulk_update изменившихся. Неизменённые строки не трогаются.
+    Возвращает SyncResult с ключами добавленных / удалённых / изменённых строк.
+    """
+    model = queryset.model
+    columns = ('pk', *key_fields, value_field) if value_field else ('pk', *key_fields)
+    current = {}
+    for row in queryset.values_list(*columns):
+        key = tuple(row[1:len(key_fields) + 1])
+        current[key] = (row[0], row[-1] if value_field else None)
+
+    result = SyncResult()
+    stale = []
+    for key, (pk, _) in current.items():
+        if key not in want:
+            stale.append(pk)
+            result.removed.append(key)
+
+    new, updated = [], []
+    for key, value in want.items():
+        values = dict(zip(key_fields, key))
+        if value_field:
+            values[value_field] = value
+        if key not in current:
+            new.append(model(**values))
+            result.added.append(key)
+        elif value_field and current[key][1] != value:
+            updated.append(model(pk=current[key][0], **values))
+            result.changed.append(key)
+
+    if stale:
+        model.objects.filter(pk__in=stale).delete()
+    if new:
+        model.objects.bulk_create(new, ignore_conflicts=True, batch_size=SYNC_BATCH_SIZE)
+    if updated:
+        model.objects.bulk_update(updated, [value_field], batch_size=SYNC_BATCH_SIZE)
+    return result
@@ -1,5 +1,7 @@
 from django import template
 
+from tasks.fragments import cached_fragment
+
 register = template.Library()
 
 @register.filter
@@ -14,3 +16,28 @@ def user_has_role(participants, user):
     Проверяет, есть ли у пользователя роль в задаче (например, исполнитель, наблюдатель).
     """
     return any(p.user == user for p in participants)
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, parts):
+        self.nodelist = nodelist
+        self.parts = parts
+
+    def render(self, context):
+        name, *parts = [part.resolve(context) for part in self.parts]
+        return cached_fragment(name, parts, lambda: self.nodelist.render(context))
+
+
+@register.tag
+def fragment(parser, token):
+    """
+    {% fragment 'task-row' t.pk t.version t.my_role %}...{% endfragment %}
+    Отрисованный блок кэшируется в tasks.fragments по имени и значениям ключа;
+    в ключ должна входить версия задачи и всё, от чего ещё зависит блок.
+    """
+    bits = token.split_contents()[1:]
+    if not bits:
+        raise template.TemplateSyntaxError("'fragment' ожидает имя фрагмента и значения ключа")
+    nodelist = parser.parse(('endfragment',))
+    parser.delete_first_token()
+    return FragmentNode(nodelist, [parser.compile_filter(bit) for bit in bits])
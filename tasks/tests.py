@@ -1,3 +1,1041 @@
-from django.test import TestCase
+import csv
+import hashlib
+import io
+import itertools
+import re
+import tempfile
+from collections import defaultdict
+from unittest import mock
+from datetime import datetime, timedelta, timezone as dt_timezone
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core import mail
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection
+from django.db.models import Case, FloatField, Value, When
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    DeadlineNotice, FileBlob, Project, ProjectItem, ProjectItemAssignee, ProjectMember, ProjectMessage, Task,
+    TaskDailyStats, TaskFile, TaskMessage, TaskParticipant, TaskVisibility, UserTaskDailyStats,
+)
+from .api import TaskViewSet
+from .attachments import save_attachment
+from .bulk import bulk_delegate_tasks
+from .dashboard import DASHBOARD_CACHE_KEY, dashboard_metrics
+from .export import EXPORT_COLUMNS, XLSX_CHUNK_SIZE
+from .extraction import extract_text, save_text, text_job
+from .fragments import FragmentCache, get_fragment_cache
+from .pagination import DEFAULT_KEYS, decode_cursor, encode_cursor, keyset_paginate
+from .permissions import TaskPermissions, task_permissions
+from .previews import preview_job, render_preview
+from .realtime import Broker, InProcessBroker
+from .reminders import DeadlineScheduler
+from .rollups import rebuild_task_rollups
+from .search import search_pagination_keys
+from .sessions import SessionStore
+from .serialization import FastListMixin
+from .sync import sync_rows
+from .views import TASK_CHAT_PAGE_SIZE
+from .visibility import rebuild_task_visibility
+
+# Таблицы, которые в проде растут без ограничений: по ним полный скан недопустим
+LARGE_TABLES = (
+    'tasks_task', 'tasks_taskparticipant', 'tasks_taskvisibility',
+    'tasks_taskmessage', 'tasks_projectmessage',
+)
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('EXPLAIN ' + sql)
+        else:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+def full_scans(plan):
+    """
+    Большие таблицы, которые план читает целиком.
+    PostgreSQL: "Seq Scan on <table>", SQLite: "SCAN <table>" без индекса.
+    """
+    found = []
+    for line in plan.splitlines():
+        if connection.vendor == 'postgresql':
+            match = re.search(r'Seq Scan on (\w+)', line)
+        else:
+            match = re.match(r'\s*SCAN (\w+)', line)
+            if match and 'INDEX' in line:
+                match = None
+        if match and match.group(1) in LARGE_TABLES:
+            found.append(match.group(1))
+    return found
+
+
+class QueryPlanTests(TestCase):
+    """
+    Снимает EXPLAIN всех SELECT-запросов основных страниц на крупных данных
+    и падает, если какой-то из них читает большую таблицу последовательным сканом.
+    """
+    USERS = 40
+    TASKS_PER_USER = 150
+
+    @classmethod
+    def setUpTestData(cls):
+        users = User.objects.bulk_create([User(username=f'u{i}') for i in range(cls.USERS)])
+        cls.user = users[0]
+        cls.user.set_password('p')
+        cls.user.save()
+
+        now = timezone.now()
+        tasks = Task.objects.bulk_create([
+            Task(title=f'Задача {u.pk}-{i}', description='описание', creator=u,
+                 responsible=users[(n + i) % cls.USERS], deadline=now + timedelta(hours=i - 50),
+                 is_completed=i % 4 == 0)
+            for n, u in enumerate(users) for i in range(cls.TASKS_PER_USER)
+        ])
+        TaskParticipant.objects.bulk_create([
+            TaskParticipant(task=t, user=users[(n * 7 + 3) % cls.USERS], role='observer')
+            for n, t in enumerate(tasks) if t.creator_id != users[(n * 7 + 3) % cls.USERS].pk
+        ], ignore_conflicts=True)
+        TaskMessage.objects.bulk_create([
+            TaskMessage(task=t, sender=t.creator, content='сообщение')
+            for t in tasks[::3] for _ in range(3)
+        ])
+        rebuild_task_visibility()
+
+        cls.task = Task.objects.filter(creator=cls.user).first()
+        cls.project = Project.objects.create(title='Проект', creator=cls.user, manager=cls.user)
+        projects = Project.objects.bulk_create([Project(title=f'P{i}', creator=users[i % cls.USERS]) for i in range(200)])
+        ProjectMember.objects.bulk_create([ProjectMember(project=p, user=users[1]) for p in projects])
+        ProjectMessage.objects.bulk_create([
+            ProjectMessage(project=p, sender=users[1], content='сообщение') for p in projects for _ in range(10)
+        ])
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def assertNoFullScans(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        plans = []
+        for query in ctx.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            plan = explain(sql)
+            plans.append(plan)
+            self.assertEqual(full_scans(plan), [], f'{url}\n{sql}\n{plan}')
+        return plans
+
+    def test_task_list_tabs(self):
+        for tab in ('creator', 'responsible', 'participant', 'completed'):
+            self.assertNoFullScans(reverse('task_list') + f'?tab={tab}')
+
+    def test_task_list_date_filter(self):
+        self.assertNoFullScans(reverse('task_list') + '?tab=completed&date_from=2020-01-01')
+
+    def test_dashboard(self):
+        self.assertNoFullScans(reverse('dashboard'))
+
+    def test_task_detail(self):
+        self.assertNoFullScans(reverse('task_detail', args=[self.task.pk]))
+
+    def test_project_detail(self):
+        self.assertNoFullScans(reverse('project_detail', args=[self.project.pk]))
+
+
+class DeadlineSchedulerTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.creator = User.objects.create_user('creator', email='creator@example.com')
+        self.responsible = User.objects.create_user('resp', email='resp@example.com')
+        self.task = Task.objects.create(title='Отчёт', description='', creator=self.creator,
+                                        responsible=self.responsible, deadline=self.now + timedelta(hours=30))
+
+    def run_at(self, scheduler, hours):
+        mail.outbox = []
+        scheduler.run_once(self.now + timedelta(hours=hours))
+        return {addr: m.body for m in mail.outbox for addr in m.to}
+
+    def test_soon_then_overdue_with_escalation(self):
+        scheduler = DeadlineScheduler(refresh_seconds=60)
+        self.assertEqual(self.run_at(scheduler, 0), {})
+        sent = self.run_at(scheduler, 7)
+        self.assertEqual(list(sent), ['resp@example.com'])
+        self.assertIn('Отчёт', sent['resp@example.com'])
+        self.assertEqual(self.run_at(scheduler, 8), {})
+        self.assertEqual(set(self.run_at(scheduler, 31)), {'resp@example.com', 'creator@example.com'})
+
+    def test_changed_rows_are_picked_up(self):
+        scheduler = DeadlineScheduler(refresh_seconds=60)
+        self.run_at(scheduler, 0)
+        self.task.deadline = self.now + timedelta(hours=40)
+        self.task.save()
+        self.assertEqual(self.run_at(scheduler, 7), {})
+        self.task.is_completed = True
+        self.task.save(update_fields=['is_completed'])
+        self.assertEqual(self.run_at(scheduler, 41), {})
+
+    def test_project_items_and_batching(self):
+        project = Project.objects.create(title='Проект', creator=self.creator, manager=self.creator)
+        item = ProjectItem.objects.create(project=project, title='Смета', deadline=self.now + timedelta(hours=2))
+        ProjectItemAssignee.objects.create(item=item, user=self.responsible)
+        Task.objects.create(title='Счёт', description='', creator=self.creator, responsible=self.responsible,
+                            deadline=self.now + timedelta(hours=3))
+
+        sent = self.run_at(DeadlineScheduler(), 0)
+        self.assertEqual(list(sent), ['resp@example.com'])
+        self.assertIn('Смета', sent['resp@example.com'])
+        self.assertIn('Счёт', sent['resp@example.com'])
+
+    def test_restart_does_not_resend(self):
+        self.run_at(DeadlineScheduler(), 7)
+        self.assertEqual(self.run_at(DeadlineScheduler(), 8), {})
+        self.assertEqual(DeadlineNotice.objects.count(), 1)
+
+
+class TaskPermissionTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user('creator')
+        self.responsible = User.objects.create_user('responsible')
+        self.executor = User.objects.create_user('executor')
+        self.observer = User.objects.create_user('observer')
+        self.stranger = User.objects.create_user('stranger')
+        self.task = Task.objects.create(title='Т', description='', creator=self.creator,
+                                        responsible=self.responsible, deadline=timezone.now())
+        TaskParticipant.objects.create(task=self.task, user=self.executor, role='executor')
+        TaskParticipant.objects.create(task=self.task, user=self.observer, role='observer')
+
+    def test_resolve(self):
+        everything = TaskPermissions(True, True, True, True, True)
+        expected = {
+            self.creator: everything,
+            self.responsible: TaskPermissions(can_access=True, can_complete=True, can_upload_files=True,
+                                              can_delegate=True),
+            self.executor: TaskPermissions(can_access=True, can_complete=True, can_upload_files=True,
+                                           can_delegate=True),
+            self.observer: TaskPermissions(can_access=True, can_upload_files=True, can_edit=True,
+                                           can_delegate=True),
+            self.stranger: TaskPermissions(),
+        }
+        with self.assertNumQueries(0):
+            self.assertEqual(TaskPermissions.resolve(self.creator, self.task), everything)
+        for user, perms in expected.items():
+            with self.subTest(user=user.username):
+                self.assertEqual(TaskPermissions.resolve(user, self.task), perms)
+                self.assertEqual(TaskPermissions.resolve_many(user, [self.task]), {self.task.pk: perms})
+
+    def test_task_detail_resolves_once(self):
+        self.client.force_login(self.observer)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(reverse('task_detail', args=[self.task.pk])).status_code, 200)
+        role_lookups = [q['sql'] for q in ctx.captured_queries
+                        if 'SELECT "tasks_taskparticipant"."role" AS "role" FROM' in q['sql']]
+        self.assertEqual(len(role_lookups), 1, role_lookups)
+
+        request = RequestFactory().get('/')
+        request.user = self.observer
+        with self.assertNumQueries(1):
+            task_permissions(request, self.task)
+            self.assertTrue(task_permissions(request, self.task).can_edit)
+
+        self.client.force_login(self.stranger)
+        self.assertEqual(self.client.get(reverse('task_detail', args=[self.task.pk])).status_code, 403)
+
+    def test_visible_to_annotations(self):
+        other = Task.objects.create(title='Чужая', description='', creator=self.stranger,
+                                    responsible=self.stranger, deadline=timezone.now() - timedelta(days=1))
+        roles = {
+            self.creator: 'Создатель', self.responsible: 'Ответственный',
+            self.executor: 'Исполнитель', self.observer: 'Наблюдатель',
+        }
+        for user, role in roles.items():
+            with self.subTest(user=user.username):
+                rows = list(Task.objects.visible_to(user).values_list('pk', 'my_role', 'files_count'))
+                self.assertEqual(rows, [(self.task.pk, role, 0)])
+
+        row = Task.objects.visible_to(self.stranger).get()
+        self.assertEqual((row.pk, row.my_role, row.deadline_status), (other.pk, 'Создатель', 'overdue'))
+
+
+class SyncRowsTests(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(f'u{i}') for i in range(3)]
+        self.task = Task.objects.create(title='Т', description='', creator=self.users[0],
+                                        responsible=self.users[0], deadline=timezone.now())
+        self.qs = TaskParticipant.objects.filter(task=self.task)
+
+    def sync(self, roles):
+        want = {(self.task.pk, self.users[i].pk): role for i, role in roles.items()}
+        return sync_rows(self.qs, want, ('task_id', 'user_id'), 'role')
+
+    def rows(self):
+        return dict(self.qs.values_list('user_id', 'role'))
+
+    def test_insert_change_remove(self):
+        u0, u1, u2 = (u.pk for u in self.users)
+        result = self.sync({1: 'executor', 2: 'observer'})
+        self.assertTrue(result)
+        self.assertEqual(sorted(result.added), [(self.task.pk, u1), (self.task.pk, u2)])
+        self.assertEqual(self.rows(), {u1: 'executor', u2: 'observer'})
+        kept = self.qs.get(user_id=u1).pk
+
+        result = self.sync({1: 'observer', 2: 'observer'})
+        self.assertEqual((result.added, result.changed, result.removed), ([], [(self.task.pk, u1)], []))
+        self.assertEqual(self.rows(), {u1: 'observer', u2: 'observer'})
+        self.assertEqual(self.qs.get(user_id=u1).pk, kept)  # строка обновлена, а не пересоздана
+
+        result = self.sync({1: 'observer'})
+        self.assertEqual((result.added, result.changed, result.removed), ([], [], [(self.task.pk, u2)]))
+        self.assertEqual(self.rows(), {u1: 'observer'})
+
+    def test_noop_resync_writes_nothing(self):
+        self.sync({1: 'executor', 2: 'observer'})
+        with CaptureQueriesContext(connection) as ctx:
+            result = self.sync({1: 'executor', 2: 'observer'})
+        self.assertFalse(result)
+        # только чтение текущих строк (и savepoint от transaction.atomic)
+        self.assertEqual([q['sql'].split()[0] for q in ctx.captured_queries], ['SAVEPOINT', 'SELECT', 'RELEASE'])
+
+    def test_without_value_field(self):
+        project = Project.objects.create(title='Проект', creator=self.users[0], manager=self.users[0])
+        item = ProjectItem.objects.create(project=project, title='Смета', deadline=timezone.now())
+        qs = ProjectItemAssignee.objects.filter(item__project=project)
+        want = {(item.pk, u.pk): None for u in self.users[:2]}
+        self.assertEqual(len(sync_rows(qs, want, ('item_id', 'user_id')).added), 2)
+        self.assertFalse(sync_rows(qs, want, ('item_id', 'user_id')))
+        self.assertEqual(sync_rows(qs, {}, ('item_id', 'user_id')).removed, list(want))
+        self.assertFalse(qs.exists())
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('a')
+        now = timezone.now()
+        self.tasks = [Task.objects.create(title=f'Задача {i}', description='', creator=self.user,
+                                          responsible=self.user, deadline=now) for i in range(7)]
+        # у пар задач одинаковый created_at — порядок внутри пары решает id,
+        # граница страниц (по 3) проходит внутри пары
+        for i, task in enumerate(self.tasks):
+            Task.objects.filter(pk=task.pk).update(created_at=now - timedelta(hours=i // 2))
+        self.expected = list(Task.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def walk(self, qs, keys=DEFAULT_KEYS):
+        page = keyset_paginate(qs, page_size=3, keys=keys)
+        pages = [page]
+        while page.has_next:
+            page = keyset_paginate(qs, after=page.next_cursor, page_size=3, keys=keys)
+            pages.append(page)
+        return pages
+
+    def test_forward_and_back(self):
+        first, second, last = self.walk(Task.objects.all())
+        self.assertEqual([t.pk for p in (first, second, last) for t in p.object_list], self.expected)
+        self.assertEqual([len(p.object_list) for p in (first, second, last)], [3, 3, 1])
+        self.assertFalse(first.has_previous)
+        self.assertFalse(last.has_next)
+
+        back = keyset_paginate(Task.objects.all(), before=last.prev_cursor, page_size=3)
+        self.assertEqual([t.pk for t in back.object_list], self.expected[3:6])
+        back = keyset_paginate(Task.objects.all(), before=back.prev_cursor, page_size=3)
+        self.assertEqual([t.pk for t in back.object_list], self.expected[:3])
+        self.assertFalse(back.has_previous)
+        self.assertTrue(back.has_next)
+
+    def test_invalid_cursor_gives_first_page(self):
+        first = keyset_paginate(Task.objects.all(), page_size=3)
+        forged = [encode_cursor({'created_at': 1, 'id': 1}), encode_cursor({'created_at': 'вчера', 'id': 'x'}),
+                  encode_cursor({'created_at': None, 'id': 1})]
+        for cursor in ('мусор', 'W10', encode_cursor({'id': 1}, ('id',)), *forged):
+            page = keyset_paginate(Task.objects.all(), after=cursor, page_size=3)
+            self.assertEqual(page.object_list, first.object_list)
+            self.assertFalse(page.has_previous)
+        self.assertIsNone(decode_cursor('мусор'))
+
+    def test_ranked_search_keys(self):
+        with mock.patch('tasks.search.search_is_indexed', return_value=True):
+            keys = search_pagination_keys('отчёт')
+        self.assertEqual(keys, ('search_rank', 'created_at', 'id'))
+        self.assertEqual(search_pagination_keys(''), DEFAULT_KEYS)
+
+        # релевантность одинакова у нескольких задач — дальше (created_at, id)
+        ranks = {task.pk: float(i % 3) / 2 for i, task in enumerate(self.tasks)}
+        qs = Task.objects.annotate(search_rank=Case(
+            *[When(pk=pk, then=Value(rank)) for pk, rank in ranks.items()], output_field=FloatField(),
+        ))
+        expected = sorted(self.expected, key=lambda pk: -ranks[pk])
+        pages = self.walk(qs, keys)
+        self.assertEqual([t.pk for p in pages for t in p.object_list], expected)
+        self.assertEqual(decode_cursor(pages[0].next_cursor, keys)[0], ranks[expected[2]])
+
+
+class ChatPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('a')
+        self.task = Task.objects.create(title='Т', description='', creator=self.user, responsible=self.user,
+                                        deadline=timezone.now())
+        TaskMessage.objects.bulk_create([TaskMessage(task=self.task, sender=self.user, content=f'Сообщение {i}')
+                                         for i in range(TASK_CHAT_PAGE_SIZE * 2 + 1)])
+        # все сообщения в одну и ту же секунду: порядок держится на id
+        TaskMessage.objects.update(timestamp=timezone.now())
+        self.ids = list(TaskMessage.objects.order_by('id').values_list('id', flat=True))
+        self.client.force_login(self.user)
+
+    def test_older_messages_cursor(self):
+        response = self.client.get(reverse('task_detail', args=[self.task.pk]))
+        seen = [m.id for m in response.context['task_messages']]
+        self.assertEqual(seen, self.ids[-TASK_CHAT_PAGE_SIZE:])
+
+        url = reverse('task_messages', args=[self.task.pk])
+        pages = []
+        while response.context['has_older']:
+            self.assertContains(response, f'{url}?before={response.context["oldest_id"]}')
+            response = self.client.get(url, {'before': response.context['oldest_id']})
+            pages.append([m.id for m in response.context['task_messages']])
+        self.assertEqual([len(p) for p in pages], [TASK_CHAT_PAGE_SIZE, 1])
+        self.assertEqual(sum(reversed(pages), []) + seen, self.ids)
+
+        self.assertEqual(self.client.get(url, {'after': self.ids[-1]}).status_code, 204)
+        self.assertEqual(self.client.get(url, {'before': 'x'}).status_code, 400)
+
+    def test_api_messages_with_same_timestamp(self):
+        data = self.client.get('/api/messages/', {'task': self.task.pk, 'page_size': 3}).json()
+        ids = [row['id'] for row in data['results']]
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            ids += [row['id'] for row in data['results']]
+        self.assertEqual(ids, self.ids[::-1])
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('a')
+        self.other = User.objects.create_user('b', first_name='Иван', last_name='Петров')
+        deadline = datetime(2026, 3, 1, 9, 30, tzinfo=dt_timezone.utc)  # в выгрузке — как хранится в БД
+        Task.objects.create(title='Первая', description='Описание', creator=self.user, responsible=self.other,
+                            deadline=deadline)
+        Task.objects.create(title='Вторая', description='', creator=self.other, responsible=self.other,
+                            deadline=deadline, is_completed=True)
+        TaskParticipant.objects.create(task=Task.objects.get(title='Вторая'), user=self.user, role='observer')
+        Task.objects.create(title='Чужая', description='', creator=self.other, responsible=self.other,
+                            deadline=deadline)
+        self.client.force_login(self.user)
+
+    def test_csv(self):
+        response = self.client.get(reverse('task_list'), {'export': 'csv'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="tasks.csv"')
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(content.startswith('\ufeff'))
+        rows = list(csv.reader(io.StringIO(content[1:])))
+        self.assertEqual(rows, [
+            EXPORT_COLUMNS,
+            ['Вторая', '', '2026-03-01 09:30', 'Иван Петров', 'Наблюдатель', 'Завершена'],
+            ['Первая', 'Описание', '2026-03-01 09:30', 'Иван Петров', 'Создатель', 'В работе'],
+        ])
+
+        response = self.client.get(reverse('task_list'), {'export': 'csv', 'q': 'Перв'})
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual([row[0] for row in csv.reader(io.StringIO(content[1:]))], ['Тема', 'Первая'])
+
+    def test_xlsx(self):
+        from openpyxl import load_workbook
+
+        response = self.client.get(reverse('task_list'), {'export': 'xlsx'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="tasks.xlsx"')
+        self.assertEqual(response['Content-Type'],
+                         'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        rows = [list(row) for row in sheet.iter_rows(values_only=True)]
+        self.assertEqual(rows, [
+            EXPORT_COLUMNS,
+            ['Вторая', None, '2026-03-01 09:30', 'Иван Петров', 'Наблюдатель', 'Завершена'],
+            ['Первая', 'Описание', '2026-03-01 09:30', 'Иван Петров', 'Создатель', 'В работе'],
+        ])
+
+    def test_xlsx_is_streamed(self):
+        # бесконечная выгрузка: первые куски уходят, не дожидаясь конца строк
+        rows = (('Тема <&>\x01', str(i), '', '', '', '') for i in itertools.count())
+        with mock.patch('tasks.export.export_rows', return_value=rows):
+            response = self.client.get(reverse('task_list'), {'export': 'xlsx'})
+            chunks = iter(response.streaming_content)
+            first, second = next(chunks), next(chunks)
+        self.assertTrue(response.streaming)
+        self.assertTrue(first.startswith(b'PK'))
+        self.assertGreaterEqual(len(second), XLSX_CHUNK_SIZE // 2)
+        response.close()
+
+
+class TaskApiTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.user = User.objects.create_user('a')
+        self.other = User.objects.create_user('b')
+        for i in range(5):
+            Task.objects.create(title=f'Задача {i}', description='', creator=self.user, responsible=self.other,
+                                deadline=now + timedelta(days=i), is_completed=i == 0)
+        self.foreign = Task.objects.create(title='Чужая', description='', creator=self.other,
+                                           responsible=self.other, deadline=now)
+        self.client.force_login(self.user)
+
+    def test_scoped_and_paginated(self):
+        response = self.client.get('/api/tasks/?page_size=2&fields=id,title')
+        data = response.json()
+        self.assertEqual([set(row) for row in data['results']], [{'id', 'title'}] * 2)
+        ids = [row['id'] for row in data['results']]
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            ids += [row['id'] for row in data['results']]
+        self.assertEqual(len(ids), 5)
+        self.assertNotIn(self.foreign.pk, ids)
+        self.assertEqual(self.client.get(f'/api/tasks/{self.foreign.pk}/').status_code, 404)
+
+    def test_filters(self):
+        self.assertEqual(len(self.client.get('/api/tasks/?tab=completed').json()['results']), 1)
+        self.assertEqual(len(self.client.get('/api/tasks/?is_completed=false').json()['results']), 4)
+        self.assertEqual(self.client.get('/api/tasks/?date_from=завтра').status_code, 400)
+
+    def test_orm_writes_keep_visibility(self):
+        # без rebuild_task_visibility: видимость ведут сигналы Task и TaskParticipant
+        ids = lambda: [row['id'] for row in self.client.get('/api/tasks/?fields=id').json()['results']]
+        self.assertNotIn(self.foreign.pk, ids())
+        participant = TaskParticipant.objects.create(task=self.foreign, user=self.user, role='observer')
+        self.assertIn(self.foreign.pk, ids())
+        participant.delete()
+        self.assertNotIn(self.foreign.pk, ids())
+
+        self.foreign.responsible = self.user
+        self.foreign.save()
+        self.assertIn(self.foreign.pk, ids())
+        self.foreign.responsible = self.other
+        self.foreign.save()
+        self.assertNotIn(self.foreign.pk, ids())
+
+        # участник, который одновременно автор, сохраняет старшую роль
+        own = Task.objects.filter(creator=self.user).first()
+        TaskParticipant.objects.create(task=own, user=self.user, role='observer').delete()
+        self.assertEqual(own.visibility.get(user=self.user).role, 'creator')
+        own.delete()
+        self.assertNotIn(own.pk, ids())
+        # каскадное удаление участников не возвращает строки видимости
+        TaskParticipant.objects.create(task=self.foreign, user=self.user, role='observer')
+        self.foreign.delete()
+        self.assertFalse(TaskVisibility.objects.filter(task_id=self.foreign.pk).exists())
+
+    def test_conditional_get(self):
+        response = self.client.get('/api/tasks/')
+        # 304 решается по агрегату, до выборки страницы и сериализации
+        with mock.patch.object(TaskViewSet, 'paginate_queryset', side_effect=AssertionError('serialized')):
+            self.assertEqual(self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        # состав списка может смениться без сдвига updated_at — Last-Modified только у задачи
+        self.assertNotIn('Last-Modified', response)
+        self.assertNotEqual(self.client.get('/api/tasks/?page_size=2')['ETag'], response['ETag'])
+
+        task = Task.objects.filter(creator=self.user).first()
+        task.title = 'Новая тема'
+        task.save()
+        self.assertEqual(self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        # удаление не двигает max(updated_at), но меняет список
+        Task.objects.filter(creator=self.user).exclude(pk=task.pk).first().delete()
+        self.assertEqual(self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_conditional_get_task_and_messages(self):
+        task = Task.objects.filter(creator=self.user).latest('deadline')  # срок далеко: статус 'ok'
+        url = f'/api/tasks/{task.pk}/'
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+        # новый участник меняет my_role и сдвигает updated_at
+        task.refresh_from_db()
+        Task.objects.filter(pk=task.pk).update(updated_at=task.updated_at - timedelta(minutes=1))
+        response = self.client.get(url)
+        TaskParticipant.objects.create(task=task, user=self.other, role='observer')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 200)
+
+        # срок прошёл — меняется deadline_status без записи в задачу
+        response = self.client.get(url)
+        with mock.patch('django.utils.timezone.now', return_value=task.deadline + timedelta(days=1)):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 200)
+
+        message = TaskMessage.objects.create(task=task, sender=self.user, content='текст')
+        url = f'/api/messages/?task={task.pk}'
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        message.content = 'правка'
+        message.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+        response = self.client.get(f'/api/messages/{message.pk}/')
+        self.assertEqual(self.client.get(f'/api/messages/{message.pk}/',
+                                         HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_message_cannot_move_to_foreign_task(self):
+        message = TaskMessage.objects.create(task=Task.objects.filter(creator=self.user).first(),
+                                             sender=self.user, content='текст')
+        response = self.client.patch(f'/api/messages/{message.pk}/', {'task': self.foreign.pk},
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        message.refresh_from_db()
+        self.assertNotEqual(message.task_id, self.foreign.pk)
+
+    def test_fast_list_matches_serializer(self):
+        TaskMessage.objects.create(task=Task.objects.filter(creator=self.user).first(), sender=self.user,
+                                   content='Строка\u2028с разделителем')
+        for url in ('/api/tasks/?page_size=3', '/api/tasks/?fields=id,deadline,my_role', '/api/messages/'):
+            fast = self.client.get(url).content
+            FastListMixin.fast_list = False
+            try:
+                slow = self.client.get(url).content
+            finally:
+                FastListMixin.fast_list = True
+            self.assertEqual(fast, slow, url)
+
+    def test_bulk_create_and_complete(self):
+        deadline = (timezone.now() + timedelta(days=1)).isoformat()
+        response = self.client.post('/api/tasks/bulk/create/', [
+            {'title': 'Пакет 1', 'description': 'д', 'deadline': deadline, 'responsible': self.other.pk,
+             'participants': [{'user': self.other.pk, 'role': 'executor'}]},
+            {'title': 'Пакет 2', 'description': 'д', 'deadline': deadline, 'responsible': 0},
+        ], content_type='application/json')
+        created, failed = response.json()['results']
+        self.assertEqual(created['status'], 'created')
+        self.assertEqual(failed['status'], 'error')
+        self.assertIn('responsible', failed['errors'])
+
+        task = Task.objects.get(pk=created['id'])
+        self.assertEqual(set(task.visibility.values_list('user_id', flat=True)), {self.user.pk, self.other.pk})
+
+        response = self.client.post('/api/tasks/bulk/complete/', {'ids': [task.pk, self.foreign.pk]},
+                                    content_type='application/json')
+        self.assertEqual([r['status'] for r in response.json()['results']], ['completed', 'error'])
+        task.refresh_from_db()
+        self.assertTrue(task.is_completed)
+        self.assertIsNotNone(task.completed_at)
+
+    def test_event_streams_require_login(self):
+        # @login_required оборачивает async-view только с Django 5.1
+        self.client.logout()
+        project = Project.objects.create(title='П', creator=self.user)
+        for url in (reverse('task_events', args=[self.foreign.pk]), reverse('project_events', args=[project.pk])):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 302, url)
+            self.assertTrue(response['Location'].startswith('/accounts/login/'), url)
+
+    def test_broker_must_implement_interface(self):
+        class PublishOnly(Broker):
+            def publish(self, channel, event):
+                pass
+
+        with self.assertRaises(TypeError):
+            PublishOnly()
+        self.assertIsInstance(InProcessBroker(), Broker)
+
+    def test_bulk_update(self):
+        mine = list(Task.objects.filter(creator=self.user).order_by('pk')[:2])
+        deadline = timezone.now() + timedelta(days=7)
+        response = self.client.post('/api/tasks/bulk/update/', [
+            {'id': mine[0].pk, 'title': 'Обновлена', 'deadline': deadline.isoformat()},
+            {'id': mine[1].pk, 'title': mine[1].title},
+            {'id': self.foreign.pk, 'title': 'Взлом'},
+            {'id': mine[0].pk},
+        ], content_type='application/json')
+        results = response.json()['results']
+        self.assertEqual([r['status'] for r in results], ['updated', 'unchanged', 'error', 'error'])
+        self.assertIn('errors', results[3])
+
+        task = Task.objects.get(pk=mine[0].pk)
+        self.assertEqual((task.title, task.deadline), ('Обновлена', deadline))
+        self.assertEqual(task.version, mine[0].version + 1)
+        self.assertEqual(Task.objects.get(pk=self.foreign.pk).title, 'Чужая')
+
+    def test_task_list_bulk_shift(self):
+        tasks = list(Task.objects.filter(creator=self.user, is_completed=False)[:2])
+        before = {t.pk: t.deadline for t in tasks}
+        response = self.client.post(reverse('task_bulk_action'), {
+            'action': 'shift', 'days': 2, 'tab': 'creator', 'ids': [t.pk for t in tasks] + [self.foreign.pk],
+        }, HTTP_HX_REQUEST='true')
+        self.assertTemplateUsed(response, 'tasks/partials/task_table.html')
+        self.assertEqual(response.context['bulk']['done'], 2)
+        self.assertEqual([r['id'] for r in response.context['bulk']['failed']], [self.foreign.pk])
+        for task in Task.objects.filter(pk__in=before):
+            self.assertEqual(task.deadline, before[task.pk] + timedelta(days=2))
+
+    def test_tabs_keep_filters(self):
+        response = self.client.get(reverse('task_list'), {
+            'tab': 'creator', 'q': 'Задача', 'date_from': '2020-01-01',
+            'after': encode_cursor({'created_at': timezone.now(), 'id': 1}),
+        })
+        self.assertEqual(response.context['tab_query'], 'q=%D0%97%D0%B0%D0%B4%D0%B0%D1%87%D0%B0&date_from=2020-01-01')
+        self.assertContains(response, 'href="?tab=completed&q=%D0%97%D0%B0%D0%B4%D0%B0%D1%87%D0%B0&amp;date_from=2020-01-01"')
+        self.assertNotContains(response, 'href="?tab=completed"')
+
+    def test_task_list_bulk_without_htmx(self):
+        task = Task.objects.filter(creator=self.user, is_completed=False).first()
+        # без htmx таблица не нужна — запросов списка нет
+        with mock.patch('tasks.views.task_list_context', side_effect=AssertionError('list queries')):
+            response = self.client.post(reverse('task_bulk_action'), {
+                'action': 'complete', 'tab': 'creator', 'q': 'Задача', 'after': 'курсор',
+                'ids': [task.pk, self.foreign.pk],
+            }, follow=False)
+        self.assertRedirects(response, f"{reverse('task_list')}?tab=creator&q=%D0%97%D0%B0%D0%B4%D0%B0%D1%87%D0%B0",
+                             fetch_redirect_response=False)
+        [message] = get_messages(response.wsgi_request)
+        self.assertEqual(message.level_tag, 'warning')
+        self.assertIn('Обновлено задач: 1', message.message)
+        self.assertIn(f'#{self.foreign.pk}: Задача не найдена', message.message)
+
+
+class AttachmentStorageTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.user = User.objects.create_user('a')
+        self.task = Task.objects.create(title='Т', description='', creator=self.user, responsible=self.user,
+                                        deadline=timezone.now())
+        self.client.force_login(self.user)
+
+    def test_identical_uploads_share_one_blob(self):
+        for name in ('test.xlsx', 'test_copy.xlsx'):
+            self.client.post(reverse('upload_files', args=[self.task.pk]),
+                             {'files': SimpleUploadedFile(name, b'same bytes')})
+        first, second = self.task.files.order_by('pk')
+        self.assertEqual(first.blob_id, second.blob_id)
+        self.assertEqual([first.filename, second.filename], ['test.xlsx', 'test_copy.xlsx'])
+        self.assertEqual((first.size, first.checksum), (10, first.blob.sha256))
+        self.assertEqual(first.content_type, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+
+        # список файлов на странице задачи — из строк БД, без обращений к хранилищу
+        with mock.patch.object(default_storage, 'size', side_effect=AssertionError('stat')):
+            response = self.client.get(reverse('task_detail', args=[self.task.pk]))
+        self.assertEqual([f.filename for f in response.context['files']], ['test_copy.xlsx', 'test.xlsx'])
+        blob = FileBlob.objects.get()
+        self.assertEqual((blob.ref_count, blob.sha256), (2, hashlib.sha256(b'same bytes').hexdigest()))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(FileBlob.objects.get().ref_count, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(FileBlob.objects.exists())
+        self.assertFalse(default_storage.exists(blob.file.name))
+
+    def test_failed_row_save_rolls_back_blob_reference(self):
+        save_attachment(TaskFile, SimpleUploadedFile('a.txt', b'bytes'), task=self.task, uploaded_by=self.user)
+        # строка вложения не сохранилась — ссылки на FileBlob и нового FileBlob тоже нет
+        with mock.patch.object(TaskFile, 'save', side_effect=IntegrityError), self.assertRaises(IntegrityError):
+            save_attachment(TaskFile, SimpleUploadedFile('b.txt', b'bytes'), task=self.task, uploaded_by=self.user)
+        with mock.patch.object(TaskFile, 'save', side_effect=IntegrityError), self.assertRaises(IntegrityError):
+            save_attachment(TaskFile, SimpleUploadedFile('c.txt', b'other'), task=self.task, uploaded_by=self.user)
+        self.assertEqual(FileBlob.objects.get().ref_count, 1)
+
+        response = self.client.get(reverse('task_detail', args=[self.task.pk]))
+        self.assertContains(response, 'download="a.txt"')
+
+    def test_table_preview(self):
+        self.client.post(reverse('upload_files', args=[self.task.pk]),
+                         {'files': SimpleUploadedFile('out.csv', 'код;имя\n1;Иван\n'.encode('cp1251'))})
+        f = self.task.files.get()
+        self.assertEqual(f.preview, 'table')
+        url = reverse('task_file_preview', args=[f.pk])
+        self.assertContains(self.client.get(url), 'готовится')
+
+        render_preview(*preview_job(f))
+        self.assertContains(self.client.get(url), '<td class="text-nowrap">Иван</td>', html=True)
+
+    def test_project_file_preview(self):
+        project = Project.objects.create(title='П', creator=self.user, manager=self.user)
+        self.client.post(reverse('project_upload_files', args=[project.pk]),
+                         {'files': SimpleUploadedFile('out.csv', 'код;имя\n1;Пётр\n'.encode())})
+        f = project.files.get()
+        self.assertEqual(f.preview, 'table')
+        self.assertContains(self.client.get(reverse('project_detail', args=[project.pk])),
+                            reverse('project_file_preview', args=[f.pk]))
+
+        render_preview(*preview_job(f))
+        self.assertContains(self.client.get(reverse('project_file_preview', args=[f.pk])),
+                            '<td class="text-nowrap">Пётр</td>', html=True)
+
+    def test_search_covers_attachment_text(self):
+        self.client.post(reverse('upload_files', args=[self.task.pk]),
+                         {'files': SimpleUploadedFile('Out_21.csv', 'шифр;объект\nКР-7731;насосная\n'.encode())})
+        response = self.client.get(reverse('task_list'), {'q': 'КР-7731'})
+        self.assertEqual(list(response.context['current_tasks']), [])
+
+        save_text(extract_text(*text_job(self.task.files.get())))
+        response = self.client.get(reverse('task_list'), {'q': 'КР-7731'})
+        self.assertEqual(list(response.context['current_tasks']), [self.task])
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        # откат транзакции теста возвращает версии задач назад, а кэш процесса — нет
+        get_fragment_cache().clear()
+        self.user = User.objects.create_user('a')
+        self.other = User.objects.create_user('b', first_name='Борис')
+        self.task = Task.objects.create(title='Старая тема', description='', creator=self.user,
+                                        responsible=self.user, deadline=timezone.now() + timedelta(days=3))
+        self.client.force_login(self.user)
+
+    def test_fragments_follow_task_version(self):
+        self.assertContains(self.client.get(reverse('task_list')), 'Старая тема')
+        # запись мимо сигналов не меняет версию — строка берётся из кэша
+        Task.objects.filter(pk=self.task.pk).update(title='Новая тема')
+        self.assertContains(self.client.get(reverse('task_list')), 'Старая тема')
+
+        self.task.refresh_from_db()
+        self.task.save()
+        self.assertContains(self.client.get(reverse('task_list')), 'Новая тема')
+
+        url = reverse('task_detail', args=[self.task.pk])
+        self.assertContains(self.client.get(url), 'Нет участников')
+        TaskParticipant.objects.create(task=self.task, user=self.other, role='observer')
+        self.assertContains(self.client.get(url), 'Борис')
+
+        # переименование участника — новая версия его задач
+        self.other.first_name = 'Глеб'
+        self.other.save()
+        self.assertContains(self.client.get(url), 'Глеб')
+
+    def test_stale_save_does_not_roll_version_back(self):
+        stale = Task.objects.get(pk=self.task.pk)
+        TaskMessage.objects.create(task=self.task, sender=self.user, content='привет')
+        self.assertContains(self.client.get(reverse('task_list')), 'Старая тема')
+
+        stale.title = 'Новая тема'
+        stale.save()
+        self.task.refresh_from_db()
+        self.assertEqual(stale.version, self.task.version)
+        self.assertContains(self.client.get(reverse('task_list')), 'Новая тема')
+
+    def test_backend_must_implement_interface(self):
+        class NoClear(FragmentCache):
+            def get(self, key):
+                return None
+
+            def set(self, key, value):
+                pass
+
+        with self.assertRaises(TypeError):
+            NoClear()
+
+    def test_save_keeps_default_semantics(self):
+        # экземпляр с отложенными полями пишет только загруженные
+        partial = Task.objects.only('title').get(pk=self.task.pk)
+        partial.title = 'Частичная'
+        partial.save()
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.title, self.task.description), ('Частичная', self.task.description))
+        self.assertIsInstance(partial.version, int)
+
+        # строку удалили параллельно — save() создаёт её заново, как обычно в Django
+        Task.objects.filter(pk=self.task.pk).delete()
+        self.task.save()
+        self.assertTrue(Task.objects.filter(pk=self.task.pk).exists())
+
+
+class RequestOverheadTests(TestCase):
+    def setUp(self):
+        # кэш сессий и пользователя включается только с общим кэшем
+        shared = tempfile.TemporaryDirectory()
+        self.addCleanup(shared.cleanup)
+        self.enterContext(override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': shared.name,
+        }}))
+        self.user = User.objects.create_user('a', password='old')
+        self.client.force_login(self.user)
+        self.client.get(reverse('dashboard'))
+
+    def test_warm_request_skips_session_and_user_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+        self.assertFalse([q['sql'] for q in ctx.captured_queries
+                          if 'django_session' in q['sql'] or 'FROM "auth_user" WHERE' in q['sql']])
+
+        # смена пароля сбрасывает кэш пользователя, старая сессия больше не действует
+        self.user.set_password('new')
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('dashboard')).status_code, 302)
+
+    def test_local_cache_keeps_db_sessions(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+        self.assertTrue([q for q in ctx.captured_queries if 'django_session' in q['sql']])
+        self.assertTrue([q for q in ctx.captured_queries if 'FROM "auth_user" WHERE' in q['sql']])
+
+    def test_unchanged_session_is_not_written(self):
+        session = SessionStore(self.client.session.session_key)
+        session['_auth_user_id'] = session['_auth_user_id']
+        with CaptureQueriesContext(connection) as ctx:
+            session.save()
+        self.assertEqual(ctx.captured_queries, [])
+        session['seen'] = True
+        with CaptureQueriesContext(connection) as ctx:
+            session.save()
+        self.assertTrue(ctx.captured_queries)
+
+    def test_db_pool_stats_for_staff_only(self):
+        self.assertEqual(self.client.get(reverse('db_pool_stats')).status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        stats = self.client.get(reverse('db_pool_stats')).json()
+        self.assertEqual(stats['pooled'], connection.vendor == 'postgresql')
+        if stats['pooled']:
+            self.assertGreater(stats['checkouts'], 0)
+
+
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('a')
+        self.deadline = timezone.now() + timedelta(days=1)
+        Task.objects.create(title='Т', creator=self.user, responsible=self.user, deadline=self.deadline)
+
+    def create_in_other_worker(self):
+        # запись в другом процессе: её сброс кэша до этого процесса не доходит
+        with mock.patch('tasks.signals.invalidate_dashboards'):
+            Task.objects.create(title='Т2', creator=self.user, responsible=self.user, deadline=self.deadline)
+
+    def test_local_cache_is_not_used(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertEqual(dashboard_metrics(self.user)['total_tasks'], 1)
+            self.create_in_other_worker()
+            self.assertEqual(dashboard_metrics(self.user)['total_tasks'], 2)
+            self.assertIsNone(cache.get(DASHBOARD_CACHE_KEY.format(self.user.pk)))
+
+    def test_shared_cache_is_invalidated_for_all_workers(self):
+        shared = tempfile.TemporaryDirectory()
+        self.addCleanup(shared.cleanup)
+        config = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': shared.name}
+        # второй процесс — отдельный клиент того же кэша
+        other_worker = FileBasedCache(shared.name, {})
+        key = DASHBOARD_CACHE_KEY.format(self.user.pk)
+        with override_settings(CACHES={'default': config}):
+            self.assertEqual(dashboard_metrics(self.user)['total_tasks'], 1)
+            self.assertEqual(other_worker.get(key)['total_tasks'], 1)
+            with self.assertNumQueries(0):
+                dashboard_metrics(self.user)
+
+            Task.objects.create(title='Т2', creator=self.user, responsible=self.user, deadline=self.deadline)
+            self.assertIsNone(other_worker.get(key))
+            self.assertEqual(dashboard_metrics(self.user)['total_tasks'], 2)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('a')
+        self.zed = User.objects.create_user('zed', first_name='Zed')
+
+    def stats(self, user):
+        rows = TaskDailyStats.objects.filter(responsible=user)
+        return {f: sum(getattr(r, f) for r in rows) for f in ('created', 'completed', 'due', 'overdue')}
+
+    def test_deltas_follow_task_changes(self):
+        task = Task.objects.create(title='Т', creator=self.user, responsible=self.user,
+                                   deadline=timezone.now() + timedelta(days=1))
+        self.assertEqual(self.stats(self.user), {'created': 1, 'completed': 0, 'due': 1, 'overdue': 1})
+
+        task.is_completed = True
+        task.save()
+        self.assertEqual(self.stats(self.user), {'created': 1, 'completed': 1, 'due': 1, 'overdue': 0})
+
+        task.responsible = self.zed
+        task.save()
+        self.assertEqual(self.stats(self.user), {'created': 0, 'completed': 0, 'due': 0, 'overdue': 0})
+        self.assertEqual(self.stats(self.zed), {'created': 1, 'completed': 1, 'due': 1, 'overdue': 0})
+        rebuild_task_rollups()
+        self.assertEqual(self.stats(self.zed), {'created': 1, 'completed': 1, 'due': 1, 'overdue': 0})
+
+        task.delete()
+        self.assertEqual(self.stats(self.zed), {'created': 0, 'completed': 0, 'due': 0, 'overdue': 0})
+
+    def user_stats(self):
+        """
+        {(пользователь, ответственный): (created, completed, due, overdue)} по всем дням.
+        """
+        totals = defaultdict(lambda: (0, 0, 0, 0))
+        for r in UserTaskDailyStats.objects.all():
+            totals[(r.user_id, r.responsible_id)] = tuple(
+                a + b for a, b in zip(totals[(r.user_id, r.responsible_id)], (r.created, r.completed, r.due, r.overdue)))
+        return {key: counts for key, counts in totals.items() if any(counts)}
+
+    def test_visible_rollups_follow_tasks_and_visibility(self):
+        viewer = User.objects.create_user('viewer')
+        task = Task.objects.create(title='Т', creator=self.user, responsible=self.zed,
+                                   deadline=timezone.now() + timedelta(days=1))
+        a, z, v = self.user.pk, self.zed.pk, viewer.pk
+        self.assertEqual(self.user_stats(), {(a, z): (1, 0, 1, 1), (z, z): (1, 0, 1, 1)})
+
+        participant = TaskParticipant.objects.create(task=task, user=viewer, role='observer')
+        task.is_completed = True
+        task.save()
+        self.assertEqual(self.user_stats(), {(a, z): (1, 1, 1, 0), (z, z): (1, 1, 1, 0), (v, z): (1, 1, 1, 0)})
+
+        # новый ответственный видит задачу, прежний — больше нет
+        task.responsible = self.user
+        task.save()
+        self.assertEqual(self.user_stats(), {(a, a): (1, 1, 1, 0), (v, a): (1, 1, 1, 0)})
+        participant.delete()
+        self.assertEqual(self.user_stats(), {(a, a): (1, 1, 1, 0)})
+
+        bulk_delegate_tasks(self.user, [task.pk], self.zed)
+        expected = {(a, z): (1, 1, 1, 0), (z, z): (1, 1, 1, 0)}
+        self.assertEqual(self.user_stats(), expected)
+        rebuild_task_rollups()
+        self.assertEqual(self.user_stats(), expected)
+
+        task.delete()
+        self.assertEqual(self.user_stats(), {})
+
+    def test_charts_read_rollups(self):
+        Task.objects.create(title='Моя', creator=self.user, responsible=self.user,
+                            deadline=timezone.now() + timedelta(days=1))
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get(reverse('dashboard_charts')).json()
+        sql = [q['sql'] for q in ctx.captured_queries]
+        # графики — одна выборка агрегатов, без группировок по задачам
+        self.assertEqual(len([q for q in sql if 'dailystats' in q]), 1, sql)
+        self.assertTrue(any('FROM "tasks_usertaskdailystats"' in q for q in sql))
+        self.assertFalse([q for q in sql if 'GROUP BY' in q], sql)
+        self.assertEqual((sum(data['timeline']['created']), sum(data['deadline']['due'])), (1, 1))
+
+    def test_charts_cover_visible_tasks_only(self):
+        deadline = timezone.now() + timedelta(days=1)
+        Task.objects.create(title='Моя', creator=self.user, responsible=self.user, deadline=deadline)
+        Task.objects.create(title='Чужая', creator=self.zed, responsible=self.zed, deadline=deadline)
+        self.client.force_login(self.user)
+        data = self.client.get(reverse('dashboard_charts')).json()
+        self.assertEqual(data['responsible']['labels'], ['a'])
+        self.assertEqual(sum(data['timeline']['created']), 1)
+        self.assertEqual(sum(data['completion']['values']), 1)
+
+        self.user.is_staff = True
+        self.user.save()
+        cache.clear()
+        data = self.client.get(reverse('dashboard_charts')).json()
+        self.assertEqual(sorted(data['responsible']['labels']), ['Zed', 'a'])
@@ -14,14 +14,20 @@ from . import views
 urlpatterns = [
     path("", views.task_list, name="task_list"),
     path("dashboard/", views.dashboard, name="dashboard"),
+    path("dashboard/charts/", views.dashboard_charts, name="dashboard_charts"),
+    path("system/db-pool/", views.db_pool_stats, name="db_pool_stats"),
 
     path("tasks/new/", views.task_create, name="task_create"),
+    path("tasks/bulk/", views.task_bulk_action, name="task_bulk_action"),
     path('task/new/', views.task_create, name='task_create'),
     path("tasks/<int:pk>/", views.task_detail, name="task_detail"),
+    path("tasks/<int:pk>/messages/", views.task_messages, name="task_messages"),
+    path("tasks/<int:pk>/events/", views.task_events, name="task_events"),
     path("tasks/<int:pk>/edit/", views.edit_task, name="edit_task"),
     path("tasks/<int:pk>/delegate/", views.delegate_task, name="delegate_task"),
     path("tasks/<int:pk>/complete/", views.complete_task, name="complete_task"),
     path("tasks/<int:pk>/upload/", views.upload_files, name="upload_files"),
+    path("tasks/files/<int:pk>/preview/", views.task_file_preview, name="task_file_preview"),
     path('task/<int:pk>/upload-files/', views.upload_files, name='upload_files'),
     path('', views.task_list, name='task_list'),
     path('task/<int:pk>/', views.task_detail, name='task_detail'),
@@ -36,5 +42,7 @@ urlpatterns = [
     path("projects/<int:pk>/", views.project_detail, name="project_detail"),
     path("projects/<int:pk>/edit/", views.project_edit, name="project_edit"),
     path("projects/<int:pk>/upload/", views.project_upload_files, name="project_upload_files"),
+    path("projects/files/<int:pk>/preview/", views.project_file_preview, name="project_file_preview"),
+    path("projects/<int:pk>/events/", views.project_events, name="project_events"),
     path("projects/", views.project_list, name="project_list"),
 ]
\ No newline at end of file
@@ -1,13 +1,14 @@
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import FileResponse, HttpResponseForbidden
-from django.utils.timezone import make_aware
-from django.db.models import Q
+from django.urls import reverse
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse,
+)
+from asgiref.sync import sync_to_async
 from django.contrib import messages
+from django.db import transaction
 from django.utils import timezone
-from datetime import timedelta, datetime
-from io import BytesIO
-import pandas as pd
+from datetime import timedelta
 from .models import Project, ProjectMember, ProjectItem, ProjectItemAssignee, ProjectMessage
 from django.contrib import messages
 from django.forms import inlineformset_factory
@@ -25,48 +26,76 @@ from .models import (
     Project, ProjectMember, ProjectItem, ProjectItemAssignee, ProjectMessage, ProjectFile
 )
 from .forms import ProjectForm, ProjectItemFormSet
+from .attachments import attachment, enqueue_attachment_jobs, save_attachment
+from .bulk import bulk_complete_tasks, bulk_delegate_tasks, bulk_shift_deadlines
+from .dashboard import dashboard_metrics
+from .dbpool import pool_stats
+from .export import csv_response, xlsx_response
+from .pagination import keyset_paginate
+from .previews import read_table_preview
+from .realtime import event_stream, project_channel, task_channel
+from .rollups import chart_data, chart_html
+from .permissions import ProjectPermissions, TaskPermissions, project_permissions, task_permissions
+from .filters import filter_tasks, tab_tasks
+from .fragments import bump_task_versions
+from .search import search_pagination_keys
+from .sync import sync_rows
+from .visibility import sync_task_visibility
 from django.contrib.auth.models import User
+from urllib.parse import urlencode
 
-# ===== Вспомогательные =====
-def get_user_role(user, task):
-    if task.creator_id == user.id:
-        return 'Создатель'
-    if task.responsible_id == user.id:
-        return 'Ответственный'
-    p = TaskParticipant.objects.filter(task=task, user=user).first()
-    return p.get_role_display() if p else '-'
+TASK_LIST_PAGE_SIZE = 50
 
+# ===== Вспомогательные =====
+# Права считаются в tasks.permissions; во views — task_permissions(request, task),
+# он делает один запрос к TaskParticipant за весь запрос.
 def user_can_access_task(user, task):
-    return (
-        task.creator_id == user.id or
-        task.responsible_id == user.id or
-        task.participants.filter(user=user).exists()
-    )
+    return TaskPermissions.resolve(user, task).can_access
 
 def user_can_upload_files(user, task):
-    return user_can_access_task(user, task)
+    return TaskPermissions.resolve(user, task).can_upload_files
 
 def user_can_complete_task(user, task):
-    return (
-        task.creator_id == user.id or
-        task.responsible_id == user.id or
-        task.participants.filter(user=user, role__in=['executor', 'responsible']).exists()
-    )
+    return TaskPermissions.resolve(user, task).can_complete
 
 # (1) Редактировать: Создатель или Наблюдатель
 def user_can_edit_task(user, task):
-    return (
-        task.creator_id == user.id or
-        TaskParticipant.objects.filter(task=task, user=user, role='observer').exists()
-    )
+    return TaskPermissions.resolve(user, task).can_edit
 
 # (2) Делегировать: Создатель, Ответственный, Исполнитель, Наблюдатель
 def user_can_delegate_task(user, task):
-    return (
-        task.creator_id == user.id or
-        task.responsible_id == user.id or
-        TaskParticipant.objects.filter(task=task, user=user, role__in=['executor', 'observer']).exists()
-    )
+    return TaskPermissions.resolve(user, task).can_delegate
+
+# Чат задачи: страницы по id, от новых к старым
+TASK_CHAT_PAGE_SIZE = 30
+
+def chat_page(messages_qs, before=None, page_size=TASK_CHAT_PAGE_SIZE):
+    qs = messages_qs.select_related('sender').order_by('-id')
+    if before:
+        qs = qs.filter(id__lt=before)
+    rows = list(qs[:page_size + 1])
+    has_older = len(rows) > page_size
+    rows = rows[:page_size][::-1]
+    return {
+        'task_messages': rows,
+        'has_older': has_older,
+        'oldest_id': rows[0].id if rows else before,
+        'newest_id': rows[-1].id if rows else 0,
+    }
+
+def chat_since(messages_qs, after, limit=TASK_CHAT_PAGE_SIZE * 4):
+    rows = list(messages_qs.select_related('sender').filter(id__gt=after).order_by('id')[:limit])
+    return {
+        'task_messages': rows,
+        'newest_id': rows[-1].id if rows else after,
+        'poll': True,
+    }
+
+def sse_response(channel):
+    response = StreamingHttpResponse(event_stream(channel), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 # Подсветка дедлайна
 def calc_deadline_status(task):
@@ -85,88 +114,134 @@ def calc_deadline_status(task):
         return "soon"
     return "ok"
 
-# ===== Views =====
-@login_required
-def task_list(request):
-    query = request.GET.get('q', '').strip()
-    date_from = request.GET.get('date_from')
-    date_to = request.GET.get('date_to')
-    active_tab = request.GET.get('tab', 'creator')
-
-    # Базы
-    qs_creator = Task.objects.filter(creator=request.user)
-    qs_responsible = Task.objects.filter(responsible=request.user)
-    qs_participant = Task.objects.filter(participants__user=request.user)
-    qs_completed = Task.objects.filter(
-        Q(creator=request.user) | Q(responsible=request.user) | Q(participants__user=request.user),
-        is_completed=True
-    )
+def task_list_query(params, tab=True):
+    """
+    Фильтры списка (вкладка, поиск, даты) строкой запроса — без курсоров:
+    для ссылок пагинации и возврата в список после действия;
+    tab=False — для ссылок самих вкладок.
+    """
+    keys = ('tab', 'q', 'date_from', 'date_to') if tab else ('q', 'date_from', 'date_to')
+    return urlencode({k: params.get(k, '').strip() for k in keys if params.get(k, '').strip()})
 
-    # Поиск
-    if query:
-        f = (Q(title__icontains=query) |
-             Q(description__icontains=query) |
-             Q(responsible__first_name__icontains=query) |
-             Q(responsible__last_name__icontains=query))
-        qs_creator = qs_creator.filter(f)
-        qs_responsible = qs_responsible.filter(f)
-        qs_participant = qs_participant.filter(f)
-        qs_completed = qs_completed.filter(f)
-
-    # Даты
-    if date_from:
-        dtf = make_aware(datetime.strptime(date_from, "%Y-%m-%d"))
-        qs_creator = qs_creator.filter(deadline__gte=dtf)
-        qs_responsible = qs_responsible.filter(deadline__gte=dtf)
-        qs_participant = qs_participant.filter(deadline__gte=dtf)
-        qs_completed = qs_completed.filter(deadline__gte=dtf)
-
-    if date_to:
-        dtt = make_aware(datetime.strptime(date_to, "%Y-%m-%d"))
-        qs_creator = qs_creator.filter(deadline__lte=dtt)
-        qs_responsible = qs_responsible.filter(deadline__lte=dtt)
-        qs_participant = qs_participant.filter(deadline__lte=dtt)
-        qs_completed = qs_completed.filter(deadline__lte=dtt)
-
-    # Экспорт
-    if 'export' in request.GET:
-        all_tasks = qs_creator.union(qs_responsible, qs_participant, qs_completed)
-        data = [{
-            'Тема': t.title,
-            'Описание': t.description,
-            'Срок': t.deadline.strftime('%Y-%m-%d %H:%M') if t.deadline else '',
-            'Ответственный': t.responsible.get_full_name() if t.responsible else '',
-            'Роль': get_user_role(request.user, t),
-            'Статус': 'Завершена' if t.is_completed else 'В работе'
-        } for t in all_tasks]
-        output = BytesIO()
-        pd.DataFrame(data).to_excel(output, index=False)
-        output.seek(0)
-        return FileResponse(output, as_attachment=True, filename="tasks.xlsx")
-
-    tabs = {
-        'creator': qs_creator.filter(is_completed=False),
-        'responsible': qs_responsible.filter(is_completed=False).exclude(creator=request.user),
-        'participant': qs_participant.filter(is_completed=False).exclude(creator=request.user).exclude(responsible=request.user),
-        'completed': qs_completed,
-    }
-    current_qs = tabs.get(active_tab, tabs['creator']).select_related('responsible').prefetch_related('files').distinct()
 
-    # Подготовка объектов для шаблона
-    current_tasks = []
-    for t in current_qs.order_by('-created_at'):
-        t.my_role = get_user_role(request.user, t)
-        t.files_count = t.files.count()
-        t.deadline_status = calc_deadline_status(t)
-        current_tasks.append(t)
+def task_list_context(user, params):
+    """
+    Контекст таблицы задач по параметрам запроса (GET страницы или POST массового действия):
+    фильтры, вкладка и курсор текущей страницы.
+    """
+    query = params.get('q', '').strip()
+    date_from = params.get('date_from')
+    date_to = params.get('date_to')
+    active_tab = params.get('tab', 'creator')
+    after, before = params.get('after'), params.get('before')
+
+    # База: все видимые задачи; роль, число файлов и статус срока — аннотации того же запроса
+    qs = filter_tasks(Task.objects.visible_to(user), query, date_from, date_to)
+    current_qs = tab_tasks(qs, active_tab).select_related('responsible')
+
+    # Курсорная пагинация: (created_at, id), при поиске — сначала по релевантности
+    page = keyset_paginate(
+        current_qs,
+        after=after,
+        before=before,
+        page_size=TASK_LIST_PAGE_SIZE,
+        keys=search_pagination_keys(query),
+    )
 
-    return render(request, 'tasks/task_list.html', {
+    return {
         'query': query,
         'date_from': date_from,
         'date_to': date_to,
         'active_tab': active_tab,
-        'current_tasks': current_tasks,
-    })
+        'after': after,
+        'before': before,
+        'current_tasks': page.object_list,
+        'page': page,
+        'filter_query': task_list_query(params),
+        'tab_query': task_list_query(params, tab=False),
+        'users': User.objects.exclude(id=user.id).order_by('first_name', 'last_name', 'username'),
+    }
+
+
+# ===== Views =====
+@login_required
+def task_list(request):
+    # Экспорт (потоковый: CSV или XLSX) — все видимые задачи по фильтрам, без вкладок
+    export = request.GET.get('export')
+    if export:
+        qs = filter_tasks(Task.objects.visible_to(request.user), request.GET.get('q', '').strip(),
+                          request.GET.get('date_from'), request.GET.get('date_to'))
+        if export == 'csv':
+            return csv_response(qs)
+        return xlsx_response(qs)
+
+    return render(request, 'tasks/task_list.html', task_list_context(request.user, request.GET))
+
+
+BULK_SHIFT_MAX_DAYS = 365
+
+
+@login_required
+def task_bulk_action(request):
+    """
+    Массовое действие над отмеченными в списке задачами (htmx):
+    action=complete | delegate (responsible) | shift (days).
+    Одна пакетная запись с проверкой прав на каждую задачу (tasks.bulk),
+    в ответ — перерисованная таблица с итогом.
+    """
+    if request.method != 'POST':
+        return HttpResponseBadRequest("Ожидается POST")
+    try:
+        ids = [int(pk) for pk in request.POST.getlist('ids')]
+    except ValueError:
+        return HttpResponseBadRequest("Некорректный id задачи")
+
+    action = request.POST.get('action')
+    results, error = [], None
+    if not ids:
+        error = "Не выбрано ни одной задачи"
+    elif action == 'complete':
+        results = bulk_complete_tasks(request.user, ids)
+    elif action == 'delegate':
+        responsible_id = request.POST.get('responsible', '')
+        responsible = User.objects.filter(pk=responsible_id).first() if responsible_id.isdigit() else None
+        if responsible is None:
+            error = "Выберите нового ответственного"
+        else:
+            results = bulk_delegate_tasks(request.user, ids, responsible)
+    elif action == 'shift':
+        try:
+            days = int(request.POST.get('days', ''))
+        except ValueError:
+            days = None
+        if days is None or abs(days) > BULK_SHIFT_MAX_DAYS:
+            error = f"Сдвиг — целое число дней, не больше {BULK_SHIFT_MAX_DAYS}"
+        else:
+            results = bulk_shift_deadlines(request.user, ids, timedelta(days=days))
+    else:
+        return HttpResponseBadRequest("Неизвестное действие")
+
+    bulk = {
+        'error': error,
+        'done': sum(r['status'] not in ('unchanged', 'error') for r in results),
+        'unchanged': sum(r['status'] == 'unchanged' for r in results),
+        'failed': [r for r in results if r['status'] == 'error'],
+    }
+    if not request.headers.get('HX-Request'):
+        # без htmx — итог во флеш-сообщении и обратно в список с теми же фильтрами, без запросов списка
+        if error:
+            messages.error(request, error)
+        else:
+            summary = f"Обновлено задач: {bulk['done']}"
+            if bulk['unchanged']:
+                summary += f", без изменений: {bulk['unchanged']}"
+            if bulk['failed']:
+                summary += f", не удалось: {len(bulk['failed'])} — " + '; '.join(
+                    f"#{r['id']}: {r['error']}" for r in bulk['failed'])
+            (messages.warning if bulk['failed'] else messages.success)(request, summary)
+        return redirect(f"{reverse('task_list')}?{task_list_query(request.POST)}")
+    return render(request, 'tasks/partials/task_table.html', {**task_list_context(request.user, request.POST),
+                                                                'bulk': bulk})
 
 
 @login_required
@@ -182,14 +257,21 @@ def task_create(request):
                 task.responsible_id = responsible_id
             task.save()
 
-            # участники
-            for user_id, role in zip(request.POST.getlist('participants'), request.POST.getlist('roles')):
-                if user_id:
-                    TaskParticipant.objects.create(task=task, user_id=user_id, role=role)
-
-            # файлы
-            for f in request.FILES.getlist('files'):
-                TaskFile.objects.create(task=task, file=f, uploaded_by=request.user)
+            # участники и файлы — по одному INSERT на всех
+            TaskParticipant.objects.bulk_create([
+                TaskParticipant(task=task, user_id=user_id, role=role)
+                for user_id, role in zip(request.POST.getlist('participants'), request.POST.getlist('roles'))
+                if user_id
+            ], ignore_conflicts=True)
+            sync_task_visibility(task)  # bulk_create — без сигналов
+
+            with transaction.atomic():  # ссылки на FileBlob — вместе со строками
+                files = TaskFile.objects.bulk_create([
+                    attachment(TaskFile, f, task=task, uploaded_by=request.user) for f in request.FILES.getlist('files')
+                ])
+            # bulk_create без сигналов — превью и текст ставим в очередь сами
+            for f in files:
+                transaction.on_commit(lambda f=f: enqueue_attachment_jobs(f))
 
             return redirect('task_detail', pk=task.pk)
     else:
@@ -200,14 +282,15 @@ def task_create(request):
 @login_required
 def task_detail(request, pk):
     task = get_object_or_404(Task, pk=pk)
-    if not user_can_access_task(request.user, task):
+    perms = task_permissions(request, task)
+    if not perms.can_access:
         return HttpResponseForbidden("У вас нет доступа к этой задаче")
 
     # права
-    can_complete = user_can_complete_task(request.user, task)
-    can_upload_files = user_can_upload_files(request.user, task)
-    can_edit = user_can_edit_task(request.user, task)
-    can_delegate = user_can_delegate_task(request.user, task)
+    can_complete = perms.can_complete
+    can_upload_files = perms.can_upload_files
+    can_edit = perms.can_edit
+    can_delegate = perms.can_delegate
 
     # подсветка срока
     task.deadline_status = calc_deadline_status(task)
@@ -219,7 +302,7 @@ def task_detail(request, pk):
             if not can_upload_files:
                 return HttpResponseForbidden("У вас нет прав для загрузки файлов")
             for f in request.FILES.getlist('files'):
-                TaskFile.objects.create(task=task, file=f, uploaded_by=request.user)
+                save_attachment(TaskFile, f, task=task, uploaded_by=request.user)
             messages.success(request, 'Файлы загружены')
             return redirect('task_detail', pk=pk)
 
@@ -229,13 +312,15 @@ def task_detail(request, pk):
             TaskMessage.objects.create(task=task, sender=request.user, content=content)
             return redirect('task_detail', pk=pk)
 
-    participants = TaskParticipant.objects.filter(task=task)
-    task_messages = task.messages.all().order_by('timestamp')
+    participants = TaskParticipant.objects.filter(task=task).select_related('user')
+    # только последняя страница чата, остальное — по запросу (task_messages)
+    chat = chat_page(task.messages)
 
     return render(request, 'tasks/task_detail.html', {
         'task': task,
+        'files': task.files.order_by('-uploaded_at', '-id'),
         'participants': participants,
-        'task_messages': task_messages,
+        **chat,
         'can_complete': can_complete,
         'can_upload_files': can_upload_files,
         'can_edit': can_edit,
@@ -243,10 +328,51 @@ def task_detail(request, pk):
     })
 
 
+@login_required
+def task_messages(request, pk):
+    """
+    Фрагмент чата для htmx:
+    ?before=<id> — предыдущая страница истории,
+    ?after=<id>  — только новые сообщения (опрос); 204, если новых нет.
+    """
+    task = get_object_or_404(Task, pk=pk)
+    if not task_permissions(request, task).can_access:
+        return HttpResponseForbidden("У вас нет доступа к этой задаче")
+
+    try:
+        after = int(request.GET['after']) if 'after' in request.GET else None
+        before = int(request.GET['before']) if 'before' in request.GET else None
+    except ValueError:
+        return HttpResponseBadRequest("Некорректный id сообщения")
+
+    if after is not None:
+        chat = chat_since(task.messages, after)
+        if not chat['task_messages']:
+            return HttpResponse(status=204)
+    else:
+        chat = chat_page(task.messages, before=before)
+    return render(request, 'tasks/partials/task_messages.html', {'task': task, 'fragment': True, **chat})
+
+
+@login_required
+async def task_events(request, pk):
+    """
+    SSE-поток событий задачи (сообщения, файлы, статус). Нужен ASGI-сервер.
+    """
+    user = await request.auser()
+    task = await Task.objects.filter(pk=pk).afirst()
+    if task is None:
+        raise Http404
+    perms = await sync_to_async(TaskPermissions.resolve)(user, task)
+    if not perms.can_access:
+        return HttpResponseForbidden("У вас нет доступа к этой задаче")
+    return sse_response(task_channel(task.pk))
+
+
 @login_required
 def edit_task(request, pk):
     task = get_object_or_404(Task, pk=pk)
-    if not user_can_edit_task(request.user, task):
+    if not task_permissions(request, task).can_edit:
         return HttpResponseForbidden("У вас нет прав для редактирования этой задачи")
 
     users = User.objects.exclude(id=request.user.id).order_by('first_name', 'last_name', 'username')
@@ -254,14 +380,19 @@ def edit_task(request, pk):
         form = TaskForm(request.POST, instance=task)
         if form.is_valid():
             task = form.save()
-            # участники
-            TaskParticipant.objects.filter(task=task).delete()
-            for user_id, role in zip(request.POST.getlist('participants'), request.POST.getlist('roles')):
-                if user_id:
-                    TaskParticipant.objects.create(task=task, user_id=user_id, role=role)
+            # участники: только разница с текущими строками
+            participants = {
+                (task.pk, int(user_id)): role
+                for user_id, role in zip(request.POST.getlist('participants'), request.POST.getlist('roles'))
+                if user_id
+            }
+            if sync_rows(TaskParticipant.objects.filter(task=task), participants, ('task_id', 'user_id'), 'role'):
+                # sync_rows пишет без сигналов
+                bump_task_versions([task.pk], updated_at=timezone.now())
+                sync_task_visibility(task)
             # файлы
             for f in request.FILES.getlist('files'):
-                TaskFile.objects.create(task=task, file=f, uploaded_by=request.user)
+                save_attachment(TaskFile, f, task=task, uploaded_by=request.user)
             messages.success(request, 'Задача успешно обновлена')
             return redirect('task_detail', pk=task.pk)
     else:
@@ -276,7 +407,7 @@ def edit_task(request, pk):
 @login_required
 def delegate_task(request, pk):
     task = get_object_or_404(Task, pk=pk)
-    if not user_can_delegate_task(request.user, task):
+    if not task_permissions(request, task).can_delegate:
         return HttpResponseForbidden("У вас нет прав для делегирования этой задачи")
 
     users = User.objects.exclude(id=request.user.id).order_by('first_name', 'last_name', 'username')
@@ -301,7 +432,7 @@ def delegate_task(request, pk):
 @login_required
 def complete_task(request, pk):
     task = get_object_or_404(Task, pk=pk)
-    if not user_can_complete_task(request.user, task):
+    if not task_permissions(request, task).can_complete:
         return HttpResponseForbidden("У вас нет прав для завершения этой задачи")
     if not task.is_completed:
         task.is_completed = True
@@ -313,50 +444,60 @@ def complete_task(request, pk):
 @login_required
 def upload_files(request, pk):
     task = get_object_or_404(Task, pk=pk)
-    if not user_can_upload_files(request.user, task):
+    if not task_permissions(request, task).can_upload_files:
         return HttpResponseForbidden("У вас нет прав для загрузки файлов в эту задачу")
     if request.method == 'POST':
         for f in request.FILES.getlist('files'):
-            TaskFile.objects.create(task=task, file=f, uploaded_by=request.user)
+            save_attachment(TaskFile, f, task=task, uploaded_by=request.user)
         messages.success(request, 'Файлы загружены')
     return redirect('task_detail', pk=task.pk)
 
 @login_required
 def dashboard(request):
-    user_tasks = Task.objects.filter(
-        Q(creator=request.user) |
-        Q(responsible=request.user) |
-        Q(participants__user=request.user)
-    ).distinct()
-
-    total_tasks = user_tasks.count()
-    completed_tasks = user_tasks.filter(is_completed=True).count()
-    overdue_tasks = user_tasks.filter(is_completed=False, deadline__lt=timezone.now()).count()
-
-    context = {
-        "total_tasks": total_tasks,
-        "completed_tasks": completed_tasks,
-        "overdue_tasks": overdue_tasks,
-        # при желании добавь графики и пр., как раньше
-    }
-    return render(request, "tasks/dashboard.html", context)
+    # одна агрегация + два коротких списка, кэш на пользователя (см. tasks.dashboard)
+    metrics = dashboard_metrics(request.user)
+    # графики — по видимым задачам, с тем же кэшем (см. tasks.rollups)
+    charts = chart_html(chart_data(request.user, metrics))
+    return render(request, "tasks/dashboard.html", {**metrics, **charts})
+
+
+@login_required
+def dashboard_charts(request):
+    return JsonResponse(chart_data(request.user, dashboard_metrics(request.user)))
+
+
+@login_required
+def db_pool_stats(request):
+    """
+    Счётчики пула соединений процесса, обслужившего запрос (tasks/dbpool.py).
+    """
+    if not request.user.is_staff:
+        return HttpResponseForbidden("Нет прав")
+    return JsonResponse(pool_stats())
 
 # --- Create project ---
 
-# права
+# права (см. tasks.permissions; во views — project_permissions(request, project))
 def user_can_access_project(user, project):
-    return (
-        project.creator_id == user.id
-        or (project.manager_id == user.id if project.manager_id else False)
-        or project.members.filter(user=user).exists()
-    )
+    return ProjectPermissions.resolve(user, project).can_access
 
 def user_can_edit_project(user, project):
-    return project.creator_id == user.id or project.manager_id == user.id
+    return ProjectPermissions.resolve(user, project).can_edit
 
 def user_can_upload_project_files(user, project):
-    # ровно как в задачах: любой имеющий доступ — может загружать
-    return user_can_access_project(user, project)
+    return ProjectPermissions.resolve(user, project).can_upload_files
+
+def sync_item_assignees(project, formset):
+    """
+    Исполнители пунктов из сохранённого формсета — только разница с текущими строками.
+    """
+    want = {
+        (f.instance.pk, u.pk): None
+        for f in formset.forms
+        if f.cleaned_data and not f.cleaned_data.get("DELETE") and f.instance.pk
+        for u in f.cleaned_data.get("assignees") or ()
+    }
+    sync_rows(ProjectItemAssignee.objects.filter(item__project=project), want, ('item_id', 'user_id'))
 
 @login_required
 def project_create(request):
@@ -372,15 +513,7 @@ def project_create(request):
             formset.instance = project; formset.save()
 
             # привяжем исполнителей
-            for f in formset.forms:
-                if not f.cleaned_data or f.cleaned_data.get("DELETE"): continue
-                item = f.instance
-                assignees = f.cleaned_data.get("assignees")
-                if assignees:
-                    ProjectItemAssignee.objects.bulk_create(
-                        [ProjectItemAssignee(item=item, user=u) for u in assignees],
-                        ignore_conflicts=True
-                    )
+            sync_item_assignees(project, formset)
 
             if project.manager_id:
                 ProjectMember.objects.get_or_create(project=project, user_id=project.manager_id, defaults={'role':'manager'})
@@ -397,7 +530,7 @@ def project_create(request):
 @login_required
 def project_edit(request, pk):
     project = get_object_or_404(Project, pk=pk)
-    if not user_can_edit_project(request.user, project):
+    if not project_permissions(request, project).can_edit:
         return HttpResponseForbidden("Нет прав")
 
     users = User.objects.order_by('first_name','last_name','username')
@@ -408,16 +541,7 @@ def project_edit(request, pk):
 
         if form.is_valid() and formset.is_valid():
             form.save(); formset.save()
-            ProjectItemAssignee.objects.filter(item__project=project).delete()
-            for f in formset.forms:
-                if not f.cleaned_data or f.cleaned_data.get("DELETE"): continue
-                item = f.instance
-                assignees = f.cleaned_data.get("assignees")
-                if assignees:
-                    ProjectItemAssignee.objects.bulk_create(
-                        [ProjectItemAssignee(item=item, user=u) for u in assignees],
-                        ignore_conflicts=True
-                    )
+            sync_item_assignees(project, formset)
             if project.manager_id:
                 ProjectMember.objects.get_or_create(project=project, user_id=project.manager_id, defaults={'role':'manager'})
             messages.success(request, "Проект обновлён")
@@ -438,7 +562,7 @@ def project_edit(request, pk):
 @login_required
 def project_detail(request, pk):
     project = get_object_or_404(Project, pk=pk)
-    if not user_can_access_project(request.user, project):
+    if not project_permissions(request, project).can_access:
         return HttpResponseForbidden("Нет доступа к проекту")
 
     # отправка сообщения
@@ -452,26 +576,65 @@ def project_detail(request, pk):
     members = project.members.select_related("user")
     messages_qs = project.messages.select_related("sender").order_by("timestamp")
 
-    can_edit = user_can_edit_project(request.user, project)
-    can_upload = user_can_upload_project_files(request.user, project)
+    perms = project_permissions(request, project)
+    can_edit = perms.can_edit
+    can_upload = perms.can_upload_files
 
     return render(request, "tasks/project_detail.html", {
         "project": project,
         "items": items,
         "members": members,
+        "files": project.files.order_by("-uploaded_at", "-id"),
         "messages": messages_qs,
         "can_edit": can_edit,
         "can_upload_files": can_upload,
     })
 
+@login_required
+async def project_events(request, pk):
+    user = await request.auser()
+    project = await Project.objects.filter(pk=pk).afirst()
+    if project is None:
+        raise Http404
+    perms = await sync_to_async(ProjectPermissions.resolve)(user, project)
+    if not perms.can_access:
+        return HttpResponseForbidden("Нет доступа к проекту")
+    return sse_response(project_channel(project.pk))
+
+
+def file_preview(request, f):
+    if f.preview != 'table':
+        raise Http404
+    return render(request, 'tasks/partials/file_preview.html', {'preview': read_table_preview(f.checksum)})
+
+
+@login_required
+def task_file_preview(request, pk):
+    """
+    Первые строки таблицы-вложения (htmx, по раскрытию в списке файлов).
+    """
+    f = get_object_or_404(TaskFile.objects.select_related('task'), pk=pk)
+    if not task_permissions(request, f.task).can_access:
+        return HttpResponseForbidden("У вас нет доступа к этой задаче")
+    return file_preview(request, f)
+
+
+@login_required
+def project_file_preview(request, pk):
+    f = get_object_or_404(ProjectFile.objects.select_related('project'), pk=pk)
+    if not project_permissions(request, f.project).can_access:
+        return HttpResponseForbidden("Нет доступа к проекту")
+    return file_preview(request, f)
+
+
 @login_required
 def project_upload_files(request, pk):
     project = get_object_or_404(Project, pk=pk)
-    if not user_can_upload_project_files(request.user, project):
+    if not project_permissions(request, project).can_upload_files:
         return HttpResponseForbidden("Нет прав для загрузки файлов")
     if request.method == "POST":
         for f in request.FILES.getlist("files"):
-            ProjectFile.objects.create(project=project, file=f, uploaded_by=request.user)
+            save_attachment(ProjectFile, f, project=project, uploaded_by=request.user)
         messages.success(request, "Файлы загружены")
     return redirect("project_detail", pk=pk)
 
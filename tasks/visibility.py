@@ -0,0 +1,110 @@
+from collections import defaultdict
+
+from django.db import transaction
+
+from .dashboard import invalidate_dashboards
+from .models import Task, TaskParticipant, TaskVisibility
+from .rollups import ROLLUP_FIELDS, apply_visibility_deltas, task_rollup_values
+from .sync import sync_rows
+
+REBUILD_BATCH_SIZE = 2000
+
+
+def _visibility_rows(creator_id, responsible_id, participant_ids):
+    """
+    {user_id: role} — старшая роль побеждает: автор > ответственный > участник.
+    """
+    rows = {uid: 'participant' for uid in participant_ids}
+    if responsible_id:
+        rows[responsible_id] = 'responsible'
+    rows[creator_id] = 'creator'
+    return rows
+
+
+def sync_task_visibility(task):
+    """
+    Приводит TaskVisibility задачи в соответствие с автором/ответственным/участниками.
+    Для Task.save() и записи TaskParticipant вызывается сигналами (tasks.signals);
+    вручную — только после записей мимо сигналов (bulk_create, sync_rows).
+    """
+    sync_tasks_visibility([task])
+
+
+def _rollup_values(task_id):
+    return {task_id: Task.objects.filter(pk=task_id).values('id', *ROLLUP_FIELDS).first()}
+
+
+def add_participant_visibility(task_id, user_id):
+    """
+    Новый участник: строка видимости, если её ещё нет (старшая роль не меняется).
+    """
+    _, created = TaskVisibility.objects.get_or_create(task_id=task_id, user_id=user_id,
+                                                      defaults={'role': 'participant'})
+    if created:
+        apply_visibility_deltas([(task_id, user_id)], [], _rollup_values(task_id))
+        invalidate_dashboards({user_id})
+
+
+def remove_participant_visibility(task_id, user_id):
+    """
+    Участник удалён: строка уходит, только если она была ролью участника.
+    """
+    if TaskVisibility.objects.filter(task_id=task_id, user_id=user_id, role='participant').delete()[0]:
+        apply_visibility_deltas([], [(task_id, user_id)], _rollup_values(task_id))
+        invalidate_dashboards({user_id})
+
+
+def sync_tasks_visibility(tasks):
+    """
+    То же для пачки задач: два чтения и не больше трёх записей
+    (DELETE, INSERT, UPDATE ролей) — независимо от числа задач.
+    """
+    ids = [t.pk for t in tasks]
+    participants = defaultdict(list)
+    for task_id, user_id in TaskParticipant.objects.filter(task_id__in=ids).values_list('task_id', 'user_id'):
+        participants[task_id].append(user_id)
+
+    want = {
+        (task.pk, uid): role
+        for task in tasks
+        for uid, role in _visibility_rows(task.creator_id, task.responsible_id, participants[task.pk]).items()
+    }
+    result = sync_rows(TaskVisibility.objects.filter(task_id__in=ids), want, ('task_id', 'user_id'), 'role')
+    if result.added or result.removed:
+        apply_visibility_deltas(result.added, result.removed, {t.pk: task_rollup_values(t) for t in tasks})
+    invalidate_dashboards({uid for _, uid in result.added + result.removed})
+
+
+@transaction.atomic
+def rebuild_task_visibility():
+    """
+    Полная пересборка таблицы пачками задач. Возвращает число строк.
+    Агрегаты пользователей (UserTaskDailyStats) после неё — rebuild_task_rollups.
+    """
+    TaskVisibility.objects.all().delete()
+    total = 0
+    tasks = Task.objects.order_by('pk').values_list('pk', 'creator_id', 'responsible_id')
+    batch = []
+    for row in tasks.iterator(chunk_size=REBUILD_BATCH_SIZE):
+        batch.append(row)
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            total += _rebuild_batch(batch)
+            batch = []
+    if batch:
+        total += _rebuild_batch(batch)
+    return total
+
+
+def _rebuild_batch(tasks):
+    participants = defaultdict(list)
+    for task_id, user_id in TaskParticipant.objects.filter(
+            task_id__in=[pk for pk, _, _ in tasks]).values_list('task_id', 'user_id'):
+        participants[task_id].append(user_id)
+
+    objs = [
+        TaskVisibility(task_id=pk, user_id=uid, role=role)
+        for pk, creator_id, responsible_id in tasks
+        for uid, role in _visibility_rows(creator_id, responsible_id, participants[pk]).items()
+    ]
+    TaskVisibility.objects.bulk_create(objs, batch_size=REBUILD_BATCH_SIZE)
+    return len(objs)
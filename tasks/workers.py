@@ -0,0 +1,71 @@
+"""
+Общий пул рабочих процессов веб-процесса для тяжёлой обработки вложений
+(превью — tasks/previews.py, извлечение текста — tasks/extraction.py).
+
+submit() не блокирует запрос: задача уходит в ProcessPoolExecutor,
+повторная постановка того же ключа, пока он в работе, игнорируется.
+Рабочие функции не должны трогать ORM — результат в БД пишет on_done
+в потоке пула веб-процесса.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def worker_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            # spawn: рабочие процессы не наследуют соединения с БД и потоки сервера
+            _pool = ProcessPoolExecutor(max_workers=settings.TASKS_WORKER_PROCESSES,
+                                        mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def _finish(key, on_done, future):
+    with _lock:
+        _pending.discard(key)
+    if future.exception() is not None:
+        logger.warning("Фоновая задача %s завершилась ошибкой: %r", key, future.exception())
+        return
+    if on_done is not None:
+        close_old_connections()
+        try:
+            on_done(future.result())
+        except Exception:
+            logger.exception("Не сохранён результат фоновой задачи %s", key)
+        finally:
+            close_old_connections()
+
+
+def submit(key, fn, *args, on_done=None):
+    """
+    Поставить fn(*args) в пул. key — для отсева дублей (например, ('preview', checksum)).
+    TASKS_WORKER_PROCESSES = 0 — фоновая обработка выключена (только команды manage.py).
+    """
+    if not settings.TASKS_WORKER_PROCESSES:
+        return False
+    with _lock:
+        if key in _pending:
+            return False
+        _pending.add(key)
+    try:
+        future = worker_pool().submit(fn, *args)
+    except Exception:
+        with _lock:
+            _pending.discard(key)
+        logger.exception("Пул рабочих процессов недоступен")
+        return False
+    future.add_done_callback(lambda f: _finish(key, on_done, f))
+    return True
+